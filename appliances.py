@@ -0,0 +1,25 @@
+# appliances.py
+# Footprints of the placeable appliances as (width, height) in dp, kept free of Kivy so the
+# scanner can use the same proportions; FloorPlanDesignerLogic.get_appliance_size converts them.
+APPLIANCE_SIZES = {
+    "bed-single": (60, 100),
+    "bed-double": (80, 100),
+    "bed-queen": (100, 100),
+    "bed-king": (120, 100),
+    "table": (120, 80),
+    "sofa": (100, 50),
+    "fridge": (45, 70),
+    "sink": (50, 35),
+    "toilet": (35, 50),
+    "door": (8, 40),  # Width is usually small
+    "double-door": (16, 40),  # Double the width of a single door
+    "window": (60, 8),
+    "shower": (40, 60),
+    "flat-tv": (70, 15),
+    "gas-stove": (45, 30),
+    "side-table": (35, 35),
+    "bathtub": (90, 45),
+    "chair": (20, 20),  # Small square
+}
+
+DEFAULT_APPLIANCE_SIZE = (40, 40)
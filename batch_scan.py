@@ -0,0 +1,226 @@
+# batch_scan.py
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
+from scan_cache import DEFAULT_CACHE_DIR, ScanCache
+from scan_modes import SCAN_MODES, scan_with_mode
+from scan_ocr import read_dimensions
+from scanner import OCR_AVAILABLE, ImageIngest
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif')
+SUMMARY_NAME = 'batch_summary.json'
+# The line printed as each image finishes: "[done/total] image path"
+PROGRESS_PATTERN = re.compile(r"^\[(\d+)/(\d+)\] (.*)$")
+
+# Matches the defaults of FloorPlanDesignerLogic so batch output opens unchanged in the app
+DEFAULT_GRID_SIZE = 20
+DEFAULT_METERS_TO_PIXELS_FACTOR = 40
+
+
+def find_images(input_dir):
+    """Returns the image files directly inside input_dir, sorted by name."""
+    return sorted(
+        os.path.join(input_dir, name) for name in os.listdir(input_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(os.path.join(input_dir, name))
+    )
+
+
+_worker_caches = {}
+
+
+def _cache_for(cache_dir):
+    """Returns this process's ScanCache for cache_dir, creating it on first use."""
+    if cache_dir is None:
+        return None
+    if cache_dir not in _worker_caches:
+        _worker_caches[cache_dir] = ScanCache(cache_dir)
+    return _worker_caches[cache_dir]
+
+
+def scan_one(image_path, output_dir, run_ocr=True, cache_dir=None, mode=None, params=None):
+    """Scans one image, writes its plan to <image name>.json and returns a summary entry (runs in a worker process)."""
+    entry = {"image": image_path, "status": "ok"}
+    started = time.perf_counter()
+    try:
+        cache = _cache_for(cache_dir)
+        timings = {}
+        ingest = ImageIngest(image_path)
+        elements, rooms_found, walls_found, circles_found = scan_with_mode(
+            image_path, mode, params, cache=cache, timings=timings, ingest=ingest)
+        entry["scan_seconds"] = round(time.perf_counter() - started, 4)
+        entry["stage_seconds"] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+        entry["rooms"] = rooms_found
+        entry["walls"] = walls_found
+        entry["fixtures"] = circles_found
+        meters_to_pixels_factor = DEFAULT_METERS_TO_PIXELS_FACTOR
+        if run_ocr and OCR_AVAILABLE:
+            ocr_started = time.perf_counter()
+            try:
+                walls = [element for element in elements if element["type"] == "wall"]
+                dimensions = read_dimensions(image_path, walls, cache=cache, ingest=ingest)
+                entry["numbers"] = [annotation["value"] for annotation in dimensions["annotations"]]
+                if dimensions["meters_to_pixels_factor"]:
+                    meters_to_pixels_factor = dimensions["meters_to_pixels_factor"]
+                    entry["calibrated_from"] = dimensions["labels_used"]
+            except Exception as e:
+                entry["ocr_error"] = str(e)
+            entry["ocr_seconds"] = round(time.perf_counter() - ocr_started, 4)
+        entry["meters_to_pixels_factor"] = meters_to_pixels_factor
+        plan = {
+            'version': '1.0',
+            'created': str(datetime.datetime.now()),
+            'elements': elements,
+            'grid_size': DEFAULT_GRID_SIZE,
+            'meters_to_pixels_factor': meters_to_pixels_factor,
+            'source_image': os.path.abspath(image_path),
+        }
+        # The image's own extension stays in the name, so a.png and a.jpg get separate plans
+        plan_path = os.path.join(output_dir, os.path.basename(image_path) + '.json')
+        with open(plan_path, 'w') as f:
+            json.dump(plan, f, indent=4)
+        entry["plan"] = plan_path
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = str(e)
+    entry["total_seconds"] = round(time.perf_counter() - started, 4)
+    return entry
+
+
+def scan_directory(input_dir, output_dir=None, workers=None, run_ocr=True, progress=None, cancel_event=None,
+                   cache_dir=DEFAULT_CACHE_DIR, mode=None, params=None):
+    """Scans every image in input_dir over a process pool and returns the summary report.
+
+    At most 2 * workers images are in flight at once, so memory stays bounded
+    regardless of how many files the folder holds. progress(done, total, entry)
+    is called in the calling thread as each image finishes. The report is also
+    written to batch_summary.json in output_dir. Results are cached in
+    cache_dir (pass None to disable), so re-runs only redo what changed.
+    mode is one of SCAN_MODES (default: decided per image size); params
+    overrides scanner.DEFAULT_SCAN_PARAMS.
+    """
+    output_dir = output_dir or os.path.join(input_dir, 'scans')
+    os.makedirs(output_dir, exist_ok=True)
+    images = find_images(input_dir)
+    workers = max(1, workers or os.cpu_count() or 1)
+    started = time.perf_counter()
+    entries = []
+
+    def record(entry):
+        entries.append(entry)
+        if progress:
+            progress(len(entries), len(images), entry)
+
+    try:
+        # spawn keeps workers independent of any Kivy/GL state in the parent
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    except (ImportError, NotImplementedError, OSError) as e:
+        # Android's Python lacks sem_open, so fall back to scanning in this thread
+        print(f"Process pool unavailable ({e}); scanning sequentially.")
+        pool = None
+
+    if pool is None:
+        for image_path in images:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            record(scan_one(image_path, output_dir, run_ocr, cache_dir, mode, params))
+    else:
+        with pool:
+            pending = set()
+            for image_path in images:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                pending.add(pool.submit(scan_one, image_path, output_dir, run_ocr, cache_dir, mode, params))
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(future.result())
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+            for future in pending:
+                if not future.cancelled():
+                    record(future.result())
+
+    entries.sort(key=lambda e: e["image"])
+    succeeded = [e for e in entries if e["status"] == "ok"]
+    report = {
+        "input_dir": os.path.abspath(input_dir),
+        "output_dir": os.path.abspath(output_dir),
+        "created": str(datetime.datetime.now()),
+        "workers": workers if pool is not None else 1,
+        "images": len(images),
+        "scanned": len(succeeded),
+        "failed": len(entries) - len(succeeded),
+        "cancelled": len(images) - len(entries),
+        "totals": {
+            "rooms": sum(e["rooms"] for e in succeeded),
+            "walls": sum(e["walls"] for e in succeeded),
+            "fixtures": sum(e["fixtures"] for e in succeeded),
+        },
+        "wall_seconds": round(time.perf_counter() - started, 4),
+        "results": entries,
+    }
+    with open(os.path.join(output_dir, SUMMARY_NAME), 'w') as f:
+        json.dump(report, f, indent=4)
+    return report
+
+
+def format_report(report):
+    """Renders the summary report as a plain-text table."""
+    lines = [f"{'image':<40} {'rooms':>5} {'walls':>5} {'fixt.':>5} {'secs':>8}  status"]
+    for entry in report["results"]:
+        name = os.path.basename(entry["image"])
+        if entry["status"] == "ok":
+            lines.append(f"{name:<40} {entry['rooms']:>5} {entry['walls']:>5} {entry['fixtures']:>5} "
+                         f"{entry['total_seconds']:>8.2f}  ok")
+        else:
+            lines.append(f"{name:<40} {'-':>5} {'-':>5} {'-':>5} {entry['total_seconds']:>8.2f}  {entry['error']}")
+    totals = report["totals"]
+    lines.append(f"{report['scanned']}/{report['images']} scanned, {report['failed']} failed, "
+                 f"{totals['rooms']} rooms, {totals['walls']} walls, {totals['fixtures']} fixtures "
+                 f"in {report['wall_seconds']:.2f}s")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan a folder of floor plan images into plan JSON files.")
+    parser.add_argument('input_dir', help="Folder containing the images to scan")
+    parser.add_argument('-o', '--output-dir', help="Where to write plan JSON files, one <image name>.json per image "
+                                                    "(default: <input_dir>/scans)")
+    parser.add_argument('-j', '--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--no-ocr', action='store_true', help="Skip the Tesseract pass")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Scan result cache (default: %(default)s)")
+    parser.add_argument('--no-cache', action='store_true', help="Always rerun the full pipeline")
+    parser.add_argument('--mode', choices=SCAN_MODES,
+                        help="Scan mode (default: tiled for very large images, single otherwise)")
+    parser.add_argument('--params', type=json.loads, default=None,
+                        help='Scan parameter overrides as a JSON object, e.g. \'{"hough_threshold": 60}\'')
+    parser.add_argument('--watch-stdin', action='store_true',
+                        help="Stop after the images in progress once standard input is closed (used by the app)")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.input_dir):
+        parser.error(f"not a directory: {args.input_dir}")
+    cancel_event = threading.Event()
+    if args.watch_stdin:
+        def watch():
+            sys.stdin.read()  # Returns when the other end closes the pipe, or exits
+            cancel_event.set()
+        threading.Thread(target=watch, daemon=True).start()
+    report = scan_directory(args.input_dir, args.output_dir, args.workers, run_ocr=not args.no_ocr,
+                            progress=lambda done, total, entry: print(f"[{done}/{total}] {entry['image']}",
+                                                                      flush=True),
+                            cancel_event=cancel_event, cache_dir=None if args.no_cache else args.cache_dir,
+                            mode=args.mode, params=args.params)
+    print(format_report(report))
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
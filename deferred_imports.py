@@ -0,0 +1,125 @@
+# deferred_imports.py
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# The scanning stack and its native dependencies; kept off the startup path and imported on first use
+HEAVY_MODULES = ("numpy", "cv2", "pytesseract", "scanner", "scan_modes", "scan_ocr", "scan_service", "batch_scan")
+
+_warm_up_thread = None
+
+
+def warm_up(modules=HEAVY_MODULES, on_done=None):
+    """Imports modules on a daemon thread so the first scan does not wait for them; returns the thread.
+
+    Meant to be started once the first frame is on screen. Modules that are
+    missing are skipped. on_done, if given, is called on the worker thread
+    with {module: seconds or None}. Calling it again while a warm-up is
+    running returns the running thread.
+    """
+    global _warm_up_thread
+    if _warm_up_thread is not None and _warm_up_thread.is_alive():
+        return _warm_up_thread
+
+    def run():
+        seconds = {}
+        for name in modules:
+            started = time.perf_counter()
+            try:
+                importlib.import_module(name)
+                seconds[name] = time.perf_counter() - started
+            except ImportError:
+                seconds[name] = None
+        if on_done is not None:
+            on_done(seconds)
+
+    _warm_up_thread = threading.Thread(target=run, name="import-warm-up", daemon=True)
+    _warm_up_thread.start()
+    return _warm_up_thread
+
+
+def loaded_heavy_modules(modules=HEAVY_MODULES):
+    """Returns the modules of HEAVY_MODULES already imported in this process."""
+    return [name for name in modules if name in sys.modules]
+
+
+def parse_importtime(text):
+    """Parses `python -X importtime` output into dicts of module, self_us, cumulative_us and depth, in load order."""
+    entries = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The column header
+        name = fields[2].rstrip()
+        entries.append({
+            "module": name.strip(),
+            "self_us": int(fields[0]),
+            "cumulative_us": int(fields[1]),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+    return entries
+
+
+def import_report(module="main", top=25):
+    """Imports module in a fresh interpreter with -X importtime and reports what the startup path loads.
+
+    Returns {"module", "total_ms", "heavy": {name: cumulative ms} for every
+    HEAVY_MODULES entry that was loaded, "slowest": the top entries by
+    cumulative time}.
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, env=_report_env())
+    entries = parse_importtime(completed.stderr)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+    by_name = {entry["module"]: entry for entry in entries}
+    total = by_name[module]["cumulative_us"] if module in by_name else sum(e["self_us"] for e in entries)
+    return {
+        "module": module,
+        "total_ms": round(total / 1000, 1),
+        "heavy": {name: round(by_name[name]["cumulative_us"] / 1000, 1) for name in HEAVY_MODULES if name in by_name},
+        "slowest": sorted(entries, key=lambda entry: -entry["cumulative_us"])[:top],
+    }
+
+
+def _report_env():
+    env = dict(os.environ)
+    env.setdefault("KIVY_NO_ARGS", "1")  # The report's own arguments are not Kivy's
+    return env
+
+
+def format_import_report(report):
+    """Renders import_report output as plain text."""
+    lines = [f"import {report['module']}: {report['total_ms']:.1f} ms"]
+    if report["heavy"]:
+        lines.append("heavy modules on the startup path: " +
+                     ", ".join(f"{name} ({ms:.1f} ms)" for name, ms in report["heavy"].items()))
+    else:
+        lines.append("no heavy modules on the startup path")
+    lines.append(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    for entry in report["slowest"]:
+        lines.append(f"{entry['cumulative_us'] / 1000:>13.1f} {entry['self_us'] / 1000:>8.1f}  "
+                     f"{'  ' * entry['depth']}{entry['module']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show what importing a module (the app by default) loads.")
+    parser.add_argument('module', nargs='?', default='main', help="Module to import (default: %(default)s)")
+    parser.add_argument('--top', type=int, default=25, help="Entries to list (default: %(default)s)")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+    report = import_report(args.module, args.top)
+    print(json.dumps(report, indent=4) if args.json else format_import_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# file_dialog.py
+import os
+import threading
+from kivy.clock import Clock
+from kivy.metrics import dp
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.filechooser import FileChooserListView, FileSystemLocal, platform
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+from kivy.uix.textinput import TextInput
+
+START_PATH = os.path.expanduser('~') if platform != 'android' else '/'
+
+
+class AsyncFileSystem(FileSystemLocal):
+    """FileSystemLocal whose directory listings are read on a worker thread and cached.
+
+    listdir returns the cached names of a directory, or an empty list while
+    it is still being read; once the listing arrives on_listed(path) is
+    called on the main thread so the file chooser can refresh. is_dir and
+    getsize answer from the same listing, so showing a directory costs no
+    per-file stat calls on the main thread.
+    """
+
+    def __init__(self, on_listed=None):
+        self.on_listed = on_listed
+        self._listings = {}  # Directory -> {name: (is_dir, size)}; only touched on the main thread
+        self._pending = set()
+
+    def prefetch(self, path):
+        """Starts (re)reading path in the background unless it is already being read.
+
+        A listing already cached keeps being served until the new one arrives.
+        """
+        path = os.path.normpath(path)
+        if path in self._pending:
+            return
+        self._pending.add(path)
+        threading.Thread(target=self._read, args=(path,), daemon=True).start()
+
+    def _read(self, path):
+        entries = {}
+        try:
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    try:
+                        is_dir = entry.is_dir()
+                        entries[entry.name] = (is_dir, 0 if is_dir else entry.stat().st_size)
+                    except OSError:
+                        entries[entry.name] = (False, 0)
+        except OSError as e:
+            print(f"Error listing {path}: {e}")
+        Clock.schedule_once(lambda dt: self._listed(path, entries), 0)
+
+    def _listed(self, path, entries):
+        self._pending.discard(path)
+        if self._listings.get(path) == entries:
+            return
+        self._listings[path] = entries
+        if self.on_listed is not None:
+            self.on_listed(path)
+
+    def _entry(self, fn):
+        folder, name = os.path.split(os.path.normpath(fn))
+        listing = self._listings.get(folder)
+        return listing.get(name) if listing is not None else None
+
+    def listdir(self, fn):
+        listing = self._listings.get(os.path.normpath(fn))
+        if listing is None:
+            self.prefetch(fn)
+            return []
+        return list(listing)
+
+    def is_dir(self, fn):
+        entry = self._entry(fn)
+        return entry[0] if entry is not None else super().is_dir(fn)
+
+    def getsize(self, fn):
+        entry = self._entry(fn)
+        return entry[1] if entry is not None else super().getsize(fn)
+
+
+class FileDialog:
+    """One file chooser popup, built on first use and reused by every open/save/scan dialog.
+
+    The chooser keeps the folder the user last browsed to, and lists folders
+    through an AsyncFileSystem, so opening the dialog never waits for the
+    file system.
+    """
+
+    def __init__(self):
+        self.file_system = AsyncFileSystem(on_listed=self._on_listed)
+        self.popup = None
+        self._on_confirm = None
+
+    def prefetch(self):
+        """Starts listing the start folder, e.g. once the first frame is shown."""
+        self.file_system.prefetch(START_PATH)
+
+    def _build(self):
+        self.filechooser = FileChooserListView(path=START_PATH, file_system=self.file_system)
+        self.filename_layout = BoxLayout(size_hint_y=None, height=dp(50))
+        self.filename_layout.add_widget(Label(text="Filename:", size_hint_x=0.3))
+        self.filename_input = TextInput(size_hint_x=0.7, multiline=False)
+        self.filename_layout.add_widget(self.filename_input)
+        btn_layout = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(5))
+        self.confirm_btn = Button()
+        cancel_btn = Button(text="Cancel")
+        self.confirm_btn.bind(on_press=self._confirm)
+        cancel_btn.bind(on_press=lambda *args: self.dismiss())
+        btn_layout.add_widget(self.confirm_btn)
+        btn_layout.add_widget(cancel_btn)
+        self.content = BoxLayout(orientation='vertical')
+        self.content.add_widget(self.filechooser)
+        self.content.add_widget(btn_layout)
+        self.popup = Popup(content=self.content, size_hint=(0.9, 0.9))
+
+    def open(self, title, confirm_text, on_confirm, filters=(), filename=None, dirselect=False):
+        """Shows the dialog; confirming calls on_confirm(selection, folder, filename).
+
+        filename is the initial text of a filename field, shown only when not
+        None. on_confirm decides whether to call dismiss().
+        """
+        if self.popup is None:
+            self._build()
+        self.popup.title = title
+        self.confirm_btn.text = confirm_text
+        self._on_confirm = on_confirm
+        chooser = self.filechooser
+        chooser.selection = []
+        chooser.dirselect = dirselect
+        chooser.filters = list(filters)
+        if filename is None:
+            if self.filename_layout.parent is not None:
+                self.content.remove_widget(self.filename_layout)
+        else:
+            self.filename_input.text = filename
+            if self.filename_layout.parent is None:
+                self.content.add_widget(self.filename_layout, index=1)  # Between the chooser and the buttons
+        self.file_system.prefetch(chooser.path)  # Picks up files changed since the last open
+        self.popup.open()
+
+    def dismiss(self):
+        if self.popup is not None:
+            self.popup.dismiss()
+
+    def _confirm(self, *args):
+        chooser = self.filechooser
+        filename = self.filename_input.text.strip() if self.filename_layout.parent is not None else None
+        self._on_confirm(list(chooser.selection), chooser.path, filename)
+
+    def _on_listed(self, path):
+        if self.popup is not None and os.path.normpath(self.filechooser.path) == path:
+            self.filechooser._trigger_update()
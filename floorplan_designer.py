@@ -1,14 +1,14 @@
 # floorplan_designer.py
 import json
 import math
-import cv2
-import numpy as np
 from kivy.metrics import dp
 from kivy.app import App  # For popup functionality
 from kivy.uix.popup import Popup
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.boxlayout import BoxLayout
+from appliances import APPLIANCE_SIZES, DEFAULT_APPLIANCE_SIZE
+from tracing import traced
 
 
 class FloorPlanDesignerLogic:
@@ -110,6 +110,7 @@ class FloorPlanDesignerLogic:
         self.placing_wall = False
         self.selected_element = None
 
+    @traced(category="model")
     def generate_floor_plan(self, house_x, house_y, house_width, house_height):
         """Generates a floor plan layout scaled to the provided house dimensions."""
         # Clear existing elements
@@ -359,6 +360,7 @@ class FloorPlanDesignerLogic:
                 "rotation": 90  # Facing down
             })
 
+    @traced(category="model")
     def validate_appliances_in_rooms(self):
         """Check if appliances fit within their rooms and show popup if not."""
         # Check living room appliances
@@ -496,6 +498,7 @@ class FloorPlanDesignerLogic:
         # Show popup
         popup.open()
 
+    @traced(category="model")
     def add_preset(self, preset_type):
         """Adds a predefined set of elements."""
         offset_x, offset_y = dp(50), dp(50)  # Example offset using dp
@@ -533,140 +536,15 @@ class FloorPlanDesignerLogic:
         self.save_history()
 
     # --- Image Scanning Logic (adapted from Tkinter) ---
-    def scan_image(self, image_path):
+    @traced(category="model")
+    def scan_image(self, image_path, progress=None, cancel_event=None):
+        """Scans an image synchronously; see scan_service.ScanService for the threaded variant."""
+        # OpenCV and NumPy come in with the scanner, so they are only loaded once something is scanned
+        from scan_cache import default_cache
+        from scanner import scan_floor_plan
         try:
-            # ---- OpenCV Image Processing Pipeline ----
-            # 1. Load Image
-            img = cv2.imread(image_path)
-            if img is None:
-                raise ValueError("Could not load image. Check file format.")
-            orig_height, orig_width = img.shape[:2]
-            # 2. Resize for processing
-            max_dim = 1200
-            if max(orig_width, orig_height) > max_dim:
-                scale = max_dim / max(orig_width, orig_height)
-                new_width = int(orig_width * scale)
-                new_height = int(orig_height * scale)
-                img_resized = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_AREA)
-            else:
-                img_resized = img
-                scale = 1.0
-            # 3. Convert to Grayscale
-            gray = cv2.cvtColor(img_resized, cv2.COLOR_BGR2GRAY)
-            # 4. Preprocessing
-            blurred = cv2.GaussianBlur(gray, (7, 7), 0)
-            # 5. Edge Detection
-            edges = cv2.Canny(blurred, threshold1=30, threshold2=90, apertureSize=3)
-            # 6. Morphological Operations
-            kernel_h = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 1))
-            kernel_v = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 15))
-            edges_closed_h = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel_h)
-            edges_closed_v = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel_v)
-            edges_combined = cv2.bitwise_or(edges_closed_h, edges_closed_v)
-            kernel_general = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-            edges_final = cv2.morphologyEx(edges_combined, cv2.MORPH_CLOSE, kernel_general)
-            # ---- Line Detection ----
-            # self.update_status("Scanning image (detecting lines)...") # Handled by UI
-            lines = cv2.HoughLinesP(edges_final, rho=1, theta=np.pi / 180, threshold=80, minLineLength=50,
-                                    maxLineGap=20)
-            scanned_elements = []
-            walls_found = 0
-            if lines is not None:
-                horizontal_lines = []
-                vertical_lines = []
-                other_lines = []
-                for line in lines:
-                    x1, y1, x2, y2 = line[0]
-                    length = np.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
-                    angle = np.abs(np.arctan2(y2 - y1, x2 - x1) * 180 / np.pi)
-                    if angle < 10 or angle > 170:
-                        horizontal_lines.append((x1, y1, x2, y2, length))
-                    elif 80 < angle < 100:
-                        vertical_lines.append((x1, y1, x2, y2, length))
-                    else:
-                        other_lines.append((x1, y1, x2, y2, length))
-                if horizontal_lines and vertical_lines:
-                    horizontal_lines.sort(key=lambda l: l[4], reverse=True)
-                    vertical_lines.sort(key=lambda l: l[4], reverse=True)
-                    border_h_lines = horizontal_lines[:2]
-                    border_v_lines = vertical_lines[:2]
-                    for x1, y1, x2, y2, _ in border_h_lines:
-                        scanned_elements.append({
-                            "type": "wall",
-                            "x1": float(x1 / scale),
-                            "y1": float(y1 / scale),
-                            "x2": float(x2 / scale),
-                            "y2": float(y2 / scale)
-                        })
-                        walls_found += 1
-                    for x1, y1, x2, y2, _ in border_v_lines:
-                        scanned_elements.append({
-                            "type": "wall",
-                            "x1": float(x1 / scale),
-                            "y1": float(y1 / scale),
-                            "x2": float(x2 / scale),
-                            "y2": float(y2 / scale)
-                        })
-                        walls_found += 1
-                all_other_lines = other_lines + horizontal_lines[2:] + vertical_lines[2:]
-                all_other_lines.sort(key=lambda l: l[4], reverse=True)
-                lines_to_add = min(30, len(all_other_lines))
-                for i in range(lines_to_add):
-                    x1, y1, x2, y2, length = all_other_lines[i]
-                    if length > 30:
-                        scanned_elements.append({
-                            "type": "wall",
-                            "x1": float(x1 / scale),
-                            "y1": float(y1 / scale),
-                            "x2": float(x2 / scale),
-                            "y2": float(y2 / scale)
-                        })
-                        walls_found += 1
-            rooms_found = 0
-            _, thresh_for_rooms = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-            kernel_room = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-            thresh_morphed = cv2.morphologyEx(thresh_for_rooms, cv2.MORPH_CLOSE, kernel_room)
-            contours, _ = cv2.findContours(thresh_morphed, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
-            for cnt in contours:
-                area = cv2.contourArea(cnt)
-                if area > 5000 / (scale * scale):
-                    epsilon = 0.03 * cv2.arcLength(cnt, True)
-                    approx = cv2.approxPolyDP(cnt, epsilon, True)
-                    if len(approx) == 4:
-                        x_rect, y_rect, w_rect, h_rect = cv2.boundingRect(cnt)
-                        aspect_ratio = float(w_rect) / h_rect if h_rect > 0 else float('inf')
-                        if 0.3 < aspect_ratio < 3.5 and w_rect > 30 / scale and h_rect > 30 / scale:
-                            scanned_elements.append({
-                                "type": "room",
-                                "x": float(x_rect / scale),
-                                "y": float(y_rect / scale),
-                                "width": float(w_rect / scale),
-                                "height": float(h_rect / scale)
-                            })
-                            rooms_found += 1
-            circles_found = 0
-            circles = cv2.HoughCircles(
-                blurred,
-                cv2.HOUGH_GRADIENT,
-                dp=1,
-                minDist=20,
-                param1=50,
-                param2=25,
-                minRadius=5,
-                maxRadius=30
-            )
-            if circles is not None:
-                circles = np.round(circles[0, :]).astype("int")
-                for (x, y, r) in circles:
-                    scanned_elements.append({
-                        "type": "toilet",  # Assume
-                        "x": float((x - r) / scale),
-                        "y": float((y - r) / scale),
-                        "width": float(2 * r / scale),
-                        "height": float(2 * r / scale)
-                    })
-                    circles_found += 1
-
+            scanned_elements, rooms_found, walls_found, circles_found = scan_floor_plan(
+                image_path, progress=progress, cancel_event=cancel_event, cache=default_cache())
             return True, scanned_elements, rooms_found, walls_found, circles_found  # Return status and elements for UI
         except Exception as e:
             print(f"Scan error in logic: {e}")  # Log or handle in UI
@@ -674,11 +552,13 @@ class FloorPlanDesignerLogic:
 
     # ------------------------------------
 
+    @traced(category="model")
     def save_history(self):
         """Saves the current state to the history stack."""
         self.history.append(json.dumps(self.elements))
         self.redo_stack = []
 
+    @traced(category="model")
     def undo(self):
         """Undoes the last action."""
         if len(self.history) > 1:
@@ -686,6 +566,7 @@ class FloorPlanDesignerLogic:
             self.elements = json.loads(self.history[-1])
             self.selected_element = None
 
+    @traced(category="model")
     def redo(self):
         """Redoes the previously undone action."""
         if self.redo_stack:
@@ -694,30 +575,20 @@ class FloorPlanDesignerLogic:
             self.selected_element = None
 
     def get_appliance_size(self, appliance_type):
-        sizes = {
-            "bed-single": {"width": dp(60), "height": dp(100)},
-            "bed-double": {"width": dp(80), "height": dp(100)},
-            "bed-queen": {"width": dp(100), "height": dp(100)},
-            "bed-king": {"width": dp(120), "height": dp(100)},
-            "table": {"width": dp(120), "height": dp(80)},
-            "sofa": {"width": dp(100), "height": dp(50)},
-            "fridge": {"width": dp(45), "height": dp(70)},
-            "sink": {"width": dp(50), "height": dp(35)},
-            "toilet": {"width": dp(35), "height": dp(50)},
-            "door": {"width": dp(8), "height": dp(40)},  # Width is usually small
-            "double-door": {"width": dp(16), "height": dp(40)},  # Double the width of a single door
-            "window": {"width": dp(60), "height": dp(8)},
-            "shower": {"width": dp(40), "height": dp(60)},
-            "flat-tv": {"width": dp(70), "height": dp(15)},
-            "gas-stove": {"width": dp(45), "height": dp(30)},
-            "side-table": {"width": dp(35), "height": dp(35)},
-            "bathtub": {"width": dp(90), "height": dp(45)},
-            "chair": {"width": dp(20), "height": dp(20)}  # Small square
-        }
-        default_size = {"width": dp(40), "height": dp(40)}
-        return sizes.get(appliance_type, default_size)
+        width, height = APPLIANCE_SIZES.get(appliance_type, DEFAULT_APPLIANCE_SIZE)
+        return {"width": dp(width), "height": dp(height)}
+
+    def get_polygon_points(self, element):
+        """Returns a polygon element's outline as absolute (x, y) points.
+
+        Points are stored relative to the bounding box, so the outline follows
+        the element when it is moved or resized.
+        """
+        x, y, width, height = element["x"], element["y"], element["width"], element["height"]
+        return [(x + u * width, y + v * height) for u, v in element["points"]]
 
     # Add methods for save/load layout (JSON handling) as needed
+    @traced(category="model")
     def save_layout_to_json(self):
         layout_data = {
             "version": "1.0",
@@ -728,6 +599,7 @@ class FloorPlanDesignerLogic:
         }
         return json.dumps(layout_data, indent=2)
 
+    @traced(category="model")
     def load_layout_from_json(self, json_string):
 
         try:
@@ -1,44 +1,70 @@
 from kivy.app import App
 import json
 import os
-import re
+import subprocess
+import sys
+import threading
+import time
 from kivy.clock import Clock
 from kivy.metrics import dp
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.dropdown import DropDown
-from kivy.uix.filechooser import FileChooserListView, platform
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
 from kivy.uix.popup import Popup
+from kivy.uix.progressbar import ProgressBar
 from kivy.uix.screenmanager import Screen
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.slider import Slider
 from kivy.uix.textinput import TextInput
+from kivy.utils import platform
+from file_dialog import FileDialog
 from floorplan_designer import FloorPlanDesignerLogic
+from memory_stats import MemoryMonitor, format_measurement, trim
+from plan_format import COMPRESSED_EXTENSION, PLAN_EXTENSION
+from plan_import import PlanImporter
+from render_profiler import RenderProfiler
+from save_service import SaveService, snapshot
+from touch_recorder import (SessionRecorder, SessionReplayer, capture_state, format_summary, restore_state,
+                            summarize_timings)
+import tracing
+from tracing import traced
 from widgets import FloorPlanCanvas
+from deferred_imports import warm_up
+
+# The scanning modules (OpenCV, NumPy, Tesseract) are imported where they are used, not at startup.
+# With this set they are loaded on a background thread once the first frame is shown.
+WARM_UP_SCANNER = True
+STATUS_INTERVAL = 0.5  # Seconds between status bar updates
+# Plan files the save and import dialogs list: JSON, gzipped JSON and the binary format
+PLAN_FILTERS = ['*.json', '*' + COMPRESSED_EXTENSION, '*' + PLAN_EXTENSION]
+
+# Appliance names shown in the toolbar, in order, and the element type each one adds
+APPLIANCES = [
+    "Single Bed", "Double Bed", "Queen Bed", "King Bed",
+    "Dining Table", "Sofa", "Fridge", "Sink", "Toilet", "Door", "Double Door", "Window",
+    "Shower", "Flat TV", "Gas Stove", "Side Table", "Bathtub"
+]
+APPLIANCE_MAP = {
+    "Single Bed": "bed-single", "Double Bed": "bed-double", "Queen Bed": "bed-queen", "King Bed": "bed-king",
+    "Dining Table": "table", "Sofa": "sofa", "Fridge": "fridge", "Sink": "sink", "Toilet": "toilet",
+    "Door": "door", "Double Door": "double-door", "Window": "window", "Shower": "shower", "Flat TV": "flat-tv",
+    "Gas Stove": "gas-stove", "Side Table": "side-table", "Bathtub": "bathtub"
+}
 
-try:
-    import pytesseract
-    from PIL import Image
-
-
-    if os.name == 'nt':
-        pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-
-    OCR_AVAILABLE = True
-    print("OCR libraries loaded successfully. Tesseract path set.")
-except ImportError as e:
-    print(f"Warning: OCR libraries not found. OCR functionality will be disabled. Error: {e}")
-    OCR_AVAILABLE = False
-# --- End Import for OCR ---
 
 class ToolSection(BoxLayout):
-    """Represents a collapsible section in the toolbar."""
+    """Represents a collapsible section in the toolbar.
+
+    content_widget may also be a zero-argument callable returning the
+    widget; it is then only called when the section is first expanded.
+    """
     def __init__(self, title, content_widget, **kwargs):
         super().__init__(orientation='vertical', size_hint_y=None, height=dp(50), **kwargs)
         self.title = title
-        self.content_widget = content_widget
+        self.content_factory = content_widget if callable(content_widget) else None
+        self.content_widget = None if self.content_factory else content_widget
         self.is_expanded = False
         # Header Button
         self.header_btn = Button(
@@ -51,7 +77,8 @@ class ToolSection(BoxLayout):
         self.header_btn.bind(on_press=self.toggle_content)
         self.add_widget(self.header_btn)
         # Content Area (initially not added)
-        self.content_widget.size_hint_y = None
+        if self.content_widget is not None:
+            self.content_widget.size_hint_y = None
         # Schedule the initial visibility update for the next frame
         # This ensures self.parent is set
         Clock.schedule_once(lambda dt: self.update_content_visibility(), 0)
@@ -67,6 +94,9 @@ class ToolSection(BoxLayout):
     def update_content_visibility(self):
         # --- Fix: Check if parent exists ---
         if self.is_expanded:
+            if self.content_widget is None:
+                self.content_widget = self.content_factory()
+                self.content_widget.size_hint_y = None
             if self.content_widget not in self.children:
                 self.add_widget(self.content_widget)
                 # Set a default or estimated height for now
@@ -74,7 +104,7 @@ class ToolSection(BoxLayout):
             self.header_btn.text = f"[b]{self.title}[/b]  −"
             self.height = dp(40) + self.content_widget.height
         else:
-            if self.content_widget in self.children:
+            if self.content_widget is not None and self.content_widget in self.children:
                 self.remove_widget(self.content_widget)
             self.header_btn.text = f"[b]{self.title}[/b]  +"
             self.height = dp(40)
@@ -88,11 +118,30 @@ class NavigationToolbar(ScrollView):
         super().__init__(size_hint=(None, 1), width=dp(250), **kwargs)  # Fixed width
         self.designer_logic = designer_logic
         self.canvas_widget = canvas_widget
+        self._scan_service = None
+        self.file_dialog = FileDialog()  # Shared by Save, Import and the scan choosers
+        self._message_popup = None
+        self.render_profiler = RenderProfiler(canvas_widget)  # Opt-in, from the Debug section
+        self.session_recorder = SessionRecorder(canvas_widget)
+        self.memory_monitor = MemoryMonitor(designer_logic, canvas_widget, self.render_profiler)
+        self.plan_importer = PlanImporter()
+        self.save_service = SaveService()
+        self.scan_params = {}  # Overrides of scanner.DEFAULT_SCAN_PARAMS chosen in the tuner
+        self.scan_mode = None  # One of scan_modes.SCAN_MODES; None lets scan_modes.choose_mode pick per image
         self.bar_width = dp(10)  # Scrollbar width
         self.layout = GridLayout(cols=1, spacing=dp(5), size_hint_y=None)
         self.layout.bind(minimum_height=self.layout.setter('height'))
         self.add_widget(self.layout)
         self.create_sections()
+
+    @property
+    def scan_service(self):
+        """The ScanService, created (and the scanning modules imported) on first use."""
+        if self._scan_service is None:
+            from scan_service import ScanService
+            self._scan_service = ScanService()
+        return self._scan_service
+
     def create_sections(self):
         self.layout.clear_widgets()
         # --- Room Dimensions Section ---
@@ -125,53 +174,53 @@ class NavigationToolbar(ScrollView):
         dim_section = ToolSection("Room Dimensions", dim_section_layout)
         self.layout.add_widget(dim_section)
         # ---
-        # --- Appliances Section ---
-        appliance_dropdown = DropDown()
-        appliances = [
-            "Single Bed", "Double Bed", "Queen Bed", "King Bed",
-            "Dining Table", "Sofa", "Fridge", "Sink", "Toilet", "Door", "Double Door", "Window",
-            "Shower", "Flat TV", "Gas Stove", "Side Table", "Bathtub"
-        ]
-        self.appliance_map = {
-            "Single Bed": "bed-single", "Double Bed": "bed-double", "Queen Bed": "bed-queen", "King Bed": "bed-king",
-            "Dining Table": "table", "Sofa": "sofa", "Fridge": "fridge", "Sink": "sink", "Toilet": "toilet",
-            "Door": "door", "Double Door": "double-door", "Window": "window", "Shower": "shower", "Flat TV": "flat-tv",
-            "Gas Stove": "gas-stove", "Side Table": "side-table", "Bathtub": "bathtub"
-        }
-        for app in appliances:
-            btn = Button(text=app, size_hint_y=None, height=dp(40))
-            btn.bind(on_release=lambda btn_instance: self.on_appliance_selected(btn_instance.text))
-            appliance_dropdown.add_widget(btn)
-        appliance_mainbutton = Button(text='--Select Appliance--', size_hint_y=None, height=dp(40))
-        appliance_mainbutton.bind(on_release=appliance_dropdown.open)
-        appliance_dropdown.bind(on_select=lambda instance, x: setattr(appliance_mainbutton, 'text', x))
-        appliance_section = ToolSection("Add Appliances", appliance_mainbutton)
-        self.layout.add_widget(appliance_section)
+        # --- The remaining sections are built when first expanded ---
+        self.layout.add_widget(ToolSection("Add Appliances", self.build_appliance_section))
+        self.layout.add_widget(ToolSection("Edit Tools", self.build_edit_section))
+        self.layout.add_widget(ToolSection("File Operations", self.build_file_section))
+        self.layout.add_widget(ToolSection("Generate", self.build_generate_section))
+        self.layout.add_widget(ToolSection("Room Presets (Fixed Size)", self.build_preset_section))
+        self.layout.add_widget(ToolSection("Image Scanning", self.build_scan_section))
+        self.layout.add_widget(ToolSection("Debug", self.build_debug_section))
         # ---
-        # --- Edit Tools Section ---
+    # --- Section builders (called by ToolSection on first expand) ---
+    def build_appliance_section(self):
+        appliance_mainbutton = Button(text='--Select Appliance--', size_hint_y=None, height=dp(40))
+        dropdown = []
+
+        def open_dropdown(instance):
+            # The dropdown and its buttons are only built when first opened
+            if not dropdown:
+                appliance_dropdown = DropDown()
+                for app in APPLIANCES:
+                    btn = Button(text=app, size_hint_y=None, height=dp(40))
+                    btn.bind(on_release=lambda btn_instance: self.on_appliance_selected(btn_instance.text))
+                    appliance_dropdown.add_widget(btn)
+                appliance_dropdown.bind(on_select=lambda instance, x: setattr(appliance_mainbutton, 'text', x))
+                dropdown.append(appliance_dropdown)
+            dropdown[0].open(instance)
+
+        appliance_mainbutton.bind(on_release=open_dropdown)
+        return appliance_mainbutton
+    def build_edit_section(self):
         edit_layout = GridLayout(cols=2, spacing=dp(5), size_hint_y=None, height=dp(100))  # Height adjusted
         btn_rotate = Button(text="Rotate")
         btn_delete = Button(text="Delete")
         btn_undo = Button(text="Undo")
         btn_redo = Button(text="Redo")
-        btn_add_text = Button(text="Add Text")  # <-- Add Text Button is HERE
+        btn_add_text = Button(text="Add Text")
         btn_rotate.bind(on_press=self.on_rotate)
         btn_delete.bind(on_press=self.on_delete)
         btn_undo.bind(on_press=self.on_undo)
         btn_redo.bind(on_press=self.on_redo)
-        # --- Bind the Add Text button ---
-        btn_add_text.bind(on_press=self.on_add_text)  # <-- Handler bound HERE
-        # ---
+        btn_add_text.bind(on_press=self.on_add_text)
         edit_layout.add_widget(btn_rotate)
         edit_layout.add_widget(btn_delete)
         edit_layout.add_widget(btn_undo)
         edit_layout.add_widget(btn_redo)
-        edit_layout.add_widget(btn_add_text)  # <-- Button added to layout HERE
-        edit_section = ToolSection("Edit Tools", edit_layout)
-        self.layout.add_widget(edit_section)
-        # ---
-        # --- File Operations Section ---
-        # Updated with actual functionality
+        edit_layout.add_widget(btn_add_text)
+        return edit_layout
+    def build_file_section(self):
         file_layout = BoxLayout(orientation='horizontal', spacing=dp(5), size_hint_y=None, height=dp(50))
         btn_save = Button(text="Save", size_hint_y=None, height=dp(40))
         btn_import = Button(text="Import", size_hint_y=None, height=dp(40))
@@ -179,16 +228,12 @@ class NavigationToolbar(ScrollView):
         btn_import.bind(on_press=self.on_import)
         file_layout.add_widget(btn_save)
         file_layout.add_widget(btn_import)
-        file_section = ToolSection("File Operations", file_layout)
-        self.layout.add_widget(file_section)
-        # ---
-        # --- Generate Section ---
+        return file_layout
+    def build_generate_section(self):
         gen_btn = Button(text="Generate Floor Plan", size_hint_y=None, height=dp(50))
         gen_btn.bind(on_press=self.on_generate)
-        gen_section = ToolSection("Generate", gen_btn)
-        self.layout.add_widget(gen_section)
-        # ---
-        # --- Presets Section ---
+        return gen_btn
+    def build_preset_section(self):
         preset_layout = GridLayout(cols=2, spacing=dp(5), size_hint_y=None, height=dp(100))
         btn_room_preset = Button(text="Insert Room")
         btn_kitchen_preset = Button(text="Insert Kitchen")
@@ -202,15 +247,146 @@ class NavigationToolbar(ScrollView):
         preset_layout.add_widget(btn_kitchen_preset)
         preset_layout.add_widget(btn_living_preset)
         preset_layout.add_widget(btn_bath_preset)
-        preset_section = ToolSection("Room Presets (Fixed Size)", preset_layout)
-        self.layout.add_widget(preset_section)
-        # ---
-        # --- Image Scanning Section ---
+        return preset_layout
+    def build_scan_section(self):
+        scan_layout = BoxLayout(orientation='vertical', spacing=dp(5), size_hint_y=None, height=dp(215))
         scan_btn = Button(text="Scan Image", size_hint_y=None, height=dp(50))
         scan_btn.bind(on_press=self.on_scan_image)
-        scan_section = ToolSection("Image Scanning", scan_btn)
-        self.layout.add_widget(scan_section)
-        # ---
+        batch_scan_btn = Button(text="Batch Scan Folder", size_hint_y=None, height=dp(50))
+        batch_scan_btn.bind(on_press=self.on_batch_scan)
+        tune_scan_btn = Button(text="Tune Scan", size_hint_y=None, height=dp(50))
+        tune_scan_btn.bind(on_press=self.on_tune_scan)
+        scan_mode_btn = Button(text="Scan Mode: Auto", size_hint_y=None, height=dp(50))
+        scan_mode_btn.bind(on_press=self.on_cycle_scan_mode)
+        scan_layout.add_widget(scan_btn)
+        scan_layout.add_widget(batch_scan_btn)
+        scan_layout.add_widget(tune_scan_btn)
+        scan_layout.add_widget(scan_mode_btn)
+        return scan_layout
+    def on_cycle_scan_mode(self, instance):
+        """Steps the mode used by Scan Image and Batch Scan Folder through Auto and scan_modes.SCAN_MODES."""
+        from scan_modes import SCAN_MODES
+        modes = (None,) + SCAN_MODES
+        self.scan_mode = modes[(modes.index(self.scan_mode) + 1) % len(modes)]
+        instance.text = f"Scan Mode: {(self.scan_mode or 'auto').capitalize()}"
+    def build_debug_section(self):
+        debug_layout = BoxLayout(orientation='vertical', spacing=dp(5), size_hint_y=None, height=dp(330))
+        profile_btn = Button(text="Start Render Profile", size_hint_y=None, height=dp(50))
+        profile_btn.bind(on_press=self.on_toggle_render_profile)
+        dump_btn = Button(text="Dump Render Profile", size_hint_y=None, height=dp(50))
+        dump_btn.bind(on_press=self.on_dump_render_profile)
+        trace_btn = Button(text="Stop & Save Trace" if tracing.is_enabled() else "Start Trace",
+                           size_hint_y=None, height=dp(50))
+        trace_btn.bind(on_press=self.on_toggle_trace)
+        debug_layout.add_widget(profile_btn)
+        debug_layout.add_widget(dump_btn)
+        record_btn = Button(text="Record Touch Session", size_hint_y=None, height=dp(50))
+        record_btn.bind(on_press=self.on_toggle_session_recording)
+        replay_btn = Button(text="Replay Last Session", size_hint_y=None, height=dp(50))
+        replay_btn.bind(on_press=self.on_replay_session)
+        debug_layout.add_widget(trace_btn)
+        debug_layout.add_widget(record_btn)
+        memory_btn = Button(text="Memory", size_hint_y=None, height=dp(50))
+        memory_btn.bind(on_press=self.on_memory_panel)
+        debug_layout.add_widget(replay_btn)
+        debug_layout.add_widget(memory_btn)
+        return debug_layout
+    # --- Debug tools ---
+    def on_toggle_render_profile(self, instance):
+        enabled = self.render_profiler.toggle()
+        instance.text = "Stop Render Profile" if enabled else "Start Render Profile"
+    def debug_output_path(self, prefix):
+        """A timestamped JSON path in the app's user data folder (the working directory outside the app)."""
+        app = App.get_running_app()
+        folder = app.user_data_dir if app else os.getcwd()
+        return os.path.join(folder, time.strftime(f"{prefix}_%Y%m%d_%H%M%S.json"))
+    def on_dump_render_profile(self, instance):
+        if not self.render_profiler.samples:
+            self.show_popup("Render Profile", "No samples yet; start the render profile first.")
+            return
+        path = self.debug_output_path("render_profile")
+        try:
+            self.render_profiler.dump(path)
+            self.show_popup("Render Profile", f"Saved {len(self.render_profiler.samples)} frames to:\n{path}")
+        except OSError as e:
+            self.show_popup("Error", f"Failed to save the render profile: {str(e)}")
+    def on_toggle_trace(self, instance):
+        if not tracing.is_enabled():
+            tracing.start()
+            instance.text = "Stop & Save Trace"
+            return
+        events = tracing.stop()
+        instance.text = "Start Trace"
+        path = self.debug_output_path("trace")
+        try:
+            tracing.write(path, events)
+            self.show_popup("Trace", f"Saved {len(events)} events to:\n{path}\nOpen it in chrome://tracing or Perfetto.")
+        except OSError as e:
+            self.show_popup("Error", f"Failed to save the trace: {str(e)}")
+    def on_toggle_session_recording(self, instance):
+        recorder = self.session_recorder
+        if not recorder.recording:
+            recorder.start()
+            instance.text = "Stop & Save Session"
+            return
+        session = recorder.stop()
+        instance.text = "Record Touch Session"
+        path = self.debug_output_path("touch_session")
+        try:
+            recorder.save(path)
+            self.show_popup("Touch Session", f"Saved {len(session['events'])} events to:\n{path}")
+        except OSError as e:
+            self.show_popup("Error", f"Failed to save the session: {str(e)}")
+    def on_replay_session(self, instance):
+        """Replays the last recorded session at full speed and shows where the time went."""
+        session = self.session_recorder.session
+        if self.session_recorder.recording or not session:
+            self.show_popup("Replay", "Record a touch session (and stop it) first.")
+            return
+        logic = self.designer_logic
+        # The replay starts from the session's initial state; the user's plan and undo history are put back after
+        state, history, redo_stack = capture_state(logic), list(logic.history), list(logic.redo_stack)
+        try:
+            timings = SessionReplayer(self.canvas_widget, session).run()
+        finally:
+            restore_state(logic, state, reset_history=False)
+            logic.history, logic.redo_stack = history, redo_stack
+            self.canvas_widget.redraw()
+        self.show_popup("Replay", format_summary(summarize_timings(timings)))
+    def trim_memory(self):
+        """Releases caches and compacts history, e.g. when the OS reports low memory; returns (before, after)."""
+        return trim(self.designer_logic, self.canvas_widget, self.render_profiler)
+    def on_memory_panel(self, instance):
+        """Shows what the session's structures use, refreshed while open, with a Trim button."""
+        monitor = self.memory_monitor
+        monitor.start()  # Keeps sampling after the panel closes, so later openings show the trend
+        layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+        stats_label = Label(text="", halign='left', valign='top', font_name='RobotoMono-Regular', font_size='12sp')
+        stats_label.bind(size=stats_label.setter('text_size'))
+        btn_layout = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(5))
+        btn_trim = Button(text="Trim Now")
+        btn_close = Button(text="Close")
+        btn_layout.add_widget(btn_trim)
+        btn_layout.add_widget(btn_close)
+        layout.add_widget(stats_label)
+        layout.add_widget(btn_layout)
+        popup = Popup(title="Memory", content=layout, size_hint=(0.9, 0.8))
+
+        def refresh(*args):
+            stats_label.text = format_measurement(monitor.sample(), monitor.samples[0])
+
+        def trim_now(*args):
+            before, after = self.trim_memory()
+            refresh()
+            freed = before["structures"]["history"]["bytes"] - after["structures"]["history"]["bytes"]
+            stats_label.text += f"\n\nTrimmed; history released {freed / 1024:.0f} KiB"
+
+        refresh_event = Clock.schedule_interval(refresh, 1)
+        popup.bind(on_dismiss=lambda *args: refresh_event.cancel())
+        btn_trim.bind(on_press=trim_now)
+        btn_close.bind(on_press=popup.dismiss)
+        refresh()
+        popup.open()
     # --- Event Handlers calling logic from designer_logic ---
     # In main.py, modify the on_add_room method:
     def on_add_room(self, instance):
@@ -428,8 +604,8 @@ class NavigationToolbar(ScrollView):
 
 
     def on_appliance_selected(self, appliance_name):
-        if appliance_name in self.appliance_map:
-            appliance_type = self.appliance_map[appliance_name]
+        if appliance_name in APPLIANCE_MAP:
+            appliance_type = APPLIANCE_MAP[appliance_name]
             self.designer_logic.set_placing_type(appliance_type)
             self.canvas_widget.redraw()  # Update UI state indication if needed
             # Show info popup or status
@@ -461,142 +637,118 @@ class NavigationToolbar(ScrollView):
         self.canvas_widget.redraw()
     # --- Added Save/Import functionality with user file selection ---
     def on_save(self, instance):
-        """Opens a file chooser to select where to save the floor plan."""
-        # Create popup content
-        popup_content = BoxLayout(orientation='vertical')
-        # Create FileChooser
-        filechooser = FileChooserListView(
-            filters=['*.json'],
-            path=os.path.expanduser('~') if platform != 'android' else '/'
-        )
-        # Add a filename input
-        filename_layout = BoxLayout(size_hint_y=None, height=dp(50))
-        filename_layout.add_widget(Label(text="Filename:", size_hint_x=0.3))
-        filename_input = TextInput(text="floorplan.json", size_hint_x=0.7)
-        filename_layout.add_widget(filename_input)
-        popup_content.add_widget(filechooser)
-        popup_content.add_widget(filename_layout)
-        # Button layout
-        btn_layout = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(5))
-        btn_save = Button(text="Save")
-        btn_cancel = Button(text="Cancel")
-        popup = Popup(title="Save Floor Plan", content=popup_content, size_hint=(0.9, 0.9))
-        def save_file(*args):
-            if filechooser.selection:
-                selected_dir = filechooser.path
-                filename = filename_input.text.strip()
-                # Ensure filename has .json extension
-                if not filename.endswith('.json'):
-                    filename += '.json'
-                file_path = os.path.join(selected_dir, filename)
-                try:
-                    # Prepare data with metadata
-                    data_to_save = {
-                        'version': '1.0',
-                        'created': str(__import__('datetime').datetime.now()),
-                        'elements': self.designer_logic.elements,
-                        'grid_size': self.designer_logic.grid_size,
-                        'meters_to_pixels_factor': self.designer_logic.meters_to_pixels_factor,
-                    }
-                    # Write to file
-                    with open(file_path, 'w') as f:
-                        json.dump(data_to_save, f, indent=4)
-                    # Show success message
-                    self.show_popup("Success", f"Floor plan saved to:\n{file_path}")
-                    popup.dismiss()
-                except Exception as e:
-                    print(f"Error saving file: {e}")
-                    self.show_popup("Error", f"Failed to save: {str(e)}")
-            else:
-                # Try to save in the selected directory even if no file is selected
-                selected_dir = filechooser.path
-                filename = filename_input.text.strip()
-                # Ensure filename has .json extension
-                if not filename.endswith('.json'):
-                    filename += '.json'
-                file_path = os.path.join(selected_dir, filename)
-                try:
-                    # Prepare data with metadata
-                    data_to_save = {
-                        'version': '1.0',
-                        'created': str(__import__('datetime').datetime.now()),
-                        'elements': self.designer_logic.elements,
-                        'grid_size': self.designer_logic.grid_size,
-                        'meters_to_pixels_factor': self.designer_logic.meters_to_pixels_factor,
-                    }
-                    # Write to file
-                    with open(file_path, 'w') as f:
-                        json.dump(data_to_save, f, indent=4)
-                    # Show success message
-                    self.show_popup("Success", f"Floor plan saved to:\n{file_path}")
-                    popup.dismiss()
-                except Exception as e:
-                    print(f"Error saving file: {e}")
-                    self.show_popup("Error", f"Failed to save: {str(e)}")
-        def cancel_save(*args):
-            popup.dismiss()
-        btn_save.bind(on_press=save_file)
-        btn_cancel.bind(on_press=cancel_save)
-        btn_layout.add_widget(btn_save)
-        btn_layout.add_widget(btn_cancel)
-        popup_content.add_widget(btn_layout)
-        popup.open()
+        """Opens a file chooser to select where to save the floor plan.
+
+        The plan is snapshotted here and written by the SaveService in the
+        background; a name ending in .gz saves gzipped JSON and one ending in
+        .agplan the binary format.
+        """
+        def save_file(selection, folder, filename):
+            # Ensure filename has a plan extension
+            if not filename.endswith(('.json', COMPRESSED_EXTENSION, PLAN_EXTENSION)):
+                filename += '.json'
+            file_path = os.path.join(folder, filename)
+
+            def on_complete(path, size):
+                self.show_popup("Success", f"Floor plan saved to:\n{path}")
+
+            def on_error(error):
+                self.show_popup("Error", f"Failed to save: {str(error)}")
+
+            self.save_service.save(file_path, snapshot(self.designer_logic), on_complete=on_complete,
+                                   on_error=on_error)
+            self.file_dialog.dismiss()
+        self.file_dialog.open("Save Floor Plan", "Save", save_file, filters=PLAN_FILTERS, filename="floorplan.json")
     def on_import(self, instance):
         """Opens a file chooser to select which floor plan to import."""
-        # Create popup content
-        popup_content = BoxLayout(orientation='vertical')
-        # Create FileChooser
-        filechooser = FileChooserListView(
-            filters=['*.json'],
-            path=os.path.expanduser('~') if platform != 'android' else '/'
-        )
-        popup_content.add_widget(filechooser)
-        # Button layout
-        btn_layout = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(5))
-        btn_import = Button(text="Import")
-        btn_cancel = Button(text="Cancel")
-        popup = Popup(title="Import Floor Plan", content=popup_content, size_hint=(0.9, 0.9))
-        def import_file(*args):
-            if filechooser.selection:
-                file_path = filechooser.selection[0]
-                try:
-                    # Read from file
-                    with open(file_path, 'r') as f:
-                        loaded_data = json.load(f)
-                    # Load data into logic
-                    self.designer_logic.elements = loaded_data.get('elements', [])
-                    # Restore metadata if available
-                    if 'grid_size' in loaded_data:
-                        self.designer_logic.grid_size = loaded_data['grid_size']
-                    if 'meters_to_pixels_factor' in loaded_data:
-                        self.designer_logic.meters_to_pixels_factor = loaded_data['meters_to_pixels_factor']
-                    # Reset selection
-                    self.designer_logic.selected_element = None
-                    # Update UI
-                    self.canvas_widget.redraw()
-                    self.show_popup("Success", f"Floor plan imported from:\n{file_path}")
-                    popup.dismiss()
-                except Exception as e:
-                    print(f"Error importing file: {e}")
-                    self.show_popup("Error", f"Failed to import: {str(e)}")
+        def import_file(selection, folder, filename):
+            if selection:
+                self.file_dialog.dismiss()
+                self.import_plan(selection[0])
             else:
                 self.show_popup("Error", "Please select a file to import.")
+        self.file_dialog.open("Import Floor Plan", "Import", import_file, filters=PLAN_FILTERS)
+    @traced(category="ui")
+    def import_plan(self, file_path):
+        """Streams a plan file into the canvas, drawing each batch as it arrives, with progress and a Cancel button.
+
+        The plan is parsed on PlanImporter's worker thread; the elements read
+        so far can be seen and touched while the rest loads. Cancelling or a
+        read error restores the plan shown before the import, with its grid
+        size and scale.
+        """
+        logic = self.designer_logic
+        previous = (logic.elements, logic.grid_size, logic.meters_to_pixels_factor)
+        logic.elements = []
+        logic.selected_element = None
+        self.canvas_widget.redraw()
+        layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+        status_label = Label(text="Reading plan...", size_hint_y=None, height=dp(30))
+        progress_bar = ProgressBar(max=1.0, value=0, size_hint_y=None, height=dp(30))
+        cancel_btn = Button(text="Cancel", size_hint_y=None, height=dp(40))
+        layout.add_widget(status_label)
+        layout.add_widget(progress_bar)
+        layout.add_widget(cancel_btn)
+        # Kept low and without the dimming overlay, like the scan popup, so the plan filling in stays visible
+        popup = Popup(title="Importing Floor Plan", content=layout, size_hint=(0.8, 0.3), pos_hint={'y': 0.02},
+                      overlay_color=(0, 0, 0, 0), auto_dismiss=False)
+
+        def on_metadata(metadata):
+            # Restore metadata if available
+            if 'grid_size' in metadata:
+                logic.grid_size = metadata['grid_size']
+            if 'meters_to_pixels_factor' in metadata:
+                logic.meters_to_pixels_factor = metadata['meters_to_pixels_factor']
+
+        def on_batch(elements):
+            logic.elements.extend(elements)
+            self.canvas_widget.draw_appended(elements)
+
+        def on_progress(fraction):
+            status_label.text = f"Read {len(logic.elements)} elements..."
+            progress_bar.value = fraction
+
+        def restore():
+            logic.elements, logic.grid_size, logic.meters_to_pixels_factor = previous
+            logic.selected_element = None
+            self.canvas_widget.redraw()
+
+        def on_complete(stats):
+            popup.dismiss()
+            self.show_popup("Success", f"Floor plan imported from:\n{file_path}\n{stats.summary()}")
+
+        def on_error(error):
+            popup.dismiss()
+            restore()
+            self.show_popup("Error", f"Failed to import: {str(error)}")
+
         def cancel_import(*args):
+            self.plan_importer.cancel()
             popup.dismiss()
-        btn_import.bind(on_press=import_file)
-        btn_cancel.bind(on_press=cancel_import)
-        btn_layout.add_widget(btn_import)
-        btn_layout.add_widget(btn_cancel)
-        popup_content.add_widget(btn_layout)
+            restore()
+
+        cancel_btn.bind(on_press=cancel_import)
         popup.open()
+        self.plan_importer.start(file_path, on_metadata=on_metadata, on_batch=on_batch, on_progress=on_progress,
+                                 on_complete=on_complete, on_error=on_error)
     def show_popup(self, title, message):
-        """Helper to show a popup message."""
-        popup_content = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
-        popup_content.add_widget(Label(text=message, text_size=(dp(300), None)))
-        close_btn = Button(text="Close", size_hint_y=None, height=dp(40))
-        popup_content.add_widget(close_btn)
-        popup = Popup(title=title, content=popup_content, size_hint=(0.8, 0.4))
-        close_btn.bind(on_press=popup.dismiss)
+        """Helper to show a popup message.
+
+        The message popup is built once and reused; a new one is only made
+        while it is already showing another message.
+        """
+        popup = self._message_popup
+        if popup is None or popup.parent is not None:
+            popup_content = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+            popup_content.add_widget(Label(text=message, text_size=(dp(300), None)))
+            close_btn = Button(text="Close", size_hint_y=None, height=dp(40))
+            popup_content.add_widget(close_btn)
+            popup = Popup(title=title, content=popup_content, size_hint=(0.8, 0.4))
+            close_btn.bind(on_press=popup.dismiss)
+            if self._message_popup is None:
+                self._message_popup = popup
+        popup.title = title
+        popup.content.children[-1].text = message  # The label, added first
         popup.open()
     # --- End Added Save/Import functionality ---
     # --- Add show_room_too_small_popup method ---
@@ -633,6 +785,7 @@ class NavigationToolbar(ScrollView):
         # Open popup
         popup.open()
 
+    @traced(category="ui")
     def on_generate(self, instance):
         try:
 
@@ -682,150 +835,382 @@ class NavigationToolbar(ScrollView):
 
     def on_scan_image(self, instance):
         """Opens a file chooser to select an image for scanning."""
-        # Create popup content
-        popup_content = BoxLayout(orientation='vertical')
-
-        # Filter for common image types
-        filechooser = FileChooserListView(filters=['*.png', '*.jpg', '*.jpeg', '*.bmp', '*.tiff'])
-        # Set initial path (adjust as needed)
-        if platform == 'android':
-            pass
-        else:
-            filechooser.path = os.path.expanduser('~')  # Start in home directory
-        popup_content.add_widget(filechooser)
-        # Button layout
-        btn_layout = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(5))
-        btn_select = Button(text="Select")
-        btn_cancel = Button(text="Cancel")
-        popup = Popup(title="Select Image to Scan", content=popup_content, size_hint=(0.9, 0.9))
-        def select_image(*args):
-            if filechooser.selection:
-                selected_path = filechooser.selection[0]
+        self.choose_image("Select Image to Scan", self.process_scanned_image)
+
+    def on_tune_scan(self, instance):
+        """Opens a file chooser to select an image for interactive scan tuning."""
+        self.choose_image("Select Image to Tune", self.open_scan_tuner)
+
+    def choose_image(self, title, on_selected):
+        """Shows an image file chooser and calls on_selected(path) with the chosen file."""
+        def select_image(selection, folder, filename):
+            if selection:
+                self.file_dialog.dismiss()
+                on_selected(selection[0])
+        self.file_dialog.open(title, "Select", select_image,
+                              filters=['*.png', '*.jpg', '*.jpeg', '*.bmp', '*.tiff'])
+
+    def open_scan_tuner(self, image_path):
+        """Shows sliders for the scan parameters; each change reruns only the affected pipeline stages.
+
+        The pipeline runs on a worker thread, one run at a time: changes made
+        meanwhile are collected and applied together once it finishes, and
+        results arriving after the popup is closed are dropped.
+        """
+        from scanner import DEFAULT_SCAN_PARAMS, ScanPipeline
+        pipeline = ScanPipeline(image_path, self.scan_params)
+        # (label, parameter, min, max, step)
+        slider_specs = [
+            ("Canny low", "canny_threshold1", 0, 255, 1),
+            ("Canny high", "canny_threshold2", 0, 255, 1),
+            ("Hough threshold", "hough_threshold", 10, 300, 1),
+            ("Min line length", "hough_min_line_length", 10, 300, 1),
+            ("Max line gap", "hough_max_line_gap", 1, 100, 1),
+            ("Min room area", "room_min_area", 500, 50000, 500),
+            ("Door gap seal", "room_gap_close", 1, 80, 1),
+            ("Fixture min size", "fixture_min_size", 4, 100, 1),
+            ("Fixture max size", "fixture_max_size", 20, 300, 1),
+            ("Fixture match %", "fixture_min_score", 10, 100, 1),
+        ]
+        layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(5))
+        sliders_grid = GridLayout(cols=3, spacing=dp(5), size_hint_y=None)
+        sliders_grid.bind(minimum_height=sliders_grid.setter('height'))
+        sliders_scroll = ScrollView()
+        sliders_scroll.add_widget(sliders_grid)
+        result_label = Label(text="", size_hint_y=None, height=dp(50), halign='left', valign='middle')
+        result_label.bind(size=result_label.setter('text_size'))
+        pending_changes = {}
+        job = {"id": 0, "worker": None, "elements": None}
+
+        def show_result(invalidated, result):
+            elements, rooms_found, walls_found, circles_found = result
+            if invalidated is None:
+                invalidated = list(pipeline.stage_seconds)  # First run computes every stage
+            rerun_ms = sum(pipeline.stage_seconds[s] for s in invalidated) * 1000
+            rerun_text = ", ".join(invalidated) if invalidated else "nothing"
+            result_label.text = (f"Walls: {walls_found}  Rooms: {rooms_found}  Fixtures: {circles_found}\n"
+                                 f"Recomputed {rerun_text} in {rerun_ms:.0f} ms")
+            job["elements"] = elements
+            btn_insert.disabled = False
+
+        def deliver(job_id, first, invalidated, result, error):
+            job["worker"] = None
+            if job_id != job["id"]:
+                return  # The popup was closed
+            if error is not None and first:
                 popup.dismiss()
-                # Call the actual scanning logic (placeholder for now)
-                self.process_scanned_image(selected_path)
+                self.show_popup("Error", f"Failed to process image: {str(error)}")
+            elif pending_changes:
+                recompute(0)  # Sliders moved during the run; this result is already stale
+            elif error is not None:
+                result_label.text = f"Scan failed: {error}"
             else:
-                # Show warning or do nothing
-                # Optional: self.show_popup("Warning", "No file selected.")
-                pass
-        def cancel_selection(*args):
+                show_result(invalidated, result)
+
+        def run(changes):
+            """Runs the pipeline with changes applied (all stages if changes is None) on a worker thread."""
+            job_id = job["id"]
+            btn_insert.disabled = True
+
+            def work():
+                invalidated = result = error = None
+                try:
+                    if changes is not None:
+                        invalidated = pipeline.set_params(**changes)
+                    result = pipeline.result()
+                except Exception as e:
+                    print(f"Error during scan processing: {e}")
+                    error = e
+                Clock.schedule_once(lambda dt: deliver(job_id, changes is None, invalidated, result, error), 0)
+
+            job["worker"] = threading.Thread(target=work, daemon=True)
+            job["worker"].start()
+
+        def recompute(dt):
+            if job["worker"] is not None:
+                return  # deliver() starts the next run with everything changed meanwhile
+            changes = dict(pending_changes)
+            pending_changes.clear()
+            result_label.text = "Scanning..."
+            run(changes)
+
+        recompute_trigger = Clock.create_trigger(recompute, 0.15)  # Debounce slider drags
+
+        for label_text, param, min_value, max_value, step in slider_specs:
+            value_label = Label(text=str(pipeline.params[param]), size_hint_x=0.2, size_hint_y=None, height=dp(40))
+            slider = Slider(min=min_value, max=max_value, step=step, value=pipeline.params[param],
+                            size_hint_x=0.5, size_hint_y=None, height=dp(40))
+
+            def on_value(instance, value, param=param, value_label=value_label):
+                value_label.text = str(int(value))
+                pending_changes[param] = int(value)
+                recompute_trigger()
+
+            slider.bind(value=on_value)
+            sliders_grid.add_widget(Label(text=label_text, size_hint_x=0.3, size_hint_y=None, height=dp(40)))
+            sliders_grid.add_widget(slider)
+            sliders_grid.add_widget(value_label)
+
+        btn_layout = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(5))
+        btn_insert = Button(text="Insert")
+        btn_keep = Button(text="Use for Scans")
+        btn_close = Button(text="Close")
+        btn_layout.add_widget(btn_insert)
+        btn_layout.add_widget(btn_keep)
+        btn_layout.add_widget(btn_close)
+        layout.add_widget(sliders_scroll)
+        layout.add_widget(result_label)
+        layout.add_widget(btn_layout)
+        popup = Popup(title="Tune Scan Parameters", content=layout, size_hint=(0.9, 0.9))
+
+        def keep_settings(*args):
+            self.scan_params = {k: v for k, v in pipeline.params.items() if DEFAULT_SCAN_PARAMS[k] != v}
+
+        def insert_elements(*args):
+            keep_settings()
+            self.designer_logic.elements.extend(job["elements"])
+            self.designer_logic.save_history()
+            self.canvas_widget.redraw()
+            popup.dismiss()
+
+        btn_insert.bind(on_press=insert_elements)
+        btn_keep.bind(on_press=keep_settings)
+        btn_close.bind(on_press=popup.dismiss)
+        popup.bind(on_dismiss=lambda *args: job.update(id=job["id"] + 1))
+        result_label.text = "Scanning..."
+        popup.open()
+        run(None)
+
+    def on_batch_scan(self, instance):
+        """Opens a folder chooser and scans every image in the chosen folder into plan JSON files."""
+        file_system = self.file_dialog.file_system
+
+        def select_folder(selection, folder, filename):
+            self.file_dialog.dismiss()
+            self.run_batch_scan(selection[0] if selection else folder)
+
+        self.file_dialog.open("Select Folder to Batch Scan", "Scan Folder", select_folder, dirselect=True,
+                              filters=[lambda folder, filename: file_system.is_dir(filename)])
+
+    @traced(category="ui")
+    def run_batch_scan(self, folder):
+        """Scans every image in folder into plan JSON files in the background, with a progress popup.
+
+        The batch runs as its own `python -m batch_scan` process, so its pool
+        of worker processes starts from a module without Kivy instead of
+        re-importing the app; where no interpreter can be launched (Android)
+        it runs on a thread here. Values chosen in the tuner apply, as they
+        do to single scans.
+        """
+        from batch_scan import PROGRESS_PATTERN, SUMMARY_NAME
+        folder = os.path.abspath(folder)
+        output_dir = os.path.join(folder, 'scans')
+        layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+        status_label = Label(text=f"Scanning {folder}...", size_hint_y=None, height=dp(30))
+        progress_bar = ProgressBar(max=1.0, value=0, size_hint_y=None, height=dp(30))
+        cancel_btn = Button(text="Cancel", size_hint_y=None, height=dp(40))
+        layout.add_widget(status_label)
+        layout.add_widget(progress_bar)
+        layout.add_widget(cancel_btn)
+        popup = Popup(title="Batch Scan", content=layout, size_hint=(0.8, 0.4), auto_dismiss=False)
+        cancel_event = threading.Event()
+        processes = []
+
+        def on_progress(done, total, image):
+            status_label.text = f"Scanned {done}/{total}: {os.path.basename(image)}"
+            progress_bar.value = done / total if total else 1.0
+
+        def on_done(report):
+            popup.dismiss()
+            totals = report["totals"]
+            self.show_popup("Batch Scan Complete",
+                            f"{report['scanned']}/{report['images']} images scanned ({report['failed']} failed) "
+                            f"in {report['wall_seconds']:.1f}s.\n"
+                            f"Rooms: {totals['rooms']}, Walls: {totals['walls']}, Fixtures: {totals['fixtures']}\n"
+                            f"Plans written to:\n{report['output_dir']}")
+
+        def on_error(error):
             popup.dismiss()
-        btn_select.bind(on_press=select_image)
-        btn_cancel.bind(on_press=cancel_selection)
-        btn_layout.add_widget(btn_select)
-        btn_layout.add_widget(btn_cancel)
-        popup_content.add_widget(btn_layout)
+            self.show_popup("Batch Scan Error", f"Batch scan failed: {error}")
+
+        def run_process():
+            command = [sys.executable, '-m', 'batch_scan', folder, '-o', output_dir, '--watch-stdin',
+                       '--params', json.dumps(self.scan_params)]
+            if self.scan_mode:
+                command += ['--mode', self.scan_mode]
+            # Closing its stdin cancels the batch, also if the app exits first
+            process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE, encoding='utf-8',
+                                       errors='replace', env=dict(os.environ, PYTHONIOENCODING='utf-8'))
+            processes.append(process)
+            if cancel_event.is_set():
+                process.stdin.close()
+            for line in process.stdout:
+                match = PROGRESS_PATTERN.match(line.rstrip('\n'))
+                if match:
+                    done, total, image = int(match.group(1)), int(match.group(2)), match.group(3)
+                    Clock.schedule_once(lambda dt, args=(done, total, image): on_progress(*args), 0)
+            if process.wait() not in (0, 1):  # 1 means some images failed, which the report lists
+                raise RuntimeError(f"batch_scan exited with code {process.returncode}")
+            with open(os.path.join(output_dir, SUMMARY_NAME)) as f:
+                return json.load(f)
+
+        def run_here():
+            from batch_scan import scan_directory
+            from scanner import OCR_AVAILABLE
+            return scan_directory(
+                folder, output_dir, run_ocr=OCR_AVAILABLE, cancel_event=cancel_event, mode=self.scan_mode,
+                params=self.scan_params,
+                progress=lambda done, total, entry: Clock.schedule_once(
+                    lambda dt: on_progress(done, total, entry["image"]), 0))
+
+        def worker():
+            try:
+                report = run_here() if platform == 'android' or not sys.executable else run_process()
+                Clock.schedule_once(lambda dt: on_done(report), 0)
+            except Exception as e:
+                print(f"Error during batch scan: {e}")
+                Clock.schedule_once(lambda dt, error=e: on_error(error), 0)
+
+        def cancel_batch(*args):
+            cancel_event.set()
+            for process in processes:
+                process.stdin.close()
+            status_label.text = "Cancelling after the images in progress..."
+
+        cancel_btn.bind(on_press=cancel_batch)
         popup.open()
-    # --- Updated process_scanned_image with OCR for 4 numbers ---
+        threading.Thread(target=worker, daemon=True).start()
+
+    # --- Scanning runs on ScanService's worker thread; results land back here ---
+    @traced(category="ui")
     def process_scanned_image(self, image_path):
-        """Processes the selected scanned image to extract up to 4 dimensions (x, y, width, height) in order."""
-        try:
-            # --- Attempt OCR First ---
-            if OCR_AVAILABLE:
-                try:
-                    # 1. Open the image
-                    img = Image.open(image_path)
-
-                    img = img.convert('L')
-
-                    threshold = 150
-                    img = img.point(lambda x: 0 if x < threshold else 255, '1')
-                    # --------------------------
-
-                    # 2. Perform OCR
-                    custom_config = r'--oem 3 --psm 6' # Removed char whitelist to find any digits
-                    ocr_text = pytesseract.image_to_string(img, config=custom_config)
-                    print(f"DEBUG: OCR Extracted Text:\n{ocr_text}") # Debug output
-
-                    # 3. Parse OCR Text for Numbers
-                    number_pattern = re.compile(r'\d+(?:\.\d+)?')
-
-                    # Find all matches in the OCR text
-                    all_matches = number_pattern.findall(ocr_text)
-
-                    # Convert string matches to floats
-                    extracted_numbers = []
-                    for match in all_matches:
-                        try:
-                            num = float(match)
-                            extracted_numbers.append(num)
-                        except ValueError:
-                            # Ignore if conversion fails (shouldn't happen with the regex, but good practice)
-                            pass
-
-                    print(f"DEBUG: Found numbers list: {extracted_numbers}") # Debug print
-
-                    # 4. Assign found numbers or defaults
-
-                    # Initialize defaults
-                    x_val = 0.0
-                    y_val = 0.0
-                    width_val = 0.0
-                    height_val = 0.0
-
-                    num_found = len(extracted_numbers)
-                    if num_found == 0:
-                        # No numbers found
-                        pass # Keep defaults
-                        self.show_popup("Scan Complete", "Scan completed, but no numbers were found. All dimensions set to 0.")
-                    elif num_found == 1:
-
-                        height_val = extracted_numbers[0]
-                        self.show_popup("Scan Info", f"Scanner found 1 number. Assuming it's Height={height_val}. Others set to 0.")
-                    elif num_found == 2:
-                        # Assume first two: Width, Height (common pattern)
-                        width_val = extracted_numbers[0]
-                        height_val = extracted_numbers[1]
-                        self.show_popup("Scan Info", f"Scanner found 2 numbers. Assuming Width={width_val}, Height={height_val}. X, Y set to 0.")
-                    elif num_found == 3:
-
-                        x_val = extracted_numbers[0]
-                        width_val = extracted_numbers[1]
-                        height_val = extracted_numbers[2]
-                        self.show_popup("Scan Info", f"Scanner found 3 numbers. Assigned as X={x_val}, Width={width_val}, Height={height_val}. Y set to 0.")
-                    elif num_found >= 4:
-
-                        x_val = extracted_numbers[0]
-                        y_val = extracted_numbers[1]
-                        width_val = extracted_numbers[2]
-                        height_val = extracted_numbers[3]
-                        if num_found > 4:
-                             self.show_popup("Scan Info", f"Scanner found {num_found} numbers. Using the first four: X={x_val}, Y={y_val}, Width={width_val}, Height={height_val}.")
-                        else:
-                             self.show_popup("Scan Complete", f"Scanned successful. Found four numbers: X={x_val}, Y={y_val}, Width={width_val}, Height={height_val}")
-
-                    # 5. Update UI fields with final values
-                    self.dim_entries[0].text = str(x_val)       # X (m)
-                    self.dim_entries[1].text = str(y_val)       # Y (m)
-                    self.dim_entries[2].text = str(width_val)   # Width (m)
-                    self.dim_entries[3].text = str(height_val)  # Height (m)
-
-
-                except Exception as ocr_error:
-                    print(f"Error during scan processing: {ocr_error}")
-                    import traceback
-                    traceback.print_exc() # Print full traceback for debugging
-                    self.show_popup("Scan Error", f"Scan failed: {ocr_error}. Setting all dimensions to 0.")
-                    # Set all dimensions to default (0) on OCR error
-                    self.dim_entries[0].text = "0"
-                    self.dim_entries[1].text = "0"
-                    self.dim_entries[2].text = "0"
-                    self.dim_entries[3].text = "0"
+        """Scans the selected image in the background while showing progress with a Cancel button."""
+        from scan_modes import choose_mode
+        from scan_service import ScanTimeout
+        from scan_tiles import decodes_whole
+        layout = BoxLayout(orientation='vertical', padding=dp(10), spacing=dp(10))
+        stage_label = Label(text="Starting scan...", size_hint_y=None, height=dp(30))
+        progress_bar = ProgressBar(max=1.0, value=0, size_hint_y=None, height=dp(30))
+        cancel_btn = Button(text="Cancel", size_hint_y=None, height=dp(40))
+        layout.add_widget(stage_label)
+        layout.add_widget(progress_bar)
+        height = 0.3
+        # Tiles of a PNG or JPEG still come from one full-resolution decode (see scan_tiles.TileSource)
+        if (self.scan_mode or choose_mode(image_path)) == "tiled" and decodes_whole(image_path):
+            layout.add_widget(Label(text="Large compressed image: it is decoded whole, which takes about a byte "
+                                         "per pixel. Save it as BMP or PGM to scan it tile by tile.",
+                                    text_size=(dp(300), None), size_hint_y=None, height=dp(50)))
+            height = 0.4
+        layout.add_widget(cancel_btn)
+        # Kept low and without the dimming overlay so results streaming into the canvas stay visible
+        popup = Popup(title="Scanning Image", content=layout, size_hint=(0.8, height), pos_hint={'y': 0.02},
+                      overlay_color=(0, 0, 0, 0), auto_dismiss=False)
+
+        def on_progress(stage, fraction):
+            stage_label.text = f"Scanning image ({stage})..."
+            progress_bar.value = fraction
+
+        def on_partial(group, elements):
+            self.canvas_widget.set_provisional(group, elements)
+
+        def on_complete(result):
+            popup.dismiss()
+            self.canvas_widget.clear_provisional()
+            self.apply_scan_result(result)
 
+        def on_error(error):
+            popup.dismiss()
+            self.canvas_widget.clear_provisional()
+            if isinstance(error, ScanTimeout):
+                self.show_popup("Scan Timeout", str(error))
             else:
-                print("OCR library not available.")
-                self.show_popup("Scan Error", "OCR library (pytesseract) is not installed or not available. Setting all dimensions to 0.")
-                # Set all dimensions to default (0) if OCR not available
-                self.dim_entries[0].text = "0"
-                self.dim_entries[1].text = "0"
-                self.dim_entries[2].text = "0"
-                self.dim_entries[3].text = "0"
+                self.show_popup("Error", f"Failed to process image: {str(error)}")
 
-        except Exception as e:
-            print(f"Unexpected error processing scanned image: {e}")
-            import traceback
-            traceback.print_exc() # Print full traceback for debugging
-            self.show_popup("Error", f"Failed to process image: {str(e)}")
+        def cancel_scan(*args):
+            self.scan_service.cancel()
+            self.canvas_widget.clear_provisional()
+            popup.dismiss()
+
+        cancel_btn.bind(on_press=cancel_scan)
+        popup.open()
+        self.scan_service.start(image_path, on_progress=on_progress, on_complete=on_complete, on_error=on_error,
+                                params=self.scan_params, mode=self.scan_mode, on_partial=on_partial)
+
+    @traced(category="ui")
+    def apply_scan_result(self, result):
+        """Inserts scanned elements and calibrates the scale from dimension labels (main thread only).
+
+        Falls back to filling the dimension fields from the OCR numbers when
+        no label could be matched to a wall.
+        """
+        from scanner import OCR_AVAILABLE
+        if result["elements"]:
+            self.designer_logic.elements.extend(result["elements"])
+            self.designer_logic.save_history()
+            self.canvas_widget.redraw()
+        if not OCR_AVAILABLE:
+            print("OCR library not available.")
+            self.show_popup("Scan Error", "OCR library (pytesseract) is not installed or not available. Setting all dimensions to 0.")
+            self.set_dimension_fields(0, 0, 0, 0)
+            return
+        if result["ocr_error"] is not None:
+            ocr_error = result["ocr_error"]
+            self.show_popup("Scan Error", f"Scan failed: {ocr_error}. Setting all dimensions to 0.")
+            self.set_dimension_fields(0, 0, 0, 0)
+            return
+        dimensions = result["dimensions"]
+        if dimensions is not None and dimensions["meters_to_pixels_factor"]:
+            factor = dimensions["meters_to_pixels_factor"]
+            self.designer_logic.meters_to_pixels_factor = factor
+            self.canvas_widget.redraw()
+            self.show_popup("Scan Complete", f"Scale calibrated from {dimensions['labels_used']} dimension "
+                                             f"label(s): {factor:.1f} pixels per meter.")
+            return
+        self.apply_scanned_numbers(result["numbers"])
+
+    def apply_scanned_numbers(self, extracted_numbers):
+        """Assigns up to 4 OCR numbers to X, Y, Width and Height in order."""
+        # Initialize defaults
+        x_val = 0.0
+        y_val = 0.0
+        width_val = 0.0
+        height_val = 0.0
+
+        num_found = len(extracted_numbers)
+        if num_found == 0:
+            # No numbers found
+            self.show_popup("Scan Complete", "Scan completed, but no numbers were found. All dimensions set to 0.")
+        elif num_found == 1:
+            height_val = extracted_numbers[0]
+            self.show_popup("Scan Info", f"Scanner found 1 number. Assuming it's Height={height_val}. Others set to 0.")
+        elif num_found == 2:
+            # Assume first two: Width, Height (common pattern)
+            width_val = extracted_numbers[0]
+            height_val = extracted_numbers[1]
+            self.show_popup("Scan Info", f"Scanner found 2 numbers. Assuming Width={width_val}, Height={height_val}. X, Y set to 0.")
+        elif num_found == 3:
+            x_val = extracted_numbers[0]
+            width_val = extracted_numbers[1]
+            height_val = extracted_numbers[2]
+            self.show_popup("Scan Info", f"Scanner found 3 numbers. Assigned as X={x_val}, Width={width_val}, Height={height_val}. Y set to 0.")
+        elif num_found >= 4:
+            x_val = extracted_numbers[0]
+            y_val = extracted_numbers[1]
+            width_val = extracted_numbers[2]
+            height_val = extracted_numbers[3]
+            if num_found > 4:
+                self.show_popup("Scan Info", f"Scanner found {num_found} numbers. Using the first four: X={x_val}, Y={y_val}, Width={width_val}, Height={height_val}.")
+            else:
+                self.show_popup("Scan Complete", f"Scanned successful. Found four numbers: X={x_val}, Y={y_val}, Width={width_val}, Height={height_val}")
+
+        self.set_dimension_fields(x_val, y_val, width_val, height_val)
+
+    def set_dimension_fields(self, x_val, y_val, width_val, height_val):
+        self.dim_entries[0].text = str(x_val)       # X (m)
+        self.dim_entries[1].text = str(y_val)       # Y (m)
+        self.dim_entries[2].text = str(width_val)   # Width (m)
+        self.dim_entries[3].text = str(height_val)  # Height (m)
 
 class MainScreen(Screen):
     def __init__(self, **kwargs):
@@ -859,8 +1244,13 @@ class MainScreen(Screen):
         main_layout.add_widget(self.toolbar)
         main_layout.add_widget(canvas_area_layout)
         self.add_widget(main_layout)
+        Clock.schedule_interval(self.update_status, STATUS_INTERVAL)
 
     def update_status(self, dt):
+        profiler = self.toolbar.render_profiler
+        if profiler.enabled:
+            self.status_bar.text = profiler.summary()
+            return
 
         selected_info = "None"
         if self.designer_logic.selected_element:
@@ -874,5 +1264,21 @@ class FloorPlanKivyApp(App):
         self.icon = "AutoGen.png"
         return MainScreen()
 
+    def on_start(self):
+        from kivy.core.window import Window  # Not at module level: importing it opens a window
+        Window.bind(on_memorywarning=self.on_memory_warning)
+        # on_start runs before the first frame is drawn; wait one frame so background work never delays it
+        Clock.schedule_once(lambda dt: Clock.schedule_once(lambda dt: self.after_first_frame(), 0), 0)
+
+    def on_memory_warning(self, *args):
+        before, after = self.root.toolbar.trim_memory()
+        print(f"Low memory: trimmed; RSS {before['rss_bytes']} -> {after['rss_bytes']} bytes")
+
+    def after_first_frame(self):
+        # List the file dialog's start folder so the first Save/Import opens with it filled in
+        self.root.toolbar.file_dialog.prefetch()
+        if WARM_UP_SCANNER:
+            warm_up()
+
 if __name__ == '__main__':
     FloorPlanKivyApp().run()
@@ -0,0 +1,171 @@
+# memory_stats.py
+import gc
+import random
+import sys
+import time
+from collections import deque
+from kivy.clock import Clock
+from render_profiler import LAYERS
+
+DEFAULT_HISTORY_KEEP = 10  # Undo (and redo) steps kept by trim()
+ELEMENT_SAMPLE = 200  # Elements measured to estimate the size of the whole plan
+MONITOR_INTERVAL = 5  # Seconds between MemoryMonitor samples
+MONITOR_SAMPLES = 720  # An hour of samples at the default interval
+# Kivy cache categories trim() empties; whatever is still in use stays referenced by its widgets
+KIVY_CACHES = ("kv.image", "kv.texture")
+
+
+def deep_size(obj):
+    """Bytes used by obj and everything it contains, for the JSON-like values elements are made of."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key) + deep_size(value) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_size(item) for item in obj)
+    return size
+
+
+def _strings(strings):
+    return {"count": len(strings), "bytes": sum(sys.getsizeof(s) for s in strings)}
+
+
+def _elements(elements):
+    if not elements:
+        return {"count": 0, "bytes": 0}
+    sample = elements if len(elements) <= ELEMENT_SAMPLE else random.Random(0).sample(elements, ELEMENT_SAMPLE)
+    per_element = sum(deep_size(element) for element in sample) / len(sample)
+    return {"count": len(elements), "bytes": int(per_element * len(elements) + sys.getsizeof(elements))}
+
+
+def _labels(text_labels):
+    # A Label's cost is its rendered texture (RGBA) far more than the widget object
+    texture_bytes = 0
+    for label in text_labels.values():
+        if label.texture is not None:
+            width, height = label.texture.size
+            texture_bytes += width * height * 4
+    return {"count": len(text_labels), "bytes": texture_bytes + sum(sys.getsizeof(l) for l in text_labels.values())}
+
+
+def _fixture_templates():
+    # Only reported once the scanner is loaded; measuring must not import it
+    module = sys.modules.get("scan_fixtures")
+    if module is None:
+        return None
+    info = module.fixture_template.cache_info()
+    return {"count": info.currsize, "bytes": None}
+
+
+def process_rss():
+    """Resident memory of this process in bytes, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    import resource
+    return resident_pages * resource.getpagesize()
+
+
+def measure(logic, canvas_widget, render_profiler=None):
+    """Counts and sizes (in bytes) of the structures that grow during a session.
+
+    Returns {"time", "rss_bytes", "structures": {name: {"count", "bytes"}}}.
+    Element bytes are estimated from a sample; instruction bytes live in
+    Kivy's C structures and are reported as None, like the fixture template
+    cache, whose entries cannot be enumerated.
+    """
+    structures = {
+        "history": _strings(logic.history),
+        "redo_stack": _strings(logic.redo_stack),
+        "elements": _elements(logic.elements),
+        "text_labels": _labels(canvas_widget.text_labels),
+    }
+    for layer in LAYERS:
+        structures[f"instructions.{layer}"] = {"count": getattr(canvas_widget, layer).length(), "bytes": None}
+    templates = _fixture_templates()
+    if templates is not None:
+        structures["fixture_templates"] = templates
+    if render_profiler is not None:
+        structures["render_profile_samples"] = {"count": len(render_profiler.samples), "bytes": None}
+    return {"time": time.time(), "rss_bytes": process_rss(), "structures": structures}
+
+
+def trim(logic, canvas_widget, render_profiler=None, keep_history=DEFAULT_HISTORY_KEEP):
+    """Releases caches and compacts history; returns (before, after) measurements.
+
+    History keeps the newest keep_history snapshots, minus consecutive
+    duplicates, and the redo stack its next keep_history steps. Labels of
+    deleted text elements, the scanner's template cache, Kivy's image
+    caches and stored render profile samples are dropped. The plan itself
+    and the current undo step are never touched.
+    """
+    before = measure(logic, canvas_widget, render_profiler)
+    compacted = []
+    for snapshot in logic.history[-keep_history:]:
+        if not compacted or compacted[-1] != snapshot:
+            compacted.append(snapshot)
+    logic.history = compacted
+    logic.redo_stack = logic.redo_stack[-keep_history:]
+    element_ids = {id(element) for element in logic.elements}
+    for element_id in [key for key in canvas_widget.text_labels if key not in element_ids]:
+        label = canvas_widget.text_labels.pop(element_id)
+        if label.parent is canvas_widget:
+            canvas_widget.remove_widget(label)
+    module = sys.modules.get("scan_fixtures")
+    if module is not None:
+        module.fixture_template.cache_clear()
+    from kivy.cache import Cache
+    for category in KIVY_CACHES:
+        Cache.remove(category)
+    if render_profiler is not None:
+        render_profiler.samples.clear()
+    gc.collect()
+    return before, measure(logic, canvas_widget, render_profiler)
+
+
+class MemoryMonitor:
+    """Samples measure() every interval seconds through the Clock, keeping the last MONITOR_SAMPLES."""
+
+    def __init__(self, logic, canvas_widget, render_profiler=None, interval=MONITOR_INTERVAL):
+        self.logic = logic
+        self.canvas_widget = canvas_widget
+        self.render_profiler = render_profiler
+        self.interval = interval
+        self.samples = deque(maxlen=MONITOR_SAMPLES)
+        self._event = None
+
+    @property
+    def running(self):
+        return self._event is not None
+
+    def start(self):
+        if self._event is None:
+            self.sample()
+            self._event = Clock.schedule_interval(lambda dt: self.sample(), self.interval)
+
+    def stop(self):
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    def sample(self):
+        sample = measure(self.logic, self.canvas_widget, self.render_profiler)
+        self.samples.append(sample)
+        return sample
+
+
+def _mib(value):
+    return "-" if value is None else f"{value / (1024 * 1024):.2f}"
+
+
+def format_measurement(sample, first=None):
+    """Renders a measurement as text; with first, adds the change in bytes since that earlier sample."""
+    lines = [f"Process RSS: {_mib(sample['rss_bytes'])} MiB"]
+    if first is not None and sample["rss_bytes"] is not None and first["rss_bytes"] is not None:
+        minutes = (sample["time"] - first["time"]) / 60
+        lines[0] += f" ({_mib(sample['rss_bytes'] - first['rss_bytes'])} MiB in {minutes:.0f} min)"
+    lines.append(f"{'structure':<32} {'count':>8} {'MiB':>8}")
+    for name, entry in sample["structures"].items():
+        lines.append(f"{name:<32} {entry['count']:>8} {_mib(entry['bytes']):>8}")
+    return "\n".join(lines)
@@ -0,0 +1,268 @@
+# model_benchmark.py
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")  # The options below are ours, not Kivy's
+from appliances import APPLIANCE_SIZES
+from floorplan_designer import FloorPlanDesignerLogic
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+DEFAULT_MIN_TIME = 0.5  # Seconds each operation is repeated for
+MAX_ROUNDS = 10000  # Repetitions per operation at most, however fast it is
+HISTORY_DEPTH = 5  # Snapshots undone and redone per round
+QUERY_POINTS = 1000  # Distinct find_element_at positions, cycled through
+CELL = 400  # Side of the square room each group of elements is placed in, in canvas pixels
+# Share of each element kind in a synthetic plan; appliances cycle through every APPLIANCE_SIZES type
+ELEMENT_MIX = (("wall", 30), ("room", 10), ("polygon", 5), ("text", 5), ("appliance", 50))
+# Extent of the plan generate_floor_plan is timed on, in canvas pixels
+GENERATOR_EXTENT = (1000, 700)
+
+
+def _grid_columns(count):
+    rooms = count * dict(ELEMENT_MIX)["room"] // 100
+    return max(1, round(rooms ** 0.5))
+
+
+def plan_extent(count):
+    """Side of the square area a synthetic plan of count elements covers, margins included, in canvas pixels."""
+    return (_grid_columns(count) + 2) * CELL
+
+
+def synthetic_plan(count, seed=0):
+    """Returns count elements of every kind, filling a square grid of CELL-sized rooms one room at a time."""
+    rng = random.Random(seed)
+    kinds = [kind for kind, share in ELEMENT_MIX for _ in range(share)]
+    appliance_types = list(APPLIANCE_SIZES)
+    columns = _grid_columns(count)
+    elements = []
+    for index in range(count):
+        # Consecutive elements share a cell, so rooms and their contents overlap like in a real plan
+        cell = index * columns * columns // count
+        cell_x, cell_y = (cell % columns + 1) * CELL, (cell // columns + 1) * CELL
+        x, y = cell_x + rng.uniform(10, CELL - 110), cell_y + rng.uniform(10, CELL - 110)
+        kind = kinds[index % len(kinds)]
+        if kind == "wall":
+            if rng.random() < 0.5:
+                elements.append({"type": "wall", "x1": cell_x, "y1": y, "x2": cell_x + CELL, "y2": y})
+            else:
+                elements.append({"type": "wall", "x1": x, "y1": cell_y, "x2": x, "y2": cell_y + CELL})
+        elif kind == "room":
+            elements.append({"type": "room", "x": cell_x, "y": cell_y, "width": CELL, "height": CELL})
+        elif kind == "polygon":
+            elements.append({"type": "polygon", "x": x, "y": y, "width": 100, "height": 100,
+                             "points": [[0, 0], [1, 0], [1, 0.5], [0.5, 1], [0, 1]]})
+        elif kind == "text":
+            elements.append({"type": "text", "x": x, "y": y, "content": f"Label {index}", "fontSize": 14,
+                             "customSize": {"width": 80, "height": 20}})
+        else:
+            elements.append({"type": appliance_types[index % len(appliance_types)], "x": x, "y": y,
+                             "rotation": rng.choice((0, 90, 180, 270))})
+    return elements
+
+
+def _repeat(run, min_time):
+    """Calls run until min_time has passed (or MAX_ROUNDS calls); returns (calls, seconds measured).
+
+    run returns the seconds of the part it measured, so per-round setup is
+    left out of the figures.
+    """
+    calls = 0
+    measured = 0.0
+    started = time.perf_counter()
+    while calls < MAX_ROUNDS and (calls == 0 or time.perf_counter() - started < min_time):
+        measured += run()
+        calls += 1
+    return calls, measured
+
+
+def _timed(func):
+    def run():
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
+    return run
+
+
+def _peak_bytes(run):
+    """Peak memory allocated by Python during one call of run (its setup included), in bytes.
+
+    Traced in a separate call, as tracemalloc slows the timed runs down.
+    """
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _result(size, operation, ops, seconds, peak_bytes):
+    return {"size": size, "operation": operation, "ops": ops, "seconds": round(seconds, 6),
+            "ops_per_sec": round(ops / seconds, 2) if seconds else None, "peak_bytes": peak_bytes}
+
+
+def _make_canvas(logic):
+    # find_element_at is a method of the canvas widget; create it while the plan is empty so nothing is drawn
+    from widgets import FloorPlanCanvas
+    elements, logic.elements = logic.elements, []
+    canvas = FloorPlanCanvas(logic)
+    logic.elements = elements
+    return canvas
+
+
+def benchmark_size(count, min_time=DEFAULT_MIN_TIME, seed=0):
+    """Times the model operations on a synthetic plan of count elements; returns one result per operation.
+
+    undo and redo are timed over rounds of HISTORY_DEPTH steps and reported
+    per step. History is trimmed between rounds so memory stays flat.
+    """
+    logic = FloorPlanDesignerLogic()
+    elements = synthetic_plan(count, seed)
+    logic.elements = elements
+    canvas = _make_canvas(logic)
+    rng = random.Random(seed)
+    extent = plan_extent(count)
+    points = [(rng.uniform(0, extent), rng.uniform(0, extent)) for _ in range(QUERY_POINTS)]
+    layout = logic.save_layout_to_json()
+    queries = iter(range(sys.maxsize))
+
+    def reset():
+        logic.elements = elements
+        logic.history = logic.history[:1]
+        logic.redo_stack = []
+
+    def find():
+        canvas.find_element_at(*points[next(queries) % QUERY_POINTS])
+
+    def save_history():
+        logic.save_history()
+        del logic.history[1:-1]
+
+    def fill_history():
+        reset()
+        snapshot = json.dumps(elements)
+        logic.history.extend([snapshot] * HISTORY_DEPTH)
+
+    def undo():
+        fill_history()
+        started = time.perf_counter()
+        for _ in range(HISTORY_DEPTH):
+            logic.undo()
+        return time.perf_counter() - started
+
+    def redo():
+        fill_history()
+        for _ in range(HISTORY_DEPTH):
+            logic.undo()
+        started = time.perf_counter()
+        for _ in range(HISTORY_DEPTH):
+            logic.redo()
+        return time.perf_counter() - started
+
+    def load():
+        logic.load_layout_from_json(layout)
+        del logic.history[1:]
+
+    cases = [
+        ("find_element_at", _timed(find), 1),
+        ("save_history", _timed(save_history), 1),
+        ("undo", undo, HISTORY_DEPTH),
+        ("redo", redo, HISTORY_DEPTH),
+        ("save_layout_to_json", _timed(logic.save_layout_to_json), 1),
+        ("load_layout_from_json", _timed(load), 1),
+        ("validate_appliances_in_rooms", _timed(logic.validate_appliances_in_rooms), 1),
+    ]
+    results = []
+    for name, run, steps in cases:
+        calls, seconds = _repeat(run, min_time)
+        reset()
+        results.append(_result(count, name, calls * steps, seconds, _peak_bytes(run)))
+        reset()
+    return results
+
+
+def benchmark_generate(min_time=DEFAULT_MIN_TIME):
+    """Times generate_floor_plan, which replaces the plan and so does not depend on its size."""
+    logic = FloorPlanDesignerLogic()
+
+    def generate():
+        logic.generate_floor_plan(0, 0, *GENERATOR_EXTENT)
+        del logic.history[1:]
+
+    run = _timed(generate)
+    calls, seconds = _repeat(run, min_time)
+    return _result(None, "generate_floor_plan", calls, seconds, _peak_bytes(run))
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, min_time=DEFAULT_MIN_TIME, progress=None):
+    """Runs every operation at every plan size; returns the report written by main()."""
+    results = [benchmark_generate(min_time)]
+    for size in sizes:
+        results.extend(benchmark_size(size, min_time))
+        if progress is not None:
+            progress(size)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def _key(result):
+    return f"{result['operation']}@{result['size'] if result['size'] is not None else '-'}"
+
+
+def compare_reports(baseline, report):
+    """Renders the change in ops/sec and peak memory of every operation and size found in both reports."""
+    previous = {_key(result): result for result in baseline["results"]}
+    lines = [f"{'operation@size':<36} {'ops/s before':>13} {'ops/s now':>12} {'change':>8} {'peak change':>12}"]
+    for result in report["results"]:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        speed = (f"{result['ops_per_sec'] / old['ops_per_sec'] - 1:+.1%}"
+                 if old["ops_per_sec"] and result["ops_per_sec"] else "-")
+        memory = f"{result['peak_bytes'] / old['peak_bytes'] - 1:+.1%}" if old["peak_bytes"] else "-"
+        lines.append(f"{_key(result):<36} {old['ops_per_sec']:>13.1f} {result['ops_per_sec']:>12.1f} "
+                     f"{speed:>8} {memory:>12}")
+    return "\n".join(lines)
+
+
+def format_report(report):
+    """Renders the results as a plain-text table, one row per operation and size."""
+    lines = [f"{'operation':<30} {'size':>7} {'ops/s':>12} {'ms/op':>10} {'peak KiB':>10}"]
+    for result in report["results"]:
+        size = "-" if result["size"] is None else result["size"]
+        ms = 1000 / result["ops_per_sec"] if result["ops_per_sec"] else 0
+        lines.append(f"{result['operation']:<30} {size:>7} {result['ops_per_sec']:>12.1f} {ms:>10.3f} "
+                     f"{result['peak_bytes'] / 1024:>10.1f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the floor plan model on synthetic plans of growing size.")
+    parser.add_argument('-o', '--output', default='model_benchmark.json', help="Results file (default: %(default)s)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Element counts")
+    parser.add_argument('--min-time', type=float, default=DEFAULT_MIN_TIME,
+                        help="Seconds to repeat each operation for (default: %(default)s)")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+    report = run_benchmark(args.sizes, args.min_time, progress=lambda size: print(f"{size} elements done"))
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(format_report(report))
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare_reports(json.load(f), report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
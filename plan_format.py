@@ -0,0 +1,342 @@
+# plan_format.py
+import argparse
+import gzip
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+PLAN_EXTENSION = ".agplan"
+COMPRESSED_EXTENSION = ".gz"  # Gzipped JSON
+MAGIC = b"AGPL"
+GZIP_MAGIC = b"\x1f\x8b"
+FORMAT_VERSION = 1
+# magic, format version, flags, elements, strings, groups, metadata string,
+# then the offsets of the string offsets, string data, group directory and element order
+HEADER = struct.Struct("<4sHHIIIIQQQQ")
+GROUP = struct.Struct("<IIH")  # kind string (NO_STRING if the elements have no string type), rows, fields
+FIELD = struct.Struct("<IcQ")  # name string, column code, column offset
+NO_STRING = 0xFFFFFFFF
+INT64_RANGE = (-2 ** 63, 2 ** 63 - 1)
+# Column codes: the array typecode a column is stored as, per code
+COLUMN_TYPECODES = {b"q": "q", b"d": "d", b"s": "I", b"j": "I"}
+KIND_FIELD = b"t"  # The "type" key, stored once per group rather than per element
+
+
+def _column_code(key, value):
+    if key == "type" and isinstance(value, str):
+        return KIND_FIELD
+    if isinstance(value, int) and not isinstance(value, bool) and INT64_RANGE[0] <= value <= INT64_RANGE[1]:
+        return b"q"
+    if isinstance(value, float):
+        return b"d"
+    if isinstance(value, str):
+        return b"s"
+    return b"j"  # Anything else (lists, objects, booleans, null) is kept as JSON text
+
+
+def _starts_with(path, magic):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(magic)) == magic
+    except OSError:
+        return False
+
+
+def is_plan_file(path):
+    """True if path starts with the binary plan magic; JSON plans and unreadable files are not."""
+    return _starts_with(path, MAGIC)
+
+
+def is_compressed_file(path):
+    """True if path is gzip-compressed, whatever its name."""
+    return _starts_with(path, GZIP_MAGIC)
+
+
+class _StringTable:
+    def __init__(self):
+        self.index = {}
+
+    def add(self, text):
+        index = self.index.get(text)
+        if index is None:
+            index = self.index[text] = len(self.index)
+        return index
+
+
+def write_plan(path, layout):
+    """Writes a plan in the JSON schema (version, grid_size, meters_to_pixels_factor, elements) as a binary plan.
+
+    Elements are grouped by kind and shape (their keys, in order, and the
+    type of each value); every group stores each key as one typed column:
+    int64 and float64 numbers, indexes into a shared string table for
+    strings, or JSON text for anything else. An order table records where
+    each element sits, so read_plan() returns exactly the elements written.
+    Returns the number of bytes written.
+    """
+    strings = _StringTable()
+    metadata = {key: value for key, value in layout.items() if key != "elements"}
+    metadata_index = strings.add(json.dumps(metadata))
+    groups = {}
+    order = array("I")
+    for element in layout["elements"]:
+        shape = tuple((key, _column_code(key, value)) for key, value in element.items())
+        kind = element["type"] if (("type", KIND_FIELD) in shape) else None
+        group = groups.get((kind, shape))
+        if group is None:
+            columns = [array(COLUMN_TYPECODES[code]) if code != KIND_FIELD else None for _, code in shape]
+            group = groups[(kind, shape)] = {"index": len(groups), "rows": 0, "columns": columns}
+        for (key, code), column in zip(shape, group["columns"]):
+            if code in (b"q", b"d"):
+                column.append(element[key])
+            elif code == b"s":
+                column.append(strings.add(element[key]))
+            elif code == b"j":
+                column.append(strings.add(json.dumps(element[key])))
+        order.append(group["index"])
+        order.append(group["rows"])
+        group["rows"] += 1
+    for kind, shape in groups:
+        if kind is not None:
+            strings.add(kind)
+        for key, _ in shape:
+            strings.add(key)
+
+    body = bytearray(HEADER.size)
+
+    def append(data):
+        body.extend(b"\0" * (-len(body) % 8))  # Columns are 8-byte aligned for direct use from the memory map
+        offset = len(body)
+        if sys.byteorder != "little" and isinstance(data, array):
+            data = array(data.typecode, data)
+            data.byteswap()
+        body.extend(data.tobytes() if isinstance(data, array) else data)
+        return offset
+
+    column_offsets = {}
+    for (kind, shape), group in groups.items():
+        column_offsets[(kind, shape)] = [append(column) if column is not None else 0 for column in group["columns"]]
+    order_offset = append(order)
+    encoded = [text.encode("utf-8") for text in strings.index]
+    string_offsets = array("Q", [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+    string_offsets_offset = append(string_offsets)
+    string_data_offset = append(b"".join(encoded))
+    directory = bytearray()
+    for (kind, shape), group in groups.items():
+        kind_index = strings.index[kind] if kind is not None else NO_STRING
+        directory += GROUP.pack(kind_index, group["rows"], len(shape))
+        for (key, code), offset in zip(shape, column_offsets[(kind, shape)]):
+            directory += FIELD.pack(strings.index[key], code, offset)
+    groups_offset = append(bytes(directory))
+    HEADER.pack_into(body, 0, MAGIC, FORMAT_VERSION, 0, len(order) // 2, len(encoded), len(groups), metadata_index,
+                     string_offsets_offset, string_data_offset, groups_offset, order_offset)
+    with open(path, 'wb') as f:
+        f.write(body)
+    return len(body)
+
+
+class _Group:
+    __slots__ = ("kind", "rows", "fields")
+
+    def __init__(self, kind, rows, fields):
+        self.kind = kind
+        self.rows = rows
+        self.fields = fields  # [(key, code, column view)]
+
+
+class PlanFile:
+    """A binary plan opened through a read-only memory map; elements are decoded only when asked for.
+
+    len(plan) and plan.kinds() read the directory alone; plan[i] decodes one
+    element and plan.column(kind, key) one field of every element of a kind,
+    without building the others. elements() and layout() decode everything,
+    a column at a time. Use as a context manager, or call close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # An empty file cannot be mapped
+            self._file.close()
+            raise ValueError(f"{path} is not a binary plan")
+        self._views = []
+        buffer = self._view(memoryview(self._map))
+        if len(buffer) < HEADER.size or bytes(buffer[:len(MAGIC)]) != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a binary plan")
+        (_, version, _, self._count, string_count, group_count, metadata_index, string_offsets_offset,
+         string_data_offset, groups_offset, order_offset) = HEADER.unpack_from(buffer)
+        if version > FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path} uses plan format {version}; this version reads up to {FORMAT_VERSION}")
+        self._buffer = buffer
+        self._string_offsets = self._column(string_offsets_offset, "Q", string_count + 1)
+        self._string_data = string_data_offset
+        self._strings = [None] * string_count
+        self._order = self._column(order_offset, "I", self._count * 2)
+        self._groups = []
+        position = groups_offset
+        for _ in range(group_count):
+            kind_index, rows, field_count = GROUP.unpack_from(buffer, position)
+            position += GROUP.size
+            fields = []
+            for _ in range(field_count):
+                key_index, code, offset = FIELD.unpack_from(buffer, position)
+                position += FIELD.size
+                column = self._column(offset, COLUMN_TYPECODES[code], rows) if code != KIND_FIELD else None
+                fields.append((self.string(key_index), code, column))
+            kind = self.string(kind_index) if kind_index != NO_STRING else None
+            self._groups.append(_Group(kind, rows, fields))
+        self.metadata = json.loads(self.string(metadata_index))
+
+    def _view(self, view):
+        self._views.append(view)
+        return view
+
+    def _column(self, offset, typecode, count):
+        size = array(typecode).itemsize
+        view = self._buffer[offset:offset + count * size]
+        if sys.byteorder != "little":
+            column = array(typecode, view.tobytes())
+            column.byteswap()
+            return column
+        return self._view(self._view(view).cast(typecode))
+
+    def string(self, index):
+        text = self._strings[index]
+        if text is None:
+            start = self._string_data + self._string_offsets[index]
+            end = self._string_data + self._string_offsets[index + 1]
+            text = self._strings[index] = str(self._buffer[start:end], "utf-8")
+        return text
+
+    def _value(self, code, column, row, kind):
+        if code == KIND_FIELD:
+            return kind
+        if code == b"s":
+            return self.string(column[row])
+        if code == b"j":
+            return json.loads(self.string(column[row]))
+        return column[row]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("element index out of range")
+        group = self._groups[self._order[2 * index]]
+        row = self._order[2 * index + 1]
+        return {key: self._value(code, column, row, group.kind) for key, code, column in group.fields}
+
+    def kinds(self):
+        """Element count per kind, from the group directory alone."""
+        counts = {}
+        for group in self._groups:
+            counts[group.kind] = counts.get(group.kind, 0) + group.rows
+        return counts
+
+    def column(self, kind, key):
+        """Values of key for every element of kind that has it, in file order within each group."""
+        values = []
+        for group in self._groups:
+            if group.kind != kind:
+                continue
+            for name, code, column in group.fields:
+                if name == key:
+                    values.extend(self._decode_column(code, column, group))
+        return values
+
+    def _decode_column(self, code, column, group):
+        if code == KIND_FIELD:
+            return [group.kind] * group.rows
+        if code == b"s":
+            return [self.string(index) for index in column]
+        if code == b"j":
+            return [json.loads(self.string(index)) for index in column]
+        return column.tolist()
+
+    def elements(self):
+        """Every element, decoded a column at a time, in the order written."""
+        decoded = []
+        for group in self._groups:
+            keys = [key for key, _, _ in group.fields]
+            columns = [self._decode_column(code, column, group) for _, code, column in group.fields]
+            decoded.append([dict(zip(keys, values)) for values in zip(*columns)] if keys else
+                           [{} for _ in range(group.rows)])
+        order = self._order
+        return [decoded[order[i]][order[i + 1]] for i in range(0, 2 * self._count, 2)]
+
+    def layout(self):
+        """The plan in the JSON schema: the metadata plus "elements"."""
+        layout = dict(self.metadata)
+        layout["elements"] = self.elements()
+        return layout
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def read_plan(path):
+    """Reads a whole binary plan into the JSON schema."""
+    with PlanFile(path) as plan:
+        return plan.layout()
+
+
+def load_plan(path):
+    """Reads a binary, JSON or gzipped JSON plan file, telling them apart by their first bytes."""
+    if is_plan_file(path):
+        return read_plan(path)
+    if is_compressed_file(path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert floor plans between JSON and the binary plan format.")
+    parser.add_argument('source', help="Plan to convert (either format)")
+    parser.add_argument('destination', help=f"Output; binary if it ends in {PLAN_EXTENSION}, gzipped JSON if in "
+                                                      f"{COMPRESSED_EXTENSION}, JSON otherwise")
+    parser.add_argument('--verify', action='store_true', help="Read the output back and compare it to the source")
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    layout = load_plan(args.source)
+    loaded = time.perf_counter()
+    from save_service import write_layout
+    write_layout(args.destination, layout)
+    written = time.perf_counter()
+    print(f"{len(layout['elements'])} elements: read {os.path.getsize(args.source)} bytes in "
+          f"{(loaded - started) * 1000:.1f} ms, wrote {os.path.getsize(args.destination)} bytes in "
+          f"{(written - loaded) * 1000:.1f} ms")
+    if args.verify:
+        if json.dumps(load_plan(args.destination)) != json.dumps(layout):
+            print("Verification failed: the output does not match the source")
+            return 1
+        print("Verified: the output matches the source")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
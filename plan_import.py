@@ -0,0 +1,297 @@
+# plan_import.py
+import codecs
+import gzip
+import json
+import math
+import os
+import queue
+import threading
+import time
+import traceback
+from kivy.clock import Clock
+from plan_format import PlanFile, is_compressed_file, is_plan_file
+from tracing import span, traced
+
+BATCH_SIZE = 50  # Elements handed to the main thread at a time; drawing one batch should fit in a frame
+CHUNK_SIZE = 256 * 1024  # Bytes read from the file at a time
+FRAME_BUDGET = 0.008  # Seconds of each frame spent adding batches, so the UI keeps drawing and taking touches
+QUEUE_BATCHES = 64  # Parsed batches waiting for the main thread; the parser pauses beyond that
+_WHITESPACE = " \t\n\r"
+
+
+class _JsonReader:
+    """Decodes JSON values one at a time from a binary file read in chunks."""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+
+    def fill(self):
+        """Reads the next chunk, dropping what has been consumed; False at the end of the file."""
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk_size)
+        self.bytes_read += len(data)
+        self.eof = not data
+        self.buffer = self.buffer[self.pos:] + self._decoder.decode(data, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """The next character after whitespace, or "" at the end of the file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' near byte {self.bytes_read}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not isinstance(value, (dict, list, str)) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_plan(f, size=0, batch_size=BATCH_SIZE, position=None):
+    """Parses a JSON plan from binary file f as a stream of events, without holding the document in memory.
+
+    Yields ("elements", batch, fraction) for every batch_size elements and
+    finally ("metadata", {every other top-level key}, 1.0); fraction is the
+    share of size bytes read so far, as counted by position() (default:
+    the bytes f returned; pass the underlying file's tell when f
+    decompresses). Plans that are just an elements array (the old format)
+    have empty metadata.
+    """
+    reader = _JsonReader(f)
+    metadata = {}
+
+    def progress():
+        consumed = position() if position is not None else reader.bytes_read
+        return min(1.0, consumed / size) if size else 1.0
+
+    def elements():
+        reader.expect("[")
+        batch = []
+        if reader.peek() == "]":
+            reader.pos += 1
+            return
+        while True:
+            batch.append(reader.value())
+            if len(batch) >= batch_size:
+                yield "elements", batch, progress()
+                batch = []
+            separator = reader.peek()
+            reader.pos += 1
+            if separator == "]":
+                break
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' near byte {reader.bytes_read}")
+        if batch:
+            yield "elements", batch, progress()
+
+    if reader.peek() == "[":
+        yield from elements()
+    else:
+        reader.expect("{")
+        if reader.peek() == "}":
+            reader.pos += 1
+        else:
+            while True:
+                key = reader.value()
+                reader.expect(":")
+                if key == "elements" and reader.peek() == "[":
+                    yield from elements()
+                else:
+                    metadata[key] = reader.value()
+                separator = reader.peek()
+                reader.pos += 1
+                if separator == "}":
+                    break
+                if separator != ",":
+                    raise ValueError(f"Expected ',' or '}}' near byte {reader.bytes_read}")
+    yield "metadata", metadata, 1.0
+
+
+def iter_binary_plan(path, batch_size=BATCH_SIZE):
+    """The events of iter_json_plan for a binary plan; its metadata comes first, as the header holds it."""
+    with PlanFile(path) as plan:
+        yield "metadata", plan.metadata, 0.0
+        count = len(plan)
+        for start in range(0, count, batch_size):
+            end = min(count, start + batch_size)
+            yield "elements", [plan[index] for index in range(start, end)], end / count
+
+
+class PlanStats:
+    """Element counts per kind and the plan's bounds, gathered batch by batch on the import thread.
+
+    Hand it to the main thread only once the import is complete. Elements
+    with non-finite or malformed coordinates are counted but left out of
+    the bounds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.kinds = {}
+        self.bounds = None  # (x1, y1, x2, y2)
+
+    @staticmethod
+    def element_box(element):
+        """Approximate bounding box of an element; None for elements without a position."""
+        if "x1" in element:
+            x1, x2 = sorted((element["x1"], element["x2"]))
+            y1, y2 = sorted((element["y1"], element["y2"]))
+            return x1, y1, x2, y2
+        if "x" not in element:
+            return None
+        size = element.get("customSize", element)
+        return (element["x"], element["y"], element["x"] + size.get("width", 0),
+                element["y"] + size.get("height", 0))
+
+    def add(self, elements):
+        for element in elements:
+            kind = element.get("type")
+            self.kinds[kind] = self.kinds.get(kind, 0) + 1
+            try:
+                box = self.element_box(element)
+                if box is not None and not all(math.isfinite(value) for value in box):
+                    box = None
+            except (KeyError, TypeError, AttributeError):
+                box = None  # Malformed geometry is imported as is, just not measured
+            if box is None:
+                continue
+            if self.bounds is None:
+                self.bounds = box
+            else:
+                x1, y1, x2, y2 = box
+                bx1, by1, bx2, by2 = self.bounds
+                self.bounds = (min(bx1, x1), min(by1, y1), max(bx2, x2), max(by2, y2))
+        self.count += len(elements)
+
+    def summary(self, kinds=5):
+        """"N elements: " and the counts of the kinds most elements have."""
+        counts = sorted(self.kinds.items(), key=lambda item: -item[1])
+        text = f"{self.count} elements: " + ", ".join(f"{count} {kind}" for kind, count in counts[:kinds])
+        return text + (f" and {len(counts) - kinds} more kinds" if len(counts) > kinds else "")
+
+
+class PlanImporter:
+    """Imports a plan file (JSON, gzipped JSON or binary) on a worker thread, handing elements over a batch at a time.
+
+    The worker parses and counts; the main thread receives the batches
+    through the Clock, spending at most FRAME_BUDGET per frame on them, so
+    the start of a large plan is on screen and can be touched while the rest
+    is still being read. Callbacks run on the main thread:
+    on_metadata(metadata), on_batch(elements), on_progress(fraction),
+    on_complete(stats) (a PlanStats) and on_error(error). Starting a new import cancels
+    the previous one.
+    """
+
+    def __init__(self):
+        self._job_id = 0
+        self._cancel_event = None
+        self._drain_event = None
+
+    @property
+    def busy(self):
+        return self._drain_event is not None
+
+    def start(self, path, on_metadata=None, on_batch=None, on_progress=None, on_complete=None, on_error=None):
+        self.cancel()
+        self._job_id += 1
+        job_id = self._job_id
+        cancel_event = threading.Event()
+        self._cancel_event = cancel_event
+        events = queue.Queue(maxsize=QUEUE_BATCHES)
+        callbacks = (on_metadata, on_batch, on_progress, on_complete, on_error)
+        threading.Thread(target=self._run, args=(path, events, cancel_event), daemon=True).start()
+        self._drain_event = Clock.schedule_interval(lambda dt: self._drain(job_id, events, callbacks), 0)
+
+    def cancel(self):
+        """Stops the import; batches not yet handed over are discarded."""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self._cancel_event = None
+        if self._drain_event is not None:
+            self._drain_event.cancel()
+            self._drain_event = None
+        self._job_id += 1
+
+    @staticmethod
+    def _put(events, event, cancel_event):
+        while not cancel_event.is_set():
+            try:
+                events.put(event, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    @traced(category="io")
+    def _run(self, path, events, cancel_event):
+        stats = PlanStats()
+        try:
+            with open(path, 'rb') as f:
+                if is_plan_file(path):
+                    stream = iter_binary_plan(path)
+                elif is_compressed_file(path):
+                    stream = iter_json_plan(gzip.GzipFile(fileobj=f), os.fstat(f.fileno()).st_size, position=f.tell)
+                else:
+                    stream = iter_json_plan(f, os.fstat(f.fileno()).st_size)
+                for kind, payload, fraction in stream:
+                    if kind == "elements":
+                        stats.add(payload)
+                    if not self._put(events, (kind, payload, fraction), cancel_event):
+                        stream.close()
+                        return
+            self._put(events, ("done", stats, 1.0), cancel_event)
+        except Exception as e:
+            print(f"Error importing plan: {e}")
+            traceback.print_exc()
+            self._put(events, ("error", e, 0.0), cancel_event)
+
+    def _drain(self, job_id, events, callbacks):
+        on_metadata, on_batch, on_progress, on_complete, on_error = callbacks
+        started = time.perf_counter()
+        while job_id == self._job_id and time.perf_counter() - started < FRAME_BUDGET:
+            try:
+                kind, payload, fraction = events.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "elements":
+                with span("import.batch", "io", elements=len(payload)):
+                    if on_batch is not None:
+                        on_batch(payload)
+                if on_progress is not None:
+                    on_progress(fraction)
+            elif kind == "metadata":
+                if on_metadata is not None:
+                    on_metadata(payload)
+            else:
+                self._drain_event.cancel()
+                self._drain_event = None
+                self._cancel_event = None
+                callback = on_complete if kind == "done" else on_error
+                if callback is not None:
+                    callback(payload)
+                return
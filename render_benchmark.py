@@ -0,0 +1,226 @@
+# render_benchmark.py
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+from kivy.config import Config
+
+Config.set('graphics', 'window_state', 'hidden')  # Nothing is shown; frames are rendered into an Fbo
+from kivy.graphics import Fbo
+from floorplan_designer import FloorPlanDesignerLogic
+from model_benchmark import plan_extent, synthetic_plan
+from render_profiler import LAYERS
+from touch_recorder import ScriptedTouch
+from widgets import FloorPlanCanvas
+
+DEFAULT_SIZES = (100, 1000, 5000)  # Every frame redraws the whole plan, so larger plans take minutes
+VIEWPORT = (1280, 800)  # Size of the offscreen frame buffer, like a tablet screen
+MOVE_STEPS = 20  # Touch moves per drag and resize
+ROTATIONS = 4
+INTERACTIONS = ("redraw", "drag", "resize", "rotate", "undo")
+
+
+class RenderBench:
+    """A FloorPlanCanvas showing a plan and rendered into an offscreen Fbo after every scripted step.
+
+    Each step is timed in two parts: handle_ms, the event and the redraw it
+    triggers (building the instructions), and draw_ms, rendering the
+    instructions into the Fbo.
+    """
+
+    def __init__(self, elements, extent):
+        self.logic = FloorPlanDesignerLogic()
+        self.logic.elements = elements
+        self.logic.save_history()
+        self.canvas_widget = FloorPlanCanvas(self.logic, size=(extent, extent))
+        self.fbo = Fbo(size=VIEWPORT)
+        self.fbo.add(self.canvas_widget.canvas)
+        self.frames = []
+
+    def instructions(self):
+        return {layer: getattr(self.canvas_widget, layer).length() for layer in LAYERS}
+
+    def step(self, action):
+        """Runs action (one frame's input), renders the frame and records its timings."""
+        started = time.perf_counter()
+        action()
+        handled = time.perf_counter()
+        self.fbo.draw()
+        drawn = time.perf_counter()
+        self.frames.append({"handle_ms": (handled - started) * 1000, "draw_ms": (drawn - handled) * 1000})
+
+    def allocation_peak(self, action):
+        """Peak bytes Python allocates while action runs; traced in its own run, as tracing slows it."""
+        tracemalloc.start()
+        try:
+            action()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def touch(self, x, y, moves=()):
+        touch = ScriptedTouch(x, y)
+        self.step(lambda: self.canvas_widget.dispatch('on_touch_down', touch))
+        for mx, my in moves:
+            touch.move_to(mx, my)
+            self.step(lambda: self.canvas_widget.dispatch('on_touch_move', touch))
+        self.step(lambda: self.canvas_widget.dispatch('on_touch_up', touch))
+
+    def draggable(self):
+        """The top-most appliance that a touch on its corner would pick; None if there is none."""
+        canvas = self.canvas_widget
+        for element in reversed(self.logic.elements):
+            if "x" in element and element["type"] not in ("room", "houseBorder", "polygon", "text"):
+                if canvas.find_element_at(element["x"] + 2, element["y"] + 2) is element:
+                    return element
+        return None
+
+
+def _path(x, y, dx, dy):
+    return [(x + dx * step / MOVE_STEPS, y + dy * step / MOVE_STEPS) for step in range(1, MOVE_STEPS + 1)]
+
+
+def run_interaction(bench, name):
+    """Replays one scripted interaction on bench; returns the peak bytes allocated by one of its frames."""
+    logic = bench.logic
+    canvas = bench.canvas_widget
+    if name == "redraw":
+        bench.step(canvas.redraw)
+        return bench.allocation_peak(canvas.redraw)
+    if name == "drag":
+        element = bench.draggable()
+        if element is None:
+            return None
+        x, y = element["x"] + 2, element["y"] + 2
+        bench.touch(x, y, _path(x, y, 60, 40))
+        return bench.allocation_peak(canvas.redraw)
+    if name == "resize":
+        room = next((element for element in reversed(logic.elements) if element["type"] == "room"), None)
+        if room is None:
+            return None
+        logic.selected_element = room
+        x, y = room["x"] + room["width"], room["y"] + room["height"]  # The "se" handle
+        bench.touch(x, y, _path(x, y, -40, -30))
+        return bench.allocation_peak(canvas.redraw)
+    if name == "rotate":
+        logic.selected_element = bench.draggable()
+
+        def rotate():
+            logic.toggle_rotation()
+            canvas.redraw()
+
+        for _ in range(ROTATIONS):
+            bench.step(rotate)
+        return bench.allocation_peak(rotate)
+    if name == "undo":
+        def undo():
+            logic.undo()
+            canvas.redraw()
+
+        steps = len(logic.history) - 2  # Back to the loaded plan; history[0] is the empty initial state
+        for _ in range(max(0, steps - 1)):
+            bench.step(undo)
+        return bench.allocation_peak(undo) if steps > 0 else None  # The last undo
+    raise ValueError(f"Unknown interaction '{name}'")
+
+
+def _summarize(frames):
+    handle = [frame["handle_ms"] for frame in frames]
+    draw = [frame["draw_ms"] for frame in frames]
+    total = sorted(h + d for h, d in zip(handle, draw))
+    return {
+        "frames": len(frames),
+        "handle_ms": round(statistics.mean(handle), 3),
+        "draw_ms": round(statistics.mean(draw), 3),
+        "frame_ms": round(statistics.mean(total), 3),
+        "p95_frame_ms": round(total[min(len(total) - 1, int(len(total) * 0.95))], 3),
+    }
+
+
+def benchmark_size(count, seed=0):
+    """Replays every interaction, in order, on a synthetic plan of count elements; returns one result each."""
+    bench = RenderBench(synthetic_plan(count, seed), plan_extent(count))
+    results = []
+    for name in INTERACTIONS:
+        bench.frames = []
+        peak = run_interaction(bench, name)
+        if not bench.frames:
+            continue
+        result = {"size": count, "interaction": name}
+        result.update(_summarize(bench.frames))
+        result["instructions"] = bench.instructions()
+        result["alloc_peak_bytes"] = peak
+        results.append(result)
+    return results
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, progress=None):
+    results = []
+    for size in sizes:
+        results.extend(benchmark_size(size))
+        if progress is not None:
+            progress(size)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "viewport": VIEWPORT,
+        "results": results,
+    }
+
+
+def _key(result):
+    return f"{result['interaction']}@{result['size']}"
+
+
+def compare_reports(baseline, report):
+    """Renders the change in mean frame time and instruction count of every interaction found in both reports."""
+    previous = {_key(result): result for result in baseline["results"]}
+    lines = [f"{'interaction@size':<20} {'ms before':>10} {'ms now':>10} {'change':>8} {'instr change':>13}"]
+    for result in report["results"]:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        old_instructions, new_instructions = sum(old["instructions"].values()), sum(result["instructions"].values())
+        speed = f"{result['frame_ms'] / old['frame_ms'] - 1:+.1%}" if old["frame_ms"] else "-"
+        lines.append(f"{_key(result):<20} {old['frame_ms']:>10.2f} {result['frame_ms']:>10.2f} {speed:>8} "
+                     f"{new_instructions - old_instructions:>+13}")
+    return "\n".join(lines)
+
+
+def format_report(report):
+    """Renders the results as a plain-text table, one row per interaction and plan size."""
+    lines = [f"{'interaction':<12} {'size':>7} {'frames':>6} {'handle ms':>10} {'draw ms':>8} {'p95 ms':>8} "
+             f"{'instr':>8} {'alloc KiB':>10}"]
+    for result in report["results"]:
+        peak = "-" if result["alloc_peak_bytes"] is None else f"{result['alloc_peak_bytes'] / 1024:.0f}"
+        lines.append(f"{result['interaction']:<12} {result['size']:>7} {result['frames']:>6} "
+                     f"{result['handle_ms']:>10.2f} {result['draw_ms']:>8.2f} {result['p95_frame_ms']:>8.2f} "
+                     f"{sum(result['instructions'].values()):>8} {peak:>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark canvas rendering offscreen with scripted interactions.")
+    parser.add_argument('-o', '--output', default='render_benchmark.json', help="Results file (default: %(default)s)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Element counts")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+    report = run_benchmark(args.sizes, progress=lambda size: print(f"{size} elements done"))
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(format_report(report))
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare_reports(json.load(f), report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
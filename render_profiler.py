@@ -0,0 +1,150 @@
+# render_profiler.py
+import json
+import os
+import time
+from collections import defaultdict, deque
+from kivy.clock import Clock
+
+# FloorPlanCanvas methods timed while profiling; touch handlers include any redraw they trigger
+DRAW_METHODS = ("draw_grid", "draw_elements", "draw_provisional", "draw_selection")
+TOUCH_METHODS = ("on_touch_down", "on_touch_move", "on_touch_up")
+LAYERS = ("grid_layer", "elements_layer", "provisional_layer", "selection_layer", "preview_layer")
+DEFAULT_MAX_SAMPLES = 1800  # Frames kept for dump(); about half a minute at 60 FPS
+SUMMARY_FRAMES = 60  # Frames the status bar summary averages over
+
+
+class RenderProfiler:
+    """Opt-in per-frame timing of a FloorPlanCanvas.
+
+    While enabled, the draw and touch methods of the canvas (and
+    draw_element, per element type) are wrapped on the instance, and at the
+    end of every frame their accumulated times, the number of instructions
+    on each layer and the frame time are stored as one sample. Disabled, the
+    canvas runs its own methods untouched.
+    """
+
+    def __init__(self, canvas_widget, max_samples=DEFAULT_MAX_SAMPLES):
+        self.canvas_widget = canvas_widget
+        self.samples = deque(maxlen=max_samples)
+        self.enabled = False
+        self._event = None
+        self._reset_frame()
+
+    def _reset_frame(self):
+        self._method_ms = defaultdict(float)
+        self._calls = defaultdict(int)
+        self._type_ms = defaultdict(float)
+        self._type_instructions = defaultdict(int)
+
+    def enable(self):
+        if self.enabled:
+            return
+        widget = self.canvas_widget
+        for name in DRAW_METHODS + TOUCH_METHODS:
+            setattr(widget, name, self._timed(name, getattr(widget, name)))
+        widget.draw_element = self._timed_element(widget.draw_element)
+        self.samples.clear()
+        self._reset_frame()
+        self._event = Clock.schedule_interval(self._end_frame, 0)
+        self.enabled = True
+        widget.redraw()  # Sample a full redraw straight away
+
+    def disable(self):
+        if not self.enabled:
+            return
+        for name in DRAW_METHODS + TOUCH_METHODS + ("draw_element",):
+            vars(self.canvas_widget).pop(name, None)  # Falls back to the class's method
+        self._event.cancel()
+        self._event = None
+        self.enabled = False
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def _timed(self, name, method):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._method_ms[name] += (time.perf_counter() - start) * 1000
+                self._calls[name] += 1
+        return wrapper
+
+    def _timed_element(self, method):
+        def wrapper(element, layer=None):
+            target = layer if layer is not None else self.canvas_widget.elements_layer
+            before = target.length()
+            start = time.perf_counter()
+            try:
+                return method(element, layer)
+            finally:
+                element_type = element.get('type', 'unknown')
+                self._type_ms[element_type] += (time.perf_counter() - start) * 1000
+                self._type_instructions[element_type] += target.length() - before
+        return wrapper
+
+    def _end_frame(self, dt):
+        widget = self.canvas_widget
+        self.samples.append({
+            "time": time.time(),
+            "frame_ms": round(dt * 1000, 3),
+            "methods_ms": {name: round(ms, 3) for name, ms in self._method_ms.items()},
+            "calls": dict(self._calls),
+            "types_ms": {name: round(ms, 3) for name, ms in self._type_ms.items()},
+            "type_instructions": dict(self._type_instructions),
+            "instructions": {layer: getattr(widget, layer).length() for layer in LAYERS},
+        })
+        self._reset_frame()
+
+    def summary(self, frames=SUMMARY_FRAMES):
+        """One line for the status bar: FPS, worst frame and mean ms per frame over the last frames."""
+        recent = list(self.samples)[-frames:]
+        if not recent:
+            return "Profiling: waiting for frames"
+        total_ms = sum(sample["frame_ms"] for sample in recent)
+        fps = len(recent) * 1000 / total_ms if total_ms else 0
+        worst = max(sample["frame_ms"] for sample in recent)
+
+        def mean(*names):
+            return sum(sample["methods_ms"].get(name, 0) for sample in recent for name in names) / len(recent)
+
+        type_ms = defaultdict(float)
+        for sample in recent:
+            for element_type, ms in sample["types_ms"].items():
+                type_ms[element_type] += ms
+        slowest = max(type_ms, key=type_ms.get) if type_ms else "-"
+        instructions = sum(recent[-1]["instructions"].values())
+        return (f"FPS {fps:.0f} | worst {worst:.1f} ms | grid {mean('draw_grid'):.2f} "
+                f"elements {mean('draw_elements', 'draw_provisional'):.2f} selection {mean('draw_selection'):.2f} "
+                f"touch {mean(*TOUCH_METHODS):.2f} ms/frame | {instructions} instr | slowest type: {slowest}")
+
+    def type_totals(self):
+        """Returns {element type: {"ms", "instructions", "frames"}} summed over the stored samples."""
+        totals = defaultdict(lambda: {"ms": 0.0, "instructions": 0, "frames": 0})
+        for sample in self.samples:
+            for element_type, ms in sample["types_ms"].items():
+                entry = totals[element_type]
+                entry["ms"] = round(entry["ms"] + ms, 3)
+                entry["instructions"] += sample["type_instructions"].get(element_type, 0)
+                entry["frames"] += 1
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["ms"]))
+
+    def dump(self, path):
+        """Writes the stored samples and the per element type totals to a JSON file; returns path."""
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "elements": len(self.canvas_widget.designer_logic.elements),
+                "summary": self.summary(),
+                "types": self.type_totals(),
+                "samples": list(self.samples),
+            }, f, indent=4)
+        return path
@@ -0,0 +1,109 @@
+# save_service.py
+import datetime
+import gzip
+import json
+import os
+import threading
+import traceback
+from kivy.clock import Clock
+from plan_format import COMPRESSED_EXTENSION, PLAN_EXTENSION, write_plan
+from tracing import span, traced
+
+COMPRESS_LEVEL = 6  # gzip level; higher levels save little on plan JSON and take much longer
+
+
+def snapshot(logic):
+    """The plan to save, taken on the main thread; cheap enough to do between frames.
+
+    Elements are copied one level deep: edits replace an element's values
+    rather than changing nested lists or dicts in place, so the worker can
+    serialize the copy while the user keeps editing.
+    """
+    return {
+        'version': '1.0',
+        'created': str(datetime.datetime.now()),
+        'elements': [dict(element) for element in logic.elements],
+        'grid_size': logic.grid_size,
+        'meters_to_pixels_factor': logic.meters_to_pixels_factor,
+    }
+
+
+def write_layout(path, layout):
+    """Writes layout to path atomically; returns the bytes written.
+
+    The format follows the name: binary for PLAN_EXTENSION, gzipped JSON
+    for COMPRESSED_EXTENSION, JSON otherwise. The file is written and
+    flushed to disk under a temporary name next to path, then renamed over
+    it, so a crash mid-save leaves the previous file intact.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if path.endswith(PLAN_EXTENSION):
+            write_plan(tmp_path, layout)
+            with open(tmp_path, 'rb+') as f:
+                os.fsync(f.fileno())
+        else:
+            data = json.dumps(layout, indent=4).encode('utf-8')
+            with open(tmp_path, 'wb') as f:
+                if path.endswith(COMPRESSED_EXTENSION):
+                    # mtime=0 keeps the output identical for identical plans
+                    with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=COMPRESS_LEVEL, mtime=0) as compressed:
+                        compressed.write(data)
+                else:
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return size
+
+
+class SaveService:
+    """Serializes and writes plans on a worker thread.
+
+    on_complete(path, size) and on_error(error) are delivered on the main
+    thread via the Kivy Clock. Saves run one at a time in the order they
+    were started, so the last save to a path wins. Workers are not daemon
+    threads: quitting the app waits for a save in progress to finish.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._pending = 0
+
+    @property
+    def busy(self):
+        return self._pending > 0
+
+    def save(self, path, layout, on_complete=None, on_error=None):
+        """Starts writing layout (see snapshot()) to path and returns immediately."""
+        self._pending += 1
+        self._thread = threading.Thread(target=self._run, args=(self._thread, path, layout, on_complete, on_error))
+        self._thread.start()
+
+    def _done(self, callback, *args):
+        def deliver(dt):
+            self._pending -= 1
+            if callback is not None:
+                callback(*args)
+        Clock.schedule_once(deliver, 0)
+
+    @traced(category="io")
+    def _run(self, previous, path, layout, on_complete, on_error):
+        if previous is not None:
+            previous.join()  # Keeps saves in the order they were started
+        try:
+            with span("save.write", "io", path=path):
+                size = write_layout(path, layout)
+        except Exception as e:
+            print(f"Error saving file: {e}")
+            traceback.print_exc()
+            self._done(on_error, e)
+        else:
+            self._done(on_complete, path, size)
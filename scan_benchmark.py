@@ -0,0 +1,318 @@
+# scan_benchmark.py
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")  # The options below are ours, not Kivy's
+import cv2
+import numpy as np
+from appliances import APPLIANCE_SIZES, DEFAULT_APPLIANCE_SIZE
+from floorplan_designer import FloorPlanDesignerLogic
+from scan_fixtures import FIXTURE_TYPES, fixture_template
+from scan_modes import SCAN_MODES, iter_scan_with_mode
+from scanner import DEFAULT_SCAN_PARAMS, collect_scan
+
+DEFAULT_SIZES = (1200, 2400, 4800)
+DEFAULT_NOISE_LEVELS = (0, 12, 30)  # Standard deviation of the added Gaussian noise, in gray levels
+
+# Extent of the plan handed to FloorPlanDesignerLogic.generate_floor_plan, in canvas pixels
+GENERATOR_WIDTH = 1000
+
+# A detection matches ground truth within this many pixels, or this fraction of the image's longest side
+MATCH_MIN_PIXELS = 8
+MATCH_RELATIVE = 0.01
+
+
+# ---- Synthetic plans ----
+
+def generate_plan(seed):
+    """Returns the generator's elements for a house whose aspect ratio is picked from seed."""
+    rng = np.random.default_rng(seed)
+    width = GENERATOR_WIDTH
+    height = round(width / rng.uniform(1.2, 1.8))
+    logic = FloorPlanDesignerLogic()
+    logic.generate_floor_plan(0, 0, width, height)
+    return logic.elements, (width, height)
+
+
+def _element_box(element):
+    """Returns (x, y, width, height) of an element in canvas pixels, using the appliance footprint when unsized."""
+    if "width" in element and "height" in element:
+        return element["x"], element["y"], element["width"], element["height"]
+    width, height = APPLIANCE_SIZES.get(element["type"], DEFAULT_APPLIANCE_SIZE)
+    return element["x"], element["y"], width, height
+
+
+def rasterize_plan(elements, extent, size, noise=0, seed=0):
+    """Draws plan elements as a scanned-looking grayscale image; returns (image, ground_truth).
+
+    The longest side of the image is size pixels. The canvas' y axis points
+    up, so rows are flipped. The house border is drawn as a thick wall and
+    rooms as thinner ones; fixtures the scanner knows use its own symbols,
+    other appliances are plain outlines that act as clutter. ground_truth
+    holds "walls" as segments, "rooms" as boxes and "fixtures" as
+    (type, box), all in image pixels.
+    """
+    width, height = extent
+    pad = 0.05 * max(width, height)
+    scale = size / (max(width, height) + 2 * pad)
+    shape = (int(round((height + 2 * pad) * scale)), int(round((width + 2 * pad) * scale)))
+    image = np.full(shape, 255, dtype=np.uint8)
+    wall_thickness = max(3, int(round(size * 0.006)))
+
+    def to_image(x, y, w, h):
+        """Canvas box (y up) to an image box (y down)."""
+        return (x + pad) * scale, shape[0] - (y + h + pad) * scale, w * scale, h * scale
+
+    ground_truth = {"walls": [], "rooms": [], "fixtures": []}
+    for element in elements:
+        kind = element["type"]
+        x, y, w, h = to_image(*_element_box(element))
+        corners = (int(round(x)), int(round(y))), (int(round(x + w)), int(round(y + h)))
+        if kind in ("houseBorder", "room"):
+            thickness = wall_thickness if kind == "houseBorder" else max(2, wall_thickness // 2)
+            cv2.rectangle(image, corners[0], corners[1], 0, thickness)
+            ground_truth["walls"].extend([(x, y, x + w, y), (x, y + h, x + w, y + h),
+                                          (x, y, x, y + h), (x + w, y, x + w, y + h)])
+            if kind == "room":
+                ground_truth["rooms"].append((x, y, w, h))
+        elif kind in FIXTURE_TYPES:
+            if kind == "door":  # The footprint is the leaf; the symbol is the square it sweeps
+                x, y, w, h = x, y + h - max(w, h), max(w, h), max(w, h)
+            rotation = element.get("rotation", 0) // 90 * 90
+            box_w, box_h = (h, w) if rotation % 180 else (w, h)
+            left, top = int(round(x + (w - box_w) / 2)), int(round(y + (h - box_h) / 2))
+            mask = fixture_template(kind, max(2, int(round(box_w))), max(2, int(round(box_h))), rotation)
+            bottom, right = min(shape[0], top + mask.shape[0]), min(shape[1], left + mask.shape[1])
+            if left < 0 or top < 0 or bottom <= top or right <= left:
+                continue
+            ink = (255 * (1 - np.clip(mask[:bottom - top, :right - left] * 2, 0, 1))).astype(np.uint8)
+            np.minimum(image[top:bottom, left:right], ink, out=image[top:bottom, left:right])
+            ground_truth["fixtures"].append((kind, (left, top, right - left, bottom - top)))
+        else:
+            cv2.rectangle(image, corners[0], corners[1], 0, 1)
+    if noise:
+        rng = np.random.default_rng(seed)
+        image = cv2.GaussianBlur(image, (3, 3), 0)  # Scanner optics soften the strokes before the sensor noise
+        noisy = image.astype(np.float32) + rng.normal(0, noise, image.shape).astype(np.float32)
+        image = np.clip(noisy, 0, 255).astype(np.uint8)
+    return image, ground_truth
+
+
+# ---- Scoring ----
+
+def _segment_coverage(segment, others, tolerance):
+    """Fraction of segment's length lying within tolerance of, and parallel to, any of others."""
+    x1, y1, x2, y2 = segment
+    length = np.hypot(x2 - x1, y2 - y1)
+    if length == 0 or len(others) == 0:
+        return 0.0
+    ux, uy = (x2 - x1) / length, (y2 - y1) / length
+    others = np.asarray(others, dtype=np.float64).reshape(-1, 4)
+    # Offsets of the other segments' endpoints across and along segment's line
+    across = np.abs((others[:, [0, 2]] - x1) * uy - (others[:, [1, 3]] - y1) * ux)
+    along = (others[:, [0, 2]] - x1) * ux + (others[:, [1, 3]] - y1) * uy
+    near = (across <= tolerance).all(axis=1)
+    intervals = np.sort(np.clip(along[near], 0, length), axis=1)
+    covered = 0.0
+    end = 0.0
+    for start, stop in intervals[np.argsort(intervals[:, 0])]:
+        if stop > end:
+            covered += stop - max(start, end)
+            end = stop
+    return covered / length
+
+
+def score_walls(detected, expected, tolerance):
+    """Precision and recall of wall segments: a segment counts if at least half of it is covered by the other set."""
+    true_positives = sum(_segment_coverage(s, expected, tolerance) >= 0.5 for s in detected)
+    recalled = sum(_segment_coverage(s, detected, tolerance) >= 0.5 for s in expected)
+    return _rates(true_positives, len(detected), recalled, len(expected))
+
+
+def box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    overlap_w = min(ax + aw, bx + bw) - max(ax, bx)
+    overlap_h = min(ay + ah, by + bh) - max(ay, by)
+    if overlap_w <= 0 or overlap_h <= 0:
+        return 0.0
+    overlap = overlap_w * overlap_h
+    return overlap / (aw * ah + bw * bh - overlap)
+
+
+def score_boxes(detected, expected, min_iou):
+    """Precision and recall of labelled boxes, greedily matching each expected box to its best unused detection.
+
+    detected and expected are (label, box) pairs; labels must be equal to match.
+    """
+    used = set()
+    matched = 0
+    for label, box in expected:
+        best, best_iou = None, min_iou
+        for index, (other_label, other_box) in enumerate(detected):
+            if index not in used and other_label == label:
+                iou = box_iou(box, other_box)
+                if iou >= best_iou:
+                    best, best_iou = index, iou
+        if best is not None:
+            used.add(best)
+            matched += 1
+    return _rates(matched, len(detected), matched, len(expected))
+
+
+def _rates(true_positives, detected, recalled, expected):
+    return {
+        "detected": detected,
+        "expected": expected,
+        "precision": round(true_positives / detected, 4) if detected else None,
+        "recall": round(recalled / expected, 4) if expected else None,
+    }
+
+
+def score_scan(elements, ground_truth, tolerance):
+    """Scores scanned elements against the ground truth of rasterize_plan."""
+    walls = [(e["x1"], e["y1"], e["x2"], e["y2"]) for e in elements if e["type"] == "wall"]
+    rooms = [("room", (e["x"], e["y"], e["width"], e["height"])) for e in elements if e["type"] in ("room", "polygon")]
+    fixtures = [(e["type"], (e["x"], e["y"], e["width"], e["height"])) for e in elements if e["type"] in FIXTURE_TYPES]
+    return {
+        "walls": score_walls(walls, ground_truth["walls"], tolerance),
+        "rooms": score_boxes(rooms, [("room", box) for box in ground_truth["rooms"]], 0.5),
+        "fixtures": score_boxes(fixtures, ground_truth["fixtures"], 0.3),
+    }
+
+
+# ---- Runs ----
+
+def benchmark_case(image_path, ground_truth, mode=None, params=None, repeat=3):
+    """Scans image_path repeat times without a cache; returns median seconds per stage and in total, plus scores."""
+    stage_runs = {}
+    totals = []
+    elements = []
+    for _ in range(repeat):
+        timings = {}
+        started = time.perf_counter()
+        elements = collect_scan(iter_scan_with_mode(image_path, mode, params, timings=timings))[0]
+        totals.append(time.perf_counter() - started)
+        for stage, seconds in timings.items():
+            stage_runs.setdefault(stage, []).append(seconds)
+    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    tolerance = max(MATCH_MIN_PIXELS, MATCH_RELATIVE * max(image.shape))
+    return {
+        "total_seconds": round(statistics.median(totals), 4),
+        "stage_seconds": {stage: round(statistics.median(runs), 4) for stage, runs in stage_runs.items()},
+        "scores": score_scan(elements, ground_truth, tolerance),
+    }
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, noise_levels=DEFAULT_NOISE_LEVELS, seeds=(0,), mode=None, params=None,
+                  repeat=3, image_dir=None, progress=None):
+    """Generates a plan per seed, rasterizes it at every size and noise level, and benchmarks each image.
+
+    Images are written to image_dir (a temporary folder if None) so every
+    mode sees the same files. Returns the report written by main.
+    """
+    cases = [(seed, size, noise) for seed in seeds for size in sizes for noise in noise_levels]
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = image_dir or temp_dir
+        os.makedirs(folder, exist_ok=True)
+        plans = {seed: generate_plan(seed) for seed in seeds}
+        for index, (seed, size, noise) in enumerate(cases):
+            name = f"plan_s{seed}_{size}px_n{noise}"
+            elements, extent = plans[seed]
+            image, ground_truth = rasterize_plan(elements, extent, size, noise, seed)
+            image_path = os.path.join(folder, name + ".png")
+            cv2.imwrite(image_path, image)
+            result = {"name": name, "seed": seed, "size": size, "noise": noise,
+                      "width": image.shape[1], "height": image.shape[0]}
+            result.update(benchmark_case(image_path, ground_truth, mode, params, repeat))
+            results.append(result)
+            if progress is not None:
+                progress(index + 1, len(cases), result)
+    return {
+        "created": str(datetime.datetime.now()),
+        "mode": mode or "auto",
+        "repeat": repeat,
+        "params": dict(DEFAULT_SCAN_PARAMS, **(params or {})),
+        "cases": results,
+        "summary": summarize(results),
+    }
+
+
+def summarize(results):
+    """Mean total seconds and mean precision/recall per group over all cases."""
+    summary = {"total_seconds": round(statistics.mean(r["total_seconds"] for r in results), 4) if results else None}
+    for group in ("walls", "rooms", "fixtures"):
+        for rate in ("precision", "recall"):
+            values = [r["scores"][group][rate] for r in results if r["scores"][group][rate] is not None]
+            summary[f"{group}_{rate}"] = round(statistics.mean(values), 4) if values else None
+    return summary
+
+
+def compare_reports(baseline, report):
+    """Renders the change of every summary figure, and of each matching case's total time, against baseline."""
+    lines = [f"{'metric':<24} {'baseline':>10} {'current':>10} {'change':>10}"]
+
+    def add(name, old, new):
+        if old is None or new is None:
+            change = "-"
+        elif name.endswith("seconds") and old:
+            change = f"{(new - old) / old:+.1%}"
+        else:
+            change = f"{new - old:+.4f}"
+        lines.append(f"{name:<24} {str(old):>10} {str(new):>10} {change:>10}")
+
+    for name, value in report["summary"].items():
+        add(name, baseline["summary"].get(name), value)
+    previous = {case["name"]: case for case in baseline["cases"]}
+    for case in report["cases"]:
+        if case["name"] in previous:
+            add(f"{case['name']} seconds", previous[case["name"]]["total_seconds"], case["total_seconds"])
+    return "\n".join(lines)
+
+
+def format_report(report):
+    """Renders the benchmark results as a plain-text table."""
+    lines = [f"{'case':<28} {'secs':>7} {'wall P/R':>11} {'room P/R':>11} {'fixt. P/R':>11}"]
+
+    def rates(score):
+        return "/".join("-" if score[rate] is None else f"{score[rate]:.2f}" for rate in ("precision", "recall"))
+
+    for case in report["cases"]:
+        scores = case["scores"]
+        lines.append(f"{case['name']:<28} {case['total_seconds']:>7.3f} {rates(scores['walls']):>11} "
+                     f"{rates(scores['rooms']):>11} {rates(scores['fixtures']):>11}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scan speed and accuracy on synthetic floor plans.")
+    parser.add_argument('-o', '--output', default='scan_benchmark.json', help="Results file (default: %(default)s)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Longest image sides, in pixels")
+    parser.add_argument('--noise', type=int, nargs='+', default=DEFAULT_NOISE_LEVELS,
+                        help="Gaussian noise levels (standard deviation in gray levels)")
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0], help="One generated plan per seed")
+    parser.add_argument('--mode', choices=SCAN_MODES, help="Scan mode (default: chosen per image)")
+    parser.add_argument('--repeat', type=int, default=3, help="Scans per image; medians are reported")
+    parser.add_argument('--images', help="Keep the generated images in this folder")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+    report = run_benchmark(args.sizes, args.noise, args.seeds, args.mode, repeat=args.repeat, image_dir=args.images,
+                           progress=lambda done, total, case: print(f"[{done}/{total}] {case['name']}"))
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(format_report(report))
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare_reports(json.load(f), report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
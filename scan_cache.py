@@ -0,0 +1,146 @@
+# scan_cache.py
+import hashlib
+import json
+import os
+import threading
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.autogen', 'scan_cache')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Part of every key; bump it whenever a change to the scanners, tiling, pyramid or OCR alters their results
+SCANNER_VERSION = 1
+
+
+class ScanCache:
+    """Content-addressed on-disk cache of scan results.
+
+    Entries are small JSON files named after a SHA-256 key built from the image
+    bytes, SCANNER_VERSION, a result group ("walls", "rooms" and "fixtures" of
+    a single-pass scan, "tiled" and "pyramid" for whole scans in those modes,
+    "dimensions" for OCR) and the parameters that group depends on. Writes go
+    through a temporary file and os.replace, so several batch worker
+    processes can share one directory.
+    When the directory grows past max_bytes the least recently used entries
+    (by modification time, refreshed on every hit) are deleted.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Computed lazily on the first put
+        self._file_hashes = {}  # (path, size, mtime) -> digest, so one scan hashes each file once
+        os.makedirs(directory, exist_ok=True)
+
+    def hash_file(self, path):
+        """Returns the SHA-256 hex digest of a file's contents."""
+        stat = os.stat(path)
+        signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._file_hashes.get(signature)
+        if digest is None:
+            hasher = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    hasher.update(chunk)
+            digest = hasher.hexdigest()
+            self._file_hashes[signature] = digest
+        return digest
+
+    def make_key(self, content_hash, group, params):
+        """Combines a content hash, SCANNER_VERSION, a result group and its parameters into a cache key."""
+        payload = json.dumps([content_hash, SCANNER_VERSION, group, params], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        """Returns the cached value for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+            os.utime(path)  # Mark as recently used for eviction
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Stores a JSON-serializable value under key and evicts old entries if over budget."""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data = json.dumps(value)
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: could not write scan cache entry: {e}")
+            return
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self.size_bytes()
+            else:
+                self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue  # Removed by another process
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def size_bytes(self):
+        """Returns the total size of all cache entries on disk."""
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Deletes least recently used entries until the cache is under 90% of max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, name in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+        self._total_bytes = total
+
+    def clear(self):
+        """Removes every entry from the cache."""
+        with self._lock:
+            for _, _, name in self._entries():
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            self._total_bytes = 0
+            self._file_hashes.clear()
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Returns the process-wide cache in DEFAULT_CACHE_DIR, or None if it cannot be created."""
+    global _default_cache
+    if _default_cache is None:
+        try:
+            _default_cache = ScanCache()
+        except OSError as e:
+            print(f"Warning: scan cache disabled: {e}")
+            return None
+    return _default_cache
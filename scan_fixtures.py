@@ -0,0 +1,215 @@
+# scan_fixtures.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import cv2
+import numpy as np
+from appliances import APPLIANCE_SIZES
+
+# Fixtures looked for inside rooms, and in openings along walls
+ROOM_FIXTURES = ("toilet", "sink", "bathtub", "door")
+WALL_FIXTURES = ("door", "window")
+FIXTURE_TYPES = ("door", "window", "toilet", "sink", "bathtub")
+
+DEFAULT_FIXTURE_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def template_aspect(fixture_type):
+    """Width / height of a fixture's symbol, from the appliance footprints the canvas uses."""
+    width, height = APPLIANCE_SIZES[fixture_type]
+    if fixture_type == "door":
+        return 1.0  # The symbol is the square swept by the leaf, not the leaf itself
+    return width / height
+
+
+def _draw_symbol(canvas, fixture_type, thickness):
+    """Draws the plan symbol of fixture_type filling canvas (dark strokes on white), like the canvas renders it."""
+    height, width = canvas.shape
+    w, h = width - 1, height - 1
+    if fixture_type == "door":
+        cv2.line(canvas, (0, 0), (0, h), 0, thickness)  # Jamb
+        cv2.line(canvas, (0, 0), (w, 0), 0, thickness)  # Leaf
+        cv2.ellipse(canvas, (0, 0), (w, h), 0, 0, 90, 0, thickness)  # Swing
+    elif fixture_type == "window":
+        cv2.rectangle(canvas, (0, 0), (w, h), 0, thickness)
+        cv2.line(canvas, (0, h // 2), (w, h // 2), 0, thickness)
+    elif fixture_type == "toilet":
+        tank_h = int(h * 0.4)
+        pad = max(1, w // 10)
+        cv2.rectangle(canvas, (pad, 0), (w - pad, tank_h), 0, thickness)
+        bowl_top = tank_h + max(1, h // 12)
+        cv2.ellipse(canvas, (w // 2, (bowl_top + h) // 2), (max(1, w // 2 - pad), max(1, (h - bowl_top) // 2)),
+                    0, 0, 360, 0, thickness)
+    elif fixture_type in ("sink", "bathtub"):
+        cv2.rectangle(canvas, (0, 0), (w, h), 0, thickness)
+        pad = max(2, min(w, h) // 6)
+        cv2.ellipse(canvas, (w // 2, h // 2), (max(1, w // 2 - pad), max(1, h // 2 - pad)), 0, 0, 360, 0,
+                    max(1, thickness // 2))
+    else:
+        raise ValueError(f"No template for fixture type '{fixture_type}'")
+
+
+@lru_cache(maxsize=1024)
+def fixture_template(fixture_type, width, height, rotation=0, mirrored=False):
+    """Returns the dark-stroke mask (float32, 0..1, lightly blurred) of a fixture symbol.
+
+    width and height are the size of the returned array; rotation (a
+    multiple of 90 degrees, counter-clockwise) and mirroring are applied to
+    the symbol before it is fitted into that box. Templates are cached, and
+    candidate sizes are quantized by callers, so one scan renders each
+    (type, size, orientation) at most once.
+    """
+    quarter_turns = (rotation // 90) % 4
+    base_w, base_h = (height, width) if quarter_turns % 2 else (width, height)
+    canvas = np.full((base_h, base_w), 255, dtype=np.uint8)
+    _draw_symbol(canvas, fixture_type, max(1, int(round(min(base_w, base_h) * 0.06))))
+    if mirrored:
+        canvas = canvas[:, ::-1]
+    canvas = np.ascontiguousarray(np.rot90(canvas, quarter_turns))
+    mask = (255 - canvas).astype(np.float32) / 255
+    return cv2.GaussianBlur(mask, (3, 3), 0)
+
+
+def _orientations(fixture_type):
+    if fixture_type == "door":  # Hinge on either side, swinging either way
+        return [(rotation, mirrored) for rotation in (0, 90, 180, 270) for mirrored in (False, True)]
+    if fixture_type == "toilet":
+        return [(rotation, False) for rotation in (0, 90, 180, 270)]
+    return [(0, False), (90, False)]  # Symmetric under a half turn
+
+
+def classify_candidate(mask, fixture_types, params):
+    """Scores a candidate's stroke mask against every orientation of each type's template.
+
+    Returns (fixture_type, rotation, score) for the best match, or None when
+    nothing scores at least fixture_min_score percent. Only templates whose
+    aspect ratio (after rotation) is close to the candidate's are tried.
+    """
+    height, width = mask.shape
+    step = params["fixture_size_step"]
+    # Quantize the size so nearby candidates share cached templates
+    q_width, q_height = max(step, width // step * step), max(step, height // step * step)
+    sample = cv2.GaussianBlur(cv2.resize(mask, (q_width, q_height), interpolation=cv2.INTER_AREA), (3, 3), 0)
+    aspect = q_width / q_height
+    tolerance = params["fixture_aspect_tolerance"]
+    best = None
+    for fixture_type in fixture_types:
+        base = template_aspect(fixture_type)
+        for rotation, mirrored in _orientations(fixture_type):
+            expected = base if rotation % 180 == 0 else 1 / base
+            if not 1 / tolerance <= aspect / expected <= tolerance:
+                continue
+            template = fixture_template(fixture_type, q_width, q_height, rotation, mirrored)
+            score = float(cv2.matchTemplate(sample, template, cv2.TM_CCOEFF_NORMED)[0, 0])
+            if best is None or score > best[2]:
+                best = (fixture_type, rotation, score)
+    if best is None or best[2] * 100 < params["fixture_min_score"]:
+        return None
+    return best
+
+
+def _symbol_mask(blurred, params):
+    """Dark strokes with long wall runs removed; returns (strokes, walls) as uint8 masks."""
+    _, dark = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    length = params["fixture_line_length"]
+    walls = cv2.bitwise_or(
+        cv2.morphologyEx(dark, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (length, 1))),
+        cv2.morphologyEx(dark, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, length))))
+    strokes = cv2.bitwise_and(dark, cv2.bitwise_not(cv2.dilate(walls, np.ones((3, 3), np.uint8))))
+    return strokes, walls
+
+
+def wall_gaps(walls_mask, segments, params):
+    """Returns (x, y, width, height) boxes around openings of door or window size along each wall segment.
+
+    The wall mask is sampled along every axis-aligned segment; runs without
+    wall pixels between fixture_gap_min and fixture_gap_max long are
+    openings. Each box is as deep across the wall as the opening is wide,
+    on both sides, which is where a door leaf swings.
+    """
+    height, width = walls_mask.shape
+    boxes = []
+    for x1, y1, x2, y2 in segments:
+        horizontal = abs(y2 - y1) <= abs(x2 - x1)
+        if horizontal and y1 == y2:
+            row = int(round(y1))
+            if not 0 <= row < height:
+                continue
+            start, end = int(max(0, min(x1, x2))), int(min(width, max(x1, x2)))
+            profile = walls_mask[max(0, row - 1):row + 2, start:end].max(axis=0)
+        elif not horizontal and x1 == x2:
+            col = int(round(x1))
+            if not 0 <= col < width:
+                continue
+            start, end = int(max(0, min(y1, y2))), int(min(height, max(y1, y2)))
+            profile = walls_mask[start:end, max(0, col - 1):col + 2].max(axis=1)
+        else:
+            continue  # Oblique walls are left to the room interior pass
+        # Start and end indices of every run of zeros
+        padded = np.concatenate(([1], (profile > 0).astype(np.int8), [1]))
+        changes = np.flatnonzero(np.diff(padded))
+        for gap_start, gap_end in zip(changes[::2], changes[1::2]):
+            gap = gap_end - gap_start
+            if not params["fixture_gap_min"] <= gap <= params["fixture_gap_max"]:
+                continue
+            if horizontal:
+                boxes.append((start + gap_start - gap // 4, row - gap, gap + gap // 2, 2 * gap))
+            else:
+                boxes.append((col - gap, start + gap_start - gap // 4, 2 * gap, gap + gap // 2))
+    return boxes
+
+
+def _box_overlaps(bbox, boxes):
+    x, y, w, h = bbox
+    return any(x < bx + bw and bx < x + w and y < by + bh and by < y + h for bx, by, bw, bh in boxes)
+
+
+def detect_fixtures(blurred, room_outlines, wall_segments, params, workers=DEFAULT_FIXTURE_WORKERS):
+    """Finds fixtures in room interiors and wall openings; returns (type, x, y, width, height, rotation) tuples.
+
+    Everything is in pixels of blurred. Candidates are connected stroke
+    components of fixture size once wall runs are removed; a candidate is
+    only classified if its centre lies in (or against) a room outline (room fixtures
+    and doors) or its box overlaps an opening along a wall (doors and
+    windows). Candidates are scored against the cached templates on a
+    thread pool; OpenCV releases the GIL while matching.
+    """
+    strokes, walls = _symbol_mask(blurred, params)
+    gaps = wall_gaps(walls, wall_segments, params)
+    count, labels, stats, centroids = cv2.connectedComponentsWithStats(strokes, connectivity=8)
+    min_size, max_size = params["fixture_min_size"], params["fixture_max_size"]
+    outlines = [outline.reshape(-1, 1, 2).astype(np.float32) for outline in room_outlines]
+
+    jobs = []
+    for label in range(1, count):
+        x, y, w, h, _ = stats[label]
+        if max(w, h) < min_size or max(w, h) > max_size:
+            continue
+        bbox = (int(x), int(y), int(w), int(h))
+        centre = (float(centroids[label][0]), float(centroids[label][1]))
+        types = []
+        # Symbols drawn against a wall are carved out of the room's free space, so allow half their size outside it
+        if any(cv2.pointPolygonTest(outline, centre, True) >= -max(w, h) / 2 for outline in outlines):
+            types.extend(ROOM_FIXTURES)
+        if _box_overlaps(bbox, gaps):
+            types.extend(t for t in WALL_FIXTURES if t not in types)
+        if types:
+            jobs.append((label, bbox, tuple(types)))
+
+    def classify(job):
+        label, (x, y, w, h), types = job
+        mask = (labels[y:y + h, x:x + w] == label).astype(np.float32)
+        return classify_candidate(mask, types, params)
+
+    if workers > 1 and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            matches = list(pool.map(classify, jobs))
+    else:
+        matches = [classify(job) for job in jobs]
+
+    fixtures = []
+    for (_, (x, y, w, h), _), match in zip(jobs, matches):
+        if match is not None:
+            fixture_type, rotation, _ = match
+            fixtures.append((fixture_type, x, y, w, h, rotation))
+    return fixtures
@@ -0,0 +1,211 @@
+# scan_geometry.py
+import numpy as np
+
+
+def as_segments(lines):
+    """Returns HoughLinesP output (N x 1 x 4 or N x 4) as an N x 4 float array of x1, y1, x2, y2."""
+    if lines is None:
+        return np.empty((0, 4), dtype=np.float64)
+    return np.asarray(lines, dtype=np.float64).reshape(-1, 4)
+
+
+def segment_lengths_angles(segments):
+    """Returns (lengths, angles) where angles are abs(atan2) in degrees, i.e. in [0, 180]."""
+    dx = segments[:, 2] - segments[:, 0]
+    dy = segments[:, 3] - segments[:, 1]
+    return np.hypot(dx, dy), np.abs(np.degrees(np.arctan2(dy, dx)))
+
+
+def classify_segments(segments, tolerance=10):
+    """Returns boolean masks (horizontal, vertical, other) for segments within tolerance degrees of an axis."""
+    _, angles = segment_lengths_angles(segments)
+    horizontal = (angles < tolerance) | (angles > 180 - tolerance)
+    vertical = (angles > 90 - tolerance) & (angles < 90 + tolerance)
+    return horizontal, vertical, ~(horizontal | vertical)
+
+
+def _union_find(n, pairs_i, pairs_j):
+    """Returns a component label per node for the undirected edges (pairs_i[k], pairs_j[k])."""
+    parent = np.arange(n)
+
+    def find(a):
+        root = a
+        while parent[root] != root:
+            root = parent[root]
+        while parent[a] != root:  # Path compression
+            parent[a], a = root, parent[a]
+        return root
+
+    for a, b in zip(pairs_i.tolist(), pairs_j.tolist()):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    return np.array([find(a) for a in range(n)])
+
+
+def _candidate_pairs(own, own_rho, reach, others, others_rho, chunk_pairs):
+    """Yields (i, j) index arrays pairing each of own with every one of others whose rho lies within its reach.
+
+    Pairs come in chunks of about chunk_pairs, so memory follows the number
+    of candidates rather than len(own) * len(others).
+    """
+    order = np.argsort(others_rho, kind='stable')
+    others, others_rho = others[order], others_rho[order]
+    starts = np.searchsorted(others_rho, own_rho - reach, side='left')
+    counts = np.searchsorted(others_rho, own_rho + reach, side='right') - starts
+    totals = np.cumsum(counts)
+    first = 0
+    while first < len(own):
+        done = totals[first - 1] if first else 0
+        last = max(first + 1, int(np.searchsorted(totals, done + chunk_pairs, side='right')))
+        chunk_counts = counts[first:last]
+        offsets = np.arange(int(chunk_counts.sum())) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+        yield np.repeat(own[first:last], chunk_counts), others[np.repeat(starts[first:last], chunk_counts) + offsets]
+        first = last
+
+
+def _directions(segments):
+    """Returns (lengths, ux, uy, flip, mx, my): unit directions flipped into one half-plane, and midpoints."""
+    x1, y1, x2, y2 = segments.T
+    lengths, _ = segment_lengths_angles(segments)
+    safe_lengths = np.where(lengths > 0, lengths, 1.0)
+    ux = (x2 - x1) / safe_lengths
+    uy = (y2 - y1) / safe_lengths
+    flip = (ux < 0) | ((ux == 0) & (uy < 0))
+    ux = np.where(flip, -ux, ux)
+    uy = np.where(flip, -uy, uy)
+    return lengths, ux, uy, flip, (x1 + x2) / 2, (y1 + y2) / 2
+
+
+def collinear_pairs(segments, angle_tolerance=3.0, distance_tolerance=6.0, gap_tolerance=10.0, chunk_pairs=1 << 18):
+    """Returns (pairs_i, pairs_j), pairs_i < pairs_j, of the segments merge_collinear_segments links.
+
+    Only plausible pairs are tested: segments are bucketed by direction into
+    bins at least angle_tolerance wide, and within a bin (or a bin and its
+    neighbour) sorted by the offset of their midpoints across a reference
+    direction; a sweep pairs each segment with those whose offset could
+    still satisfy the distance and gap tests. The exact tests then run
+    vectorized over chunk_pairs candidates at a time, so memory grows with
+    the candidate pairs, not with the square of the segment count. A pair
+    may be returned more than once.
+    """
+    if len(segments) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    x1, y1, x2, y2 = segments.T
+    lengths, ux, uy, flip, mx, my = _directions(segments)
+    end = np.where(flip, -lengths, lengths)  # Each segment's second endpoint on its own axis
+    min_cos = np.cos(np.radians(angle_tolerance))
+
+    def linked(i, j):
+        """The pair tests, for pairs with i < j, measured along i's line."""
+        parallel = np.abs(ux[i] * ux[j] + uy[i] * uy[j]) >= min_cos
+        perpendicular_ij = np.abs((mx[j] - x1[i]) * uy[i] - (my[j] - y1[i]) * ux[i])
+        perpendicular_ji = np.abs((mx[i] - x1[j]) * uy[j] - (my[i] - y1[j]) * ux[j])
+        close = np.maximum(perpendicular_ij, perpendicular_ji) <= distance_tolerance
+        # Extent of j projected on i's direction, relative to i's first endpoint
+        proj_a = (x1[j] - x1[i]) * ux[i] + (y1[j] - y1[i]) * uy[i]
+        proj_b = (x2[j] - x1[i]) * ux[i] + (y2[j] - y1[i]) * uy[i]
+        gap = np.maximum(np.minimum(proj_a, proj_b) - np.maximum(0.0, end[i]),
+                         np.minimum(0.0, end[i]) - np.maximum(proj_a, proj_b))
+        return parallel & close & (gap <= gap_tolerance)
+
+    # Direction bins at least angle_tolerance wide (an even count, so both axes fall on bin centres);
+    # segments within the tolerance of each other share a bin or sit in neighbouring ones
+    bins = max(1, int(180 / (max(angle_tolerance, 0.5) * 1.01)))
+    bins = bins - bins % 2 if bins > 2 else bins
+    width = 180.0 / bins
+    angles = np.degrees(np.arctan2(uy, ux))  # In (-90, 90] after the flip
+    valid = np.nonzero(lengths > 0)[0]
+    bin_of = np.floor((angles[valid] + 90) / width + 0.5).astype(np.int64) % bins
+    binned = [valid[bin_of == b] for b in range(bins)]
+    groups = [(binned[b], binned[b], -90 + b * width) for b in range(bins)]
+    if bins > 1:
+        groups += [(binned[b], binned[(b + 1) % bins], -90 + (b + 0.5) * width)
+                   for b in range(bins if bins > 2 else 1)]
+
+    found_i, found_j = [], []
+    for own, others, centre in groups:
+        if len(own) == 0 or len(others) == 0:
+            continue
+        # Offsets across the reference direction; a linked pair's offsets differ by at most
+        # distance_tolerance plus the pair's reach along its line times the sine of the deviation
+        normal_x, normal_y = -np.sin(np.radians(centre)), np.cos(np.radians(centre))
+        own_rho = mx[own] * normal_x + my[own] * normal_y
+        others_rho = mx[others] * normal_x + my[others] * normal_y
+        deviation = np.abs(np.sin(np.radians((angles[own] - centre + 90) % 180 - 90)))
+        along = (lengths[own] + lengths[others].max()) / 2 + gap_tolerance + distance_tolerance
+        reach = distance_tolerance + along * deviation
+        reach += 1e-9 * (np.abs(own_rho) + reach + 1)  # Rounding slack
+        for a, b in _candidate_pairs(own, own_rho, reach, others, others_rho, chunk_pairs):
+            a, b = a[a != b], b[a != b]
+            i, j = np.minimum(a, b), np.maximum(a, b)
+            mask = linked(i, j)
+            found_i.append(i[mask])
+            found_j.append(j[mask])
+    if not found_i:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(found_i), np.concatenate(found_j)
+
+
+def merge_linked_segments(segments, pairs_i, pairs_j):
+    """Replaces every group of segments connected by the (pairs_i, pairs_j) links with one segment.
+
+    Groups are found with union-find; each becomes a segment spanning the
+    group's extent along its length-weighted direction, through the
+    length-weighted centroid of its members' midpoints. Segments without
+    links are returned unchanged, and groups come out in the order of their
+    first member.
+    """
+    if len(pairs_i) == 0:
+        return segments.copy()
+    x1, y1, x2, y2 = segments.T
+    lengths, ux, uy, _, mx, my = _directions(segments)
+    labels = _union_find(len(segments), pairs_i, pairs_j)
+
+    merged = []
+    order = np.argsort(labels, kind='stable')
+    for members in np.split(order, np.nonzero(np.diff(labels[order]))[0] + 1):
+        if len(members) == 1:
+            merged.append(segments[members[0]])
+            continue
+        weights = lengths[members]
+        dir_x = np.sum(ux[members] * weights)
+        dir_y = np.sum(uy[members] * weights)
+        norm = np.hypot(dir_x, dir_y) or 1.0
+        dir_x, dir_y = dir_x / norm, dir_y / norm
+        cx = np.average(mx[members], weights=weights + 1e-9)
+        cy = np.average(my[members], weights=weights + 1e-9)
+        ends_x = np.concatenate([x1[members], x2[members]])
+        ends_y = np.concatenate([y1[members], y2[members]])
+        t = (ends_x - cx) * dir_x + (ends_y - cy) * dir_y
+        t_min, t_max = t.min(), t.max()
+        merged.append(np.array([cx + t_min * dir_x, cy + t_min * dir_y, cx + t_max * dir_x, cy + t_max * dir_y]))
+    return np.array(merged, dtype=np.float64)
+
+
+def merge_collinear_segments(segments, angle_tolerance=3.0, distance_tolerance=6.0, gap_tolerance=10.0,
+                             chunk_pairs=1 << 18):
+    """Merges nearly collinear, overlapping or nearly touching segments into single segments.
+
+    Two segments are linked when their directions differ by less than
+    angle_tolerance degrees, each one's midpoint lies within
+    distance_tolerance of the other's supporting line, and their extents
+    along that line overlap or are separated by at most gap_tolerance.
+    Linked segments are merged by merge_linked_segments; collinear_pairs
+    describes how the links are found without comparing every pair.
+    """
+    pairs_i, pairs_j = collinear_pairs(segments, angle_tolerance, distance_tolerance, gap_tolerance, chunk_pairs)
+    return merge_linked_segments(segments, pairs_i, pairs_j)
+
+
+def snap_orthogonal(segments, tolerance=5.0):
+    """Snaps segments within tolerance degrees of horizontal or vertical onto exact axis-aligned lines."""
+    snapped = segments.copy()
+    horizontal, vertical, _ = classify_segments(segments, tolerance)
+    mean_y = (snapped[horizontal, 1] + snapped[horizontal, 3]) / 2
+    snapped[horizontal, 1] = mean_y
+    snapped[horizontal, 3] = mean_y
+    mean_x = (snapped[vertical, 0] + snapped[vertical, 2]) / 2
+    snapped[vertical, 0] = mean_x
+    snapped[vertical, 2] = mean_x
+    return snapped
@@ -0,0 +1,46 @@
+# scan_modes.py
+from scan_pyramid import iter_scan_floor_plan_pyramid
+from scan_tiles import iter_scan_floor_plan_tiled, needs_tiling
+from scanner import collect_scan, iter_scan_floor_plan
+
+# single: whole image downscaled to max_dim; tiled: full-resolution tiles; pyramid: coarse-to-fine
+SCAN_MODES = ("single", "tiled", "pyramid")
+
+_SCANNERS = {
+    "single": iter_scan_floor_plan,
+    "tiled": iter_scan_floor_plan_tiled,
+    "pyramid": iter_scan_floor_plan_pyramid,
+}
+
+
+def choose_mode(image_path):
+    """Returns the default mode for an image: tiled above TILED_SCAN_THRESHOLD, single otherwise."""
+    return "tiled" if needs_tiling(image_path) else "single"
+
+
+def iter_scan_with_mode(image_path, mode=None, params=None, progress=None, cancel_event=None, cache=None,
+                        timings=None, ingest=None):
+    """Scans image_path in the given mode (None picks one with choose_mode), yielding (group, elements) batches.
+
+    group is one of scanner.SCAN_GROUPS; a later batch of a group replaces
+    the earlier ones, which the tiled and pyramid modes use to show coarse
+    results before the full-resolution ones are ready.
+    """
+    mode = mode or choose_mode(image_path)
+    if mode not in _SCANNERS:
+        raise ValueError(f"Unknown scan mode '{mode}', expected one of {SCAN_MODES}")
+    return _SCANNERS[mode](image_path, params, progress=progress, cancel_event=cancel_event, cache=cache,
+                           timings=timings, ingest=ingest)
+
+
+def scan_with_mode(image_path, mode=None, params=None, progress=None, cancel_event=None, cache=None, timings=None,
+                   ingest=None):
+    """Scans image_path in the given mode (None picks one with choose_mode).
+
+    Returns (elements, rooms_found, walls_found, circles_found) like
+    scanner.scan_floor_plan; timings, if given, is filled with seconds per
+    stage or pyramid level. ingest (a scanner.ImageIngest) shares the decoded
+    image with a following OCR pass.
+    """
+    return collect_scan(iter_scan_with_mode(image_path, mode, params, progress, cancel_event, cache, timings,
+                                            ingest))
@@ -0,0 +1,203 @@
+# scan_ocr.py
+import re
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from scanner import OCR_AVAILABLE, ImageIngest, binarize
+from tracing import span, traced
+
+if OCR_AVAILABLE:
+    import pytesseract
+
+# Pixel sizes are measured on the image scaled so its longest side is detect_max_dim
+DEFAULT_DIMENSION_PARAMS = {
+    "detect_max_dim": 2000,
+    "line_min_length": 120,  # Dark runs at least this long are wall strokes, not text
+    "char_min_height": 8,
+    "char_max_height": 60,
+    "char_max_width": 60,
+    "text_join_gap": 12,  # Characters closer than this are joined into one label
+    "text_max_width": 400,
+    "crop_padding": 6,
+    "threshold": 150,
+    "config": r'--oem 3 --psm 7',
+    "max_wall_distance": 80,
+    "annotation_unit": "m",
+    "calibration_tolerance": 0.2,
+    "workers": 4,
+}
+
+UNIT_TO_METERS = {"m": 1.0, "cm": 0.01, "mm": 0.001}
+
+NUMBER_PATTERN = re.compile(r'\d+(?:[.,]\d+)?')
+
+
+def resolve_dimension_params(params=None):
+    """Returns DEFAULT_DIMENSION_PARAMS overlaid with params."""
+    resolved = dict(DEFAULT_DIMENSION_PARAMS)
+    if params:
+        unknown = set(params) - set(resolved)
+        if unknown:
+            raise ValueError(f"Unknown dimension parameters: {sorted(unknown)}")
+        resolved.update(params)
+    return resolved
+
+
+def find_text_regions(gray, params=None):
+    """Returns (x, y, width, height) boxes of small text-like regions in gray, in gray's pixels.
+
+    Dark pixels are split into line strokes (long horizontal or vertical
+    runs, i.e. walls) and the rest. Remaining connected components of
+    character size are joined horizontally into labels, so text touching a
+    wall is still found while the walls themselves never are.
+    """
+    params = resolve_dimension_params(params)
+    height, width = gray.shape[:2]
+    scale = min(1.0, params["detect_max_dim"] / max(height, width))
+    small = gray if scale == 1.0 else cv2.resize(gray, (int(width * scale), int(height * scale)),
+                                                  interpolation=cv2.INTER_AREA)
+    _, dark = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    length = params["line_min_length"]
+    lines = cv2.bitwise_or(
+        cv2.morphologyEx(dark, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (length, 1))),
+        cv2.morphologyEx(dark, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, length))))
+    # Grow the strokes slightly so anti-aliased wall edges do not survive as specks
+    lines = cv2.dilate(lines, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)))
+    text = cv2.bitwise_and(dark, cv2.bitwise_not(lines))
+
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(text, connectivity=8)
+    comp_w = stats[1:, cv2.CC_STAT_WIDTH]
+    comp_h = stats[1:, cv2.CC_STAT_HEIGHT]
+    # Full-height characters plus small marks such as decimal points
+    chars = (comp_h <= params["char_max_height"]) & (comp_w <= params["char_max_width"]) & (comp_h >= 2)
+    keep = np.zeros(count, dtype=np.uint8)
+    keep[1:][chars] = 255
+    text = keep[labels]
+
+    joined = cv2.dilate(text, cv2.getStructuringElement(cv2.MORPH_RECT, (params["text_join_gap"], 3)))
+    contours, _ = cv2.findContours(joined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    pad = params["crop_padding"]
+    boxes = []
+    for cnt in contours:
+        x, y, w, h = cv2.boundingRect(cnt)
+        if h - 2 < params["char_min_height"] or w > params["text_max_width"]:
+            continue
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(small.shape[1], x + w + pad), min(small.shape[0], y + h + pad)
+        boxes.append((int(x0 / scale), int(y0 / scale), int((x1 - x0) / scale), int((y1 - y0) / scale)))
+    boxes.sort(key=lambda box: (box[1], box[0]))  # Reading order
+    return boxes
+
+
+def parse_numbers(text):
+    """Returns the numbers in an OCR string, accepting a comma as decimal separator."""
+    return [float(match.replace(',', '.')) for match in NUMBER_PATTERN.findall(text)]
+
+
+def _ocr_crop(gray, box, params):
+    x, y, w, h = box
+    crop = binarize(gray[y:y + h, x:x + w], params["threshold"])
+    with span("tesseract", "scan", width=w, height=h):
+        return pytesseract.image_to_string(crop, config=params["config"])
+
+
+def ocr_regions(gray, boxes, params=None):
+    """OCRs every box in parallel; returns one annotation dict per number found.
+
+    Tesseract runs as a child process per call, so threads are enough to keep
+    several crops in flight at once.
+    """
+    if not OCR_AVAILABLE:
+        raise RuntimeError("OCR library (pytesseract) is not installed or not available.")
+    params = resolve_dimension_params(params)
+    with ThreadPoolExecutor(max_workers=max(1, params["workers"])) as pool:
+        texts = list(pool.map(lambda box: _ocr_crop(gray, box, params), boxes))
+    annotations = []
+    for (x, y, w, h), text in zip(boxes, texts):
+        for value in parse_numbers(text):
+            annotations.append({"value": value, "x": x, "y": y, "width": w, "height": h, "text": text.strip()})
+    return annotations
+
+
+def associate_with_walls(annotations, walls, max_distance):
+    """Sets "wall" (index into walls) and "wall_length" on each annotation within max_distance of a wall.
+
+    Among the walls in range, one running parallel to the label's text and
+    alongside it (rather than off one of its ends) is preferred, since that
+    is how dimension lines are drawn; otherwise the nearest wall is taken.
+    """
+    if not walls:
+        return annotations
+    segments = np.array([[w["x1"], w["y1"], w["x2"], w["y2"]] for w in walls], dtype=np.float64)
+    start = segments[:, :2]
+    direction = segments[:, 2:] - start
+    lengths = np.hypot(direction[:, 0], direction[:, 1])
+    squared = np.where(lengths > 0, lengths ** 2, 1.0)
+    wall_horizontal = np.abs(direction[:, 0]) >= np.abs(direction[:, 1])
+    for annotation in annotations:
+        centre = np.array([annotation["x"] + annotation["width"] / 2, annotation["y"] + annotation["height"] / 2])
+        # Distance from the label centre to every wall segment, measured to the closest point on it
+        t = ((centre - start) * direction).sum(axis=1) / squared
+        closest = start + direction * np.clip(t, 0.0, 1.0)[:, None]
+        distances = np.hypot(*(closest - centre).T)
+        in_range = distances <= max_distance
+        beside = (t > 0.0) & (t < 1.0)
+        parallel = wall_horizontal == (annotation["width"] >= annotation["height"])
+        for candidates in (in_range & beside & parallel, in_range & beside, in_range):
+            if candidates.any():
+                nearest = int(np.argmin(np.where(candidates, distances, np.inf)))
+                annotation["wall"] = nearest
+                annotation["wall_length"] = float(lengths[nearest])
+                break
+    return annotations
+
+
+def estimate_meters_to_pixels(annotations, unit="m", tolerance=0.2):
+    """Derives pixels per meter from labels associated with walls; returns (factor, labels_used) or (None, 0).
+
+    Every associated label gives wall_length / value. Ratios further than
+    tolerance (relative) from their median are treated as misreads or labels
+    of something other than the wall, and the rest are averaged. A single
+    label is used as is; check labels_used before trusting the factor.
+    """
+    to_meters = UNIT_TO_METERS[unit]
+    ratios = np.array([a["wall_length"] / (a["value"] * to_meters)
+                       for a in annotations if "wall" in a and a["value"] > 0])
+    if len(ratios) == 0:
+        return None, 0
+    median = np.median(ratios)
+    inliers = ratios[np.abs(ratios - median) <= tolerance * median]
+    if len(inliers) == 0:
+        return None, 0
+    return float(inliers.mean()), len(inliers)
+
+
+@traced(category="scan")
+def read_dimensions(image_path, walls, params=None, cache=None, ingest=None):
+    """Reads dimension labels and calibrates the plan's scale.
+
+    Returns {"annotations": [...], "meters_to_pixels_factor": factor or None,
+    "labels_used": n}. Only text-like regions are OCRed, in parallel; the
+    OCR result (independent of walls) is cached under the "dimensions" group.
+    """
+    params = resolve_dimension_params(params)
+    key = None
+    cached = None
+    if cache is not None:
+        ocr_keys = ("detect_max_dim", "line_min_length", "char_min_height", "char_max_height", "char_max_width",
+                    "text_join_gap", "text_max_width", "crop_padding", "threshold", "config")
+        key = cache.make_key(cache.hash_file(image_path), "dimensions", {k: params[k] for k in ocr_keys})
+        cached = cache.get(key)
+    if cached is None:
+        ingest = ingest if ingest is not None else ImageIngest(image_path)
+        gray = ingest.gray
+        cached = {
+            "annotations": ocr_regions(gray, find_text_regions(gray, params), params),
+            "detect_scale": min(1.0, params["detect_max_dim"] / max(gray.shape[:2])),
+        }
+        if key is not None:
+            cache.put(key, cached)
+    annotations = associate_with_walls(cached["annotations"], walls,
+                                       params["max_wall_distance"] / cached["detect_scale"])
+    factor, used = estimate_meters_to_pixels(annotations, params["annotation_unit"], params["calibration_tolerance"])
+    return {"annotations": annotations, "meters_to_pixels_factor": factor, "labels_used": used}
@@ -0,0 +1,273 @@
+# scan_pyramid.py
+import time
+import cv2
+import numpy as np
+from scan_geometry import as_segments, merge_collinear_segments, segment_lengths_angles, snap_orthogonal
+from scan_tiles import TileSource, image_size, scale_params, snap_rooms_to_walls
+from scanner import (ScanCancelled, ScanPipeline, collect_scan, detect_segments, group_elements, resolve_params,
+                     select_walls, wall_element)
+
+# Longest side of each pyramid level; None is the max_dim working resolution
+DEFAULT_PYRAMID_LEVELS = (400, None)
+
+# Positional uncertainty of a detection, in pixels of the level it was found on
+REFINE_MARGIN = 3
+
+
+def _level_name(index, size):
+    return f"level {index} ({size}px)"
+
+
+def _decode_reduction(image_path, finest, ingest):
+    """Largest reduced-decode factor that still leaves finest pixels on the longest side.
+
+    Only JPEG files are decoded reduced: their decoder scales in the DCT
+    domain, which is both fast and an area average. Other formats are decoded
+    whole by OpenCV anyway and subsampled more coarsely than INTER_AREA,
+    which loses the thin fixture strokes.
+    """
+    if ingest is not None and ingest.decoded:
+        return 1  # The full resolution image is decoded already
+    with open(image_path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return 1
+    size = image_size(image_path)
+    if size is None:
+        return 1
+    return next((r for r in (8, 4, 2) if max(size) / r >= finest), 1)
+
+
+def _detect_coarse(edges_final, params):
+    """detect_segments for the coarse level, snapping the Hough lines before they are merged.
+
+    A few pixels of stroke width leave Hough lines a few degrees off axis at
+    this level; merged as they are, neighbouring walls chain into one
+    slanted segment that no band around it can refine.
+    """
+    lines = cv2.HoughLinesP(edges_final, rho=1, theta=np.pi / 180, threshold=params["hough_threshold"],
+                            minLineLength=params["hough_min_line_length"], maxLineGap=params["hough_max_line_gap"])
+    segments = snap_orthogonal(as_segments(lines), params["snap_angle_tolerance"])
+    segments = merge_collinear_segments(segments, params["merge_angle_tolerance"],
+                                        params["merge_distance_tolerance"], params["merge_gap_tolerance"])
+    return snap_orthogonal(segments, params["snap_angle_tolerance"])
+
+
+def _candidates_near(segment, candidates, angle_tolerance, distance_tolerance):
+    """Returns the candidates parallel to segment whose midpoints lie within distance_tolerance of its line."""
+    if len(candidates) == 0:
+        return candidates
+    x1, y1, x2, y2 = segment
+    length = np.hypot(x2 - x1, y2 - y1) or 1.0
+    ux, uy = (x2 - x1) / length, (y2 - y1) / length
+    cx = (candidates[:, 0] + candidates[:, 2]) / 2
+    cy = (candidates[:, 1] + candidates[:, 3]) / 2
+    distance = np.abs((cx - x1) * uy - (cy - y1) * ux)
+    lengths, _ = segment_lengths_angles(candidates)
+    safe_lengths = np.where(lengths > 0, lengths, 1.0)
+    cos_angle = np.abs((candidates[:, 2] - candidates[:, 0]) * ux + (candidates[:, 3] - candidates[:, 1]) * uy)
+    parallel = cos_angle / safe_lengths >= np.cos(np.radians(angle_tolerance))
+    return candidates[parallel & (distance <= distance_tolerance)]
+
+
+def _refine_axis_aligned(region, horizontal):
+    """Locates the dark stroke running along a band; returns (start, end, centre) in band pixels or None.
+
+    The band is binarized with Otsu and the fill ratio of every line across
+    the band is taken: the stroke is the run of lines around the fullest one
+    that are at least half as full, and its extent is the first to last
+    position that is dark in most of those lines. Walls crossing the band
+    darken every line equally, so they do not shift the centre.
+    """
+    _, mask = cv2.threshold(region, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if not horizontal:
+        mask = mask.T
+    fill = mask.mean(axis=1)
+    peak = int(np.argmax(fill))
+    if fill[peak] < 0.3:
+        return None
+    first = last = peak
+    while first > 0 and fill[first - 1] >= fill[peak] / 2:
+        first -= 1
+    while last < len(fill) - 1 and fill[last + 1] >= fill[peak] / 2:
+        last += 1
+    dark = np.flatnonzero(mask[first:last + 1].mean(axis=0) >= 0.5)
+    if len(dark) == 0:
+        return None
+    return float(dark[0]), float(dark[-1] + 1), (first + last + 1) / 2
+
+
+def _refine_oblique(region, segment, params, level_factor, margin, origin):
+    """Re-detects an oblique segment in its band with the Hough stages; returns it in source pixels or None."""
+    x1, y1, x2, y2 = segment
+    # Short walls must still pass the Hough filters tuned for whole-plan walls
+    length = np.hypot(x2 - x1, y2 - y1) * level_factor
+    band_params = dict(params)
+    band_params["hough_min_line_length"] = max(1, int(min(params["hough_min_line_length"], 0.5 * length)))
+    band_params["hough_threshold"] = max(1, int(min(params["hough_threshold"], 0.3 * length)))
+    pipeline = ScanPipeline(None, band_params)
+    pipeline.seed(resize=(None, 1.0), grayscale=region)
+    candidates = detect_segments(pipeline.run("morphology"), band_params) / level_factor
+    candidates[:, [0, 2]] += origin[0]
+    candidates[:, [1, 3]] += origin[1]
+    candidates = _candidates_near(segment, candidates, 2 * params["merge_angle_tolerance"], margin)
+    if len(candidates) == 0:
+        return None
+    # Door openings may split the wall at this level; the coarse detection already vouches for the whole span
+    merged = merge_collinear_segments(candidates, 2 * params["merge_angle_tolerance"], margin, length / level_factor)
+    lengths, _ = segment_lengths_angles(merged)
+    return merged[np.argmax(lengths)]
+
+
+def refine_segment(source, segment, params, level_factor, margin):
+    """Re-detects one segment inside a band around it at a finer level.
+
+    segment and margin are in source pixels; level_factor is the size of a
+    level pixel per source pixel (1.0 at source resolution). Axis-aligned
+    segments are located from the band's darkness profile, others with the
+    Hough stages. Returns the refined segment in source pixels, or None if
+    nothing consistent with it is found in the band.
+    """
+    x1, y1, x2, y2 = segment
+    left = int(max(0, np.floor(min(x1, x2) - margin)))
+    top = int(max(0, np.floor(min(y1, y2) - margin)))
+    right = int(min(source.width, np.ceil(max(x1, x2) + margin)))
+    bottom = int(min(source.height, np.ceil(max(y1, y2) + margin)))
+    if right - left < 2 or bottom - top < 2:
+        return None
+    region = source.read(left, top, right - left, bottom - top)
+    if level_factor < 1.0:
+        size = (max(1, int(round(region.shape[1] * level_factor))), max(1, int(round(region.shape[0] * level_factor))))
+        region = cv2.resize(region, size, interpolation=cv2.INTER_AREA)
+
+    if y1 == y2 or x1 == x2:
+        found = _refine_axis_aligned(region, horizontal=y1 == y2)
+        if found is None:
+            return None
+        start, end, centre = (value / level_factor for value in found)
+        if y1 == y2:
+            return np.array([left + start, top + centre, left + end, top + centre])
+        return np.array([left + centre, top + start, left + centre, top + end])
+    return _refine_oblique(region, segment, params, level_factor, margin, (left, top))
+
+
+def iter_scan_floor_plan_pyramid(image_path, params=None, levels=DEFAULT_PYRAMID_LEVELS, progress=None,
+                                 cancel_event=None, cache=None, timings=None, ingest=None):
+    """Coarse-to-fine scan, yielding (group, elements) batches as they become available.
+
+    The image is decoded once, in grayscale; JPEG files no larger than the
+    finest level needs (see _decode_reduction). Walls are detected on the
+    coarsest level only; every later level re-detects each wall inside a
+    narrow band around its previous estimate, so the fine levels touch a few
+    percent of the pixels instead of the whole plan, and drops the walls it
+    finds no stroke for. Rooms and fixtures are detected once at the max_dim
+    working resolution (as scan_floor_plan does); rooms are snapped onto the
+    refined walls and fixtures look for wall openings along them. With the
+    default levels the walls end at the working resolution too; pass a
+    larger last level (clamped to the image size) to refine them at up to
+    source resolution.
+
+    Rooms as found and the coarse-level walls are yielded before any
+    refinement, and replaced by the refined batches later (see
+    scanner.collect_scan). Pass a dict as timings to receive seconds spent
+    in decoding and in each level.
+    """
+    params = resolve_params(params)
+    timings = timings if timings is not None else {}
+    key = None
+    if cache is not None:
+        key = cache.make_key(cache.hash_file(image_path), "pyramid", dict(params, levels=list(levels)))
+        cached = cache.get(key)
+        if cached is not None:
+            timings.update(cached["timings"])
+            yield from group_elements(cached["elements"])
+            return
+
+    def check(stage, fraction):
+        if cancel_event is not None and cancel_event.is_set():
+            raise ScanCancelled(f"Scan cancelled before stage '{stage}'")
+        if progress is not None:
+            progress(stage, fraction)
+
+    check("decode", 0.0)
+    started = time.perf_counter()
+    finest = max(size or params["max_dim"] for size in levels)
+    reduction = _decode_reduction(image_path, finest, ingest)
+    source = TileSource(image_path, reduction, ingest=ingest)
+    source_dim = max(source.width, source.height)
+    timings["decode"] = time.perf_counter() - started
+
+    # ---- Working resolution: rooms, and the base for the coarse level ----
+    check("overview", 0.3)
+    started = time.perf_counter()
+    working, working_factor = source.overview(params["max_dim"])
+    overview = ScanPipeline(None, params)
+    overview.seed(resize=(None, working_factor * source.scale), grayscale=working)
+    rooms = [dict(room) for room in overview.run("rooms")]
+    timings["overview"] = time.perf_counter() - started
+    yield "rooms", overview.run("rooms")
+
+    # ---- Coarse level: walls over the whole plan ----
+    sizes = [min(size or params["max_dim"], source_dim) for size in levels]
+    check(_level_name(0, sizes[0]), 0.5)
+    started = time.perf_counter()
+    coarse_factor = sizes[0] / source_dim
+    coarse_size = (max(1, int(source.width * coarse_factor)), max(1, int(source.height * coarse_factor)))
+    coarse = cv2.resize(working, coarse_size, interpolation=cv2.INTER_AREA)
+    coarse_params = scale_params(params, sizes[0] / params["max_dim"])
+    pipeline = ScanPipeline(None, coarse_params)
+    pipeline.seed(resize=(None, 1.0), grayscale=coarse)
+    segments = _detect_coarse(pipeline.run("morphology"), coarse_params)
+    segments = segments[select_walls(segments, coarse_params)] / coarse_factor
+    pipeline.release()
+    timings[_level_name(0, sizes[0])] = time.perf_counter() - started
+    yield "walls", [wall_element(*segment, source.scale) for segment in segments]
+
+    # ---- Finer levels: re-detect each wall in a band around its estimate ----
+    previous_factor = coarse_factor
+    for index, size in enumerate(sizes[1:], start=1):
+        check(_level_name(index, size), 0.5 + 0.45 * index / len(sizes))
+        started = time.perf_counter()
+        level_factor = size / source_dim
+        level_params = scale_params(params, size / params["max_dim"])
+        margin = REFINE_MARGIN / previous_factor
+        refined = [refine_segment(source, segment, level_params, level_factor, margin) for segment in segments]
+        # Segments the finer level shows no evidence for were noise at the coarser one
+        refined = np.array([segment for segment in refined if segment is not None]).reshape(-1, 4)
+        segments = merge_collinear_segments(refined, level_params["merge_angle_tolerance"],
+                                            level_params["merge_distance_tolerance"] / level_factor,
+                                            level_params["merge_gap_tolerance"] / level_factor)
+        segments = snap_orthogonal(segments, level_params["snap_angle_tolerance"])
+        previous_factor = level_factor
+        timings[_level_name(index, size)] = time.perf_counter() - started
+
+    final_params = scale_params(params, sizes[-1] / params["max_dim"])
+    walls = [wall_element(*segments[i], source.scale) for i in select_walls(segments, final_params)]
+    yield "walls", walls
+    wall_segments = np.array([[w["x1"], w["y1"], w["x2"], w["y2"]] for w in walls]).reshape(-1, 4)
+    rooms = snap_rooms_to_walls(rooms, wall_segments, tolerance=REFINE_MARGIN / (working_factor * source.scale))
+    yield "rooms", rooms
+
+    # Fixtures reuse the working-resolution blur and regions, and look for openings along the refined walls
+    check("fixtures", 0.95)
+    started = time.perf_counter()
+    overview.seed(lines=walls)
+    fixtures = overview.run("fixtures")
+    overview.release()
+    timings["fixtures"] = time.perf_counter() - started
+    yield "fixtures", fixtures
+
+    if progress is not None:
+        progress("done", 1.0)
+    if key is not None:
+        cache.put(key, {"elements": walls + rooms + fixtures, "rooms": len(rooms), "walls": len(walls),
+                        "fixtures": len(fixtures), "timings": timings})
+
+
+def scan_floor_plan_pyramid(image_path, params=None, levels=DEFAULT_PYRAMID_LEVELS, progress=None,
+                            cancel_event=None, cache=None, timings=None, ingest=None):
+    """Coarse-to-fine scan; returns (elements, rooms_found, walls_found, circles_found).
+
+    See iter_scan_floor_plan_pyramid for how the levels are used.
+    """
+    return collect_scan(iter_scan_floor_plan_pyramid(image_path, params, levels, progress, cancel_event, cache,
+                                                     timings, ingest))
@@ -0,0 +1,152 @@
+# scan_service.py
+import threading
+import traceback
+from kivy.clock import Clock
+from scan_cache import default_cache
+from scan_modes import iter_scan_with_mode
+from scan_ocr import read_dimensions
+from scanner import OCR_AVAILABLE, ImageIngest, ScanCancelled, collect_scan
+from tracing import traced
+
+
+class ScanTimeout(Exception):
+    """Raised (and reported through on_error) when a scan exceeds its time budget."""
+
+
+class ScanService:
+    """Runs the scan and the dimension-label OCR pass on a worker thread.
+
+    Progress, partial results, results and errors are always delivered on the
+    main thread via the Kivy Clock, so callbacks may touch widgets and the
+    designer logic.
+    Only one scan runs at a time; starting a new one cancels the previous.
+    """
+
+    def __init__(self, timeout=120, cache=None):
+        self.timeout = timeout
+        self.cache = cache if cache is not None else default_cache()
+        self._job_id = 0
+        self._cancel_event = None
+        self._thread = None
+        self._timeout_event = None
+
+    @property
+    def busy(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, image_path, on_progress=None, on_complete=None, on_error=None, run_ocr=True, params=None,
+              mode=None, on_partial=None):
+        """Starts scanning image_path in the background and returns immediately.
+
+        params overrides scanner.DEFAULT_SCAN_PARAMS for this scan. mode is one
+        of scan_modes.SCAN_MODES; by default images larger than
+        scan_tiles.TILED_SCAN_THRESHOLD are scanned in tiles. on_partial is
+        called as on_partial(group, elements) for every batch the scan
+        streams out (see scan_modes.iter_scan_with_mode) before on_complete
+        delivers the final elements.
+        """
+        self.cancel()
+        self._job_id += 1
+        job_id = self._job_id
+        cancel_event = threading.Event()
+        self._cancel_event = cancel_event
+        callbacks = (on_progress, on_partial, on_complete, on_error)
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(job_id, image_path, params, mode, cancel_event, run_ocr, callbacks),
+            daemon=True
+        )
+        self._thread.start()
+        if self.timeout:
+            self._timeout_event = Clock.schedule_once(
+                lambda dt: self._on_timeout(job_id, on_error), self.timeout)
+
+    def cancel(self):
+        """Asks the running scan to stop at its next stage boundary; its results are discarded."""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self._cancel_event = None
+        if self._timeout_event is not None:
+            self._timeout_event.cancel()
+            self._timeout_event = None
+        self._job_id += 1  # Invalidate callbacks still in flight
+
+    def _on_timeout(self, job_id, on_error):
+        if job_id != self._job_id:
+            return
+        self.cancel()
+        if on_error:
+            on_error(ScanTimeout(f"Scan did not finish within {self.timeout} seconds."))
+
+    def _dispatch(self, job_id, callback, *args):
+        """Schedules callback(*args) on the main thread unless the job was superseded."""
+        if callback is None:
+            return
+
+        def deliver(dt):
+            if job_id == self._job_id:
+                callback(*args)
+        Clock.schedule_once(deliver, 0)
+
+    def _finish(self, job_id):
+        if job_id == self._job_id and self._timeout_event is not None:
+            self._timeout_event.cancel()
+            self._timeout_event = None
+            self._cancel_event = None
+
+    @traced(category="scan")
+    def _run(self, job_id, image_path, params, mode, cancel_event, run_ocr, callbacks):
+        on_progress, on_partial, on_complete, on_error = callbacks
+
+        def report(stage, fraction):
+            # OpenCV stages take 90% of the bar, OCR the remainder
+            self._dispatch(job_id, on_progress, stage, fraction * 0.9 if run_ocr else fraction)
+
+        def stream(batches):
+            for group, batch in batches:
+                self._dispatch(job_id, on_partial, group, batch)
+                yield group, batch
+
+        timings = {}
+        ingest = ImageIngest(image_path)  # Decoded at most once, for both the scan and OCR
+        try:
+            elements, rooms_found, walls_found, circles_found = collect_scan(stream(iter_scan_with_mode(
+                image_path, mode, params, progress=report, cancel_event=cancel_event, cache=self.cache,
+                timings=timings, ingest=ingest)))
+            numbers = None
+            dimensions = None
+            ocr_error = None
+            if run_ocr and OCR_AVAILABLE:
+                if cancel_event.is_set():
+                    raise ScanCancelled("Scan cancelled before stage 'ocr'")
+                self._dispatch(job_id, on_progress, "ocr", 0.9)
+                try:
+                    walls = [element for element in elements if element["type"] == "wall"]
+                    dimensions = read_dimensions(image_path, walls, cache=self.cache, ingest=ingest)
+                    numbers = [annotation["value"] for annotation in dimensions["annotations"]]
+                except Exception as e:
+                    print(f"Error during scan processing: {e}")
+                    traceback.print_exc()
+                    ocr_error = e
+            result = {
+                "image_path": image_path,
+                "elements": elements,
+                "rooms_found": rooms_found,
+                "walls_found": walls_found,
+                "circles_found": circles_found,
+                "numbers": numbers,
+                "dimensions": dimensions,
+                "ocr_error": ocr_error,
+                "timings": timings,
+            }
+            Clock.schedule_once(lambda dt: self._finish(job_id), 0)
+            self._dispatch(job_id, on_complete, result)
+        except ScanCancelled as e:
+            print(f"Scan cancelled: {e}")
+        except Exception as e:
+            print(f"Scan error in worker: {e}")
+            traceback.print_exc()
+            Clock.schedule_once(lambda dt: self._finish(job_id), 0)
+            self._dispatch(job_id, on_error, e)
+        finally:
+            ingest.release()
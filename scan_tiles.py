@@ -0,0 +1,392 @@
+# scan_tiles.py
+import struct
+import time
+import cv2
+import numpy as np
+from scan_geometry import collinear_pairs, merge_linked_segments, snap_orthogonal
+from scanner import (ScanCancelled, ScanPipeline, collect_scan, detect_segments, group_elements, resolve_params,
+                     select_walls, wall_element)
+
+# Longest side (in pixels) above which the app scans in tiles instead of downscaling to max_dim
+TILED_SCAN_THRESHOLD = 4000
+
+# Parameters expressed in pixels of the max_dim working image; scaled up when tiles run at higher resolution
+LENGTH_PARAMS = ("morph_kernel", "hough_threshold", "hough_min_line_length", "hough_max_line_gap",
+                 "min_wall_length", "merge_distance_tolerance", "merge_gap_tolerance")
+
+# Half-width, in overview pixels, of the band around each overview wall that the tiles search; wide enough
+# for the overview's positional error and both faces of a thick wall
+GUIDE_MARGIN = 8
+
+_REDUCED_GRAYSCALE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def _memmap_pgm(image_path):
+    """Maps a binary 8-bit PGM (P5) file; returns (array, channels, bottom_up) or None."""
+    with open(image_path, 'rb') as f:
+        header = f.read(512)
+    if not header.startswith(b'P5'):
+        return None
+    fields = []
+    pos = 2
+    while len(fields) < 3:
+        while pos < len(header) and header[pos:pos + 1].isspace():
+            pos += 1
+        if header[pos:pos + 1] == b'#':
+            pos = header.index(b'\n', pos) + 1
+            continue
+        end = pos
+        while end < len(header) and not header[end:end + 1].isspace():
+            end += 1
+        fields.append(int(header[pos:end]))
+        pos = end
+    width, height, maxval = fields
+    if maxval > 255:
+        return None
+    array = np.memmap(image_path, dtype=np.uint8, mode='r', offset=pos + 1, shape=(height, width))
+    return array, 1, False
+
+
+def _memmap_bmp(image_path):
+    """Maps an uncompressed 24/32-bit BMP file; returns (array, channels, bottom_up) or None."""
+    with open(image_path, 'rb') as f:
+        header = f.read(54)
+    if len(header) < 54 or header[:2] != b'BM':
+        return None
+    data_offset = struct.unpack_from('<I', header, 10)[0]
+    width, height = struct.unpack_from('<ii', header, 18)
+    bit_count, compression = struct.unpack_from('<HI', header, 28)
+    if compression != 0 or bit_count not in (24, 32):
+        return None
+    channels = bit_count // 8
+    stride = (width * channels + 3) & ~3
+    array = np.memmap(image_path, dtype=np.uint8, mode='r', offset=data_offset, shape=(abs(height), stride))
+    return array[:, :width * channels].reshape(abs(height), width, channels), channels, height > 0
+
+
+def decodes_whole(image_path):
+    """Returns True if TileSource has to decode image_path in one piece, i.e. it is not a mappable BMP or PGM."""
+    return _memmap_pgm(image_path) is None and _memmap_bmp(image_path) is None
+
+
+def image_size(image_path):
+    """Returns (width, height) without decoding pixel data where possible, or None if unknown."""
+    for opener in (_memmap_pgm, _memmap_bmp):
+        mapped = opener(image_path)
+        if mapped is not None:
+            return mapped[0].shape[1], mapped[0].shape[0]
+    try:
+        from PIL import Image
+        with Image.open(image_path) as img:
+            return img.size
+    except Exception:
+        return None
+
+
+class TileSource:
+    """Grayscale pixel access for tiled scanning with bounded memory.
+
+    Uncompressed BMP and binary PGM files are memory-mapped, so only the rows
+    of the tile being read are ever paged in. Compressed formats are decoded
+    once as single-channel grayscale (a third of the BGR buffer cv2.imread
+    would allocate), and with reduction > 1 through OpenCV's reduced decoders,
+    which for JPEG scale in the DCT domain and never materialize the full
+    resolution image. A full-resolution buffer already decoded by an
+    ImageIngest is reused instead. scale maps source pixels back to original
+    image pixels.
+
+    Only the mapped formats are read tile by tile. OpenCV has no decoder for
+    part of a PNG, JPEG or TIFF, so at reduction=1 those are held in memory
+    whole, width * height bytes (400 MB for a 20000 x 20000 plan); the scan
+    popup says so, and converting such plans to BMP or PGM keeps memory
+    bounded. decodes_whole() tells the two cases apart.
+    """
+
+    def __init__(self, image_path, reduction=1, ingest=None):
+        if reduction not in _REDUCED_GRAYSCALE_FLAGS:
+            raise ValueError(f"reduction must be one of {sorted(_REDUCED_GRAYSCALE_FLAGS)}")
+        self.reduction = reduction
+        self.scale = 1.0 / reduction
+        self._mapped = _memmap_pgm(image_path) or _memmap_bmp(image_path)
+        if self._mapped is not None:
+            raw = self._mapped[0]
+            self.height = raw.shape[0] // reduction
+            self.width = raw.shape[1] // reduction
+            self._array = None
+        elif ingest is not None and reduction == 1:
+            self._array = ingest.gray
+            self.height, self.width = self._array.shape[:2]
+        else:
+            self._array = cv2.imread(image_path, _REDUCED_GRAYSCALE_FLAGS[reduction])
+            if self._array is None:
+                raise ValueError("Could not load image. Check file format.")
+            self.height, self.width = self._array.shape[:2]
+
+    def read(self, x, y, width, height):
+        """Returns the grayscale region [y:y+height, x:x+width] (in reduced pixels) as a new array."""
+        if self._array is not None:
+            return np.array(self._array[y:y + height, x:x + width])
+        raw, channels, bottom_up = self._mapped
+        r = self.reduction
+        rows = slice(y * r, (y + height) * r)
+        if bottom_up:
+            total = raw.shape[0]
+            rows = slice(total - (y + height) * r, total - y * r)
+        region = np.array(raw[rows, x * r:(x + width) * r])
+        if bottom_up:
+            region = region[::-1]
+        if channels == 3:
+            region = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+        elif channels == 4:
+            region = cv2.cvtColor(region, cv2.COLOR_BGRA2GRAY)
+        if r > 1:
+            region = cv2.resize(region, (width, height), interpolation=cv2.INTER_AREA)
+        return region
+
+    def tiles(self, tile_size, overlap):
+        """Yields (x, y, width, height) for overlapping tiles covering the source."""
+        step = max(1, tile_size - overlap)
+        for y in range(0, max(1, self.height - overlap), step):
+            for x in range(0, max(1, self.width - overlap), step):
+                yield x, y, min(tile_size, self.width - x), min(tile_size, self.height - y)
+
+    def overview(self, max_dim, strip_rows=256):
+        """Builds a grayscale copy with the longest side at most max_dim, reading in horizontal strips."""
+        factor = min(1.0, max_dim / max(self.width, self.height))
+        out_width = max(1, int(self.width * factor))
+        out_height = max(1, int(self.height * factor))
+        if factor == 1.0:
+            return self.read(0, 0, self.width, self.height), 1.0
+        if self._array is not None:  # Already decoded; one resize beats copying it strip by strip
+            return cv2.resize(self._array, (out_width, out_height), interpolation=cv2.INTER_AREA), factor
+        strips = []
+        produced = 0
+        for y in range(0, self.height, strip_rows):
+            rows = min(strip_rows, self.height - y)
+            target_rows = int(round((y + rows) * factor)) - produced
+            if target_rows <= 0:
+                continue
+            strips.append(cv2.resize(self.read(0, y, self.width, rows), (out_width, target_rows),
+                                     interpolation=cv2.INTER_AREA))
+            produced += target_rows
+        overview = np.vstack(strips)[:out_height]
+        return overview, factor
+
+
+def scale_params(params, factor):
+    """Returns params with pixel-length parameters multiplied by factor.
+
+    The blur kernel is deliberately left alone: a kernel scaled up with the
+    image would wipe out exactly the thin strokes full resolution preserves.
+    """
+    scaled = dict(params)
+    for name in LENGTH_PARAMS:
+        scaled[name] = max(1, int(round(params[name] * factor)))
+    return scaled
+
+
+def snap_rooms_to_walls(rooms, segments, tolerance):
+    """Moves each room side onto the nearest parallel wall within tolerance that spans most of that side."""
+    if len(segments) == 0:
+        return rooms
+    x1, y1, x2, y2 = segments.T
+    vertical = np.isclose(x1, x2)
+    horizontal = np.isclose(y1, y2)
+    for room in rooms:
+        left, top = room["x"], room["y"]
+        right, bottom = left + room["width"], top + room["height"]
+        # Fraction of each wall's span that covers the room side
+        cover_v = (np.minimum(np.maximum(y1, y2), bottom) - np.maximum(np.minimum(y1, y2), top)) / max(bottom - top, 1)
+        cover_h = (np.minimum(np.maximum(x1, x2), right) - np.maximum(np.minimum(x1, x2), left)) / max(right - left, 1)
+        candidates_v = vertical & (cover_v > 0.5)
+        candidates_h = horizontal & (cover_h > 0.5)
+
+        def nearest(mask, coords, value):
+            if not mask.any():
+                return value
+            distances = np.abs(coords[mask] - value)
+            best = np.argmin(distances)
+            return float(coords[mask][best]) if distances[best] <= tolerance else value
+
+        left, right = nearest(candidates_v, x1, left), nearest(candidates_v, x1, right)
+        top, bottom = nearest(candidates_h, y1, top), nearest(candidates_h, y1, bottom)
+        room.update(x=left, y=top, width=right - left, height=bottom - top)
+    return rooms
+
+
+def iter_scan_floor_plan_tiled(image_path, params=None, tile_size=2048, overlap=128, reduction=1,
+                               progress=None, cancel_event=None, cache=None, timings=None, ingest=None):
+    """Scans a large image in overlapping tiles, yielding (group, elements) batches as they become available.
+
+    The overview, a strip-built copy at max_dim spanning the whole plan,
+    decides which lines are walls, as a single-pass scan would; the tiles
+    place them at the source resolution (full resolution for reduction=1).
+    Every tile runs the edge stages with pixel-length parameters scaled up
+    from the max_dim working resolution they are tuned for, keeps only the
+    edges within GUIDE_MARGIN overview pixels of an overview wall, and runs
+    the Hough stage on the outlines of what remains (the faces of the walls;
+    voting with every pixel of a filled thick wall is what made full
+    resolution slow). Tiles no overview wall crosses are skipped.
+    Segments near a tile's inner edge are stitched with the segments of the
+    neighbouring tile across that edge only, so no step handles more than
+    two tiles' worth of segments. Rooms and fixtures come from the overview;
+    rooms are then snapped onto the full-resolution walls, and fixtures look
+    for wall openings along them.
+
+    Walls and rooms found on the overview are yielded first, before any
+    tile is read, and are replaced by the full-resolution batches later (see
+    scanner.collect_scan). Peak memory is a few tile-sized buffers plus the
+    overview. Pass a dict as timings to receive seconds spent per phase.
+    Expect two to three times the time of a single-pass scan of the same image.
+    """
+    params = resolve_params(params)
+    timings = timings if timings is not None else {}
+    key = None
+    if cache is not None:
+        key = cache.make_key(cache.hash_file(image_path), "tiled",
+                             dict(params, tile_size=tile_size, overlap=overlap, reduction=reduction))
+        cached = cache.get(key)
+        if cached is not None:
+            timings.update(cached["timings"])
+            yield from group_elements(cached["elements"])
+            return
+
+    def check(stage, fraction):
+        if cancel_event is not None and cancel_event.is_set():
+            raise ScanCancelled(f"Scan cancelled before stage '{stage}'")
+        if progress is not None:
+            progress(stage, fraction)
+
+    check("decode", 0.0)
+    started = time.perf_counter()
+    source = TileSource(image_path, reduction, ingest)
+    timings["decode"] = time.perf_counter() - started
+    factor = max(1.0, max(source.width, source.height) / params["max_dim"])
+    tile_params = scale_params(params, factor)
+
+    # ---- Provisional walls and rooms from the overview ----
+    check("overview", 0.05)
+    started = time.perf_counter()
+    overview, overview_factor = source.overview(params["max_dim"])
+    overview_pipeline = ScanPipeline(None, params)
+    overview_pipeline.seed(resize=(None, overview_factor * source.scale), grayscale=overview)
+    coarse_walls = overview_pipeline.run("lines")
+    rooms = [dict(room) for room in overview_pipeline.run("rooms")]
+    overview_pipeline.release(keep=("resize", "blur", "regions", "rooms"))
+    timings["overview"] = time.perf_counter() - started
+    yield "walls", coarse_walls
+    yield "rooms", overview_pipeline.run("rooms")
+
+    # ---- Walls per tile, searched for only along the overview walls ----
+    started = time.perf_counter()
+    guides = np.array([[w["x1"], w["y1"], w["x2"], w["y2"]] for w in coarse_walls]).reshape(-1, 4) * source.scale
+    margin = GUIDE_MARGIN / overview_factor
+    tiles = list(source.tiles(tile_size, overlap))
+    interior = []  # Segments away from every inner tile edge are final as they are
+    boundary = []  # Segments near an inner tile edge may continue in the neighbouring tile
+    near_edges = []  # Per tile, which of its inner edges (left, top, right, bottom) each boundary segment is near
+    for index, (x, y, width, height) in enumerate(tiles):
+        check(f"tile {index + 1}/{len(tiles)}", 0.1 + 0.75 * index / len(tiles))
+        local = guides - (x, y, x, y)
+        crossing = ((np.minimum(local[:, 0], local[:, 2]) < width + margin) &
+                    (np.maximum(local[:, 0], local[:, 2]) > -margin) &
+                    (np.minimum(local[:, 1], local[:, 3]) < height + margin) &
+                    (np.maximum(local[:, 1], local[:, 3]) > -margin))
+        if not crossing.any():
+            continue
+        pipeline = ScanPipeline(None, tile_params)
+        pipeline.seed(resize=(None, 1.0), grayscale=source.read(x, y, width, height))
+        edges = pipeline.run("morphology")
+        band = np.zeros_like(edges)
+        for x1, y1, x2, y2 in np.round(local[crossing]).astype(int).tolist():
+            cv2.line(band, (x1, y1), (x2, y2), 255, 2 * int(np.ceil(margin)) + 1)
+        edges = cv2.bitwise_and(edges, band)
+        edges = cv2.subtract(edges, cv2.erode(edges, np.ones((3, 3), np.uint8)))
+        segments = detect_segments(edges, tile_params)
+        pipeline.release()
+        segments[:, [0, 2]] += x
+        segments[:, [1, 3]] += y
+        inner_edges = (x > 0, y > 0, x + width < source.width, y + height < source.height)
+        xs, ys = segments[:, [0, 2]], segments[:, [1, 3]]
+        near = np.column_stack([
+            inner_edges[0] & (xs < x + overlap).any(axis=1),
+            inner_edges[1] & (ys < y + overlap).any(axis=1),
+            inner_edges[2] & (xs > x + width - overlap).any(axis=1),
+            inner_edges[3] & (ys > y + height - overlap).any(axis=1),
+        ]).reshape(-1, 4)
+        on_boundary = near.any(axis=1)
+        interior.append(segments[~on_boundary])
+        boundary.append(segments[on_boundary])
+        near_edges.append((x, y, near[on_boundary]))
+    timings["tiles"] = time.perf_counter() - started
+
+    # ---- Stitch segments across each shared tile edge ----
+    check("stitch", 0.85)
+    started = time.perf_counter()
+    boundary_segments = np.vstack(boundary) if boundary else np.empty((0, 4))
+    first = np.cumsum([0] + [len(segments) for segments in boundary])
+    tile_at = {(x, y): index for index, (x, y, _) in enumerate(near_edges)}
+    step = max(1, tile_size - overlap)
+    pairs_i, pairs_j = [], []
+    for index, (x, y, near) in enumerate(near_edges):
+        # The right edge is shared with the tile one step right, the bottom edge with the tile one step down
+        for side, neighbour_at, neighbour_side in ((2, (x + step, y), 0), (3, (x, y + step), 1)):
+            neighbour = tile_at.get(neighbour_at)
+            if neighbour is None:
+                continue
+            members = np.concatenate([first[index] + np.flatnonzero(near[:, side]),
+                                      first[neighbour] + np.flatnonzero(near_edges[neighbour][2][:, neighbour_side])])
+            i, j = collinear_pairs(boundary_segments[members], tile_params["merge_angle_tolerance"],
+                                   tile_params["merge_distance_tolerance"], tile_params["merge_gap_tolerance"])
+            pairs_i.append(members[i])
+            pairs_j.append(members[j])
+    stitched = merge_linked_segments(boundary_segments,
+                                     np.concatenate(pairs_i) if pairs_i else np.empty(0, dtype=np.int64),
+                                     np.concatenate(pairs_j) if pairs_j else np.empty(0, dtype=np.int64))
+    segments = snap_orthogonal(np.vstack(interior + [stitched]), tile_params["snap_angle_tolerance"])
+    walls = [wall_element(*segments[i], source.scale) for i in select_walls(segments, tile_params)]
+    timings["stitch"] = time.perf_counter() - started
+    yield "walls", walls
+
+    # ---- Rooms snapped to, and fixtures along, the full-resolution walls ----
+    check("rooms", 0.9)
+    started = time.perf_counter()
+    wall_segments = np.array([[w["x1"], w["y1"], w["x2"], w["y2"]] for w in walls]).reshape(-1, 4)
+    rooms = snap_rooms_to_walls(rooms, wall_segments, tolerance=3 / (overview_factor * source.scale))
+    timings["rooms"] = time.perf_counter() - started
+    yield "rooms", rooms
+
+    check("fixtures", 0.95)
+    started = time.perf_counter()
+    overview_pipeline.seed(lines=walls)
+    fixtures = overview_pipeline.run("fixtures")
+    overview_pipeline.release()
+    timings["fixtures"] = time.perf_counter() - started
+    yield "fixtures", fixtures
+
+    if progress is not None:
+        progress("done", 1.0)
+    if key is not None:
+        cache.put(key, {"elements": walls + rooms + fixtures, "rooms": len(rooms), "walls": len(walls),
+                        "fixtures": len(fixtures), "timings": timings})
+
+
+def scan_floor_plan_tiled(image_path, params=None, tile_size=2048, overlap=128, reduction=1,
+                          progress=None, cancel_event=None, cache=None, timings=None, ingest=None):
+    """Scans a large image in overlapping tiles and returns (elements, rooms_found, walls_found, circles_found).
+
+    See iter_scan_floor_plan_tiled for how the image is split and stitched.
+    """
+    return collect_scan(iter_scan_floor_plan_tiled(image_path, params, tile_size, overlap, reduction, progress,
+                                                   cancel_event, cache, timings, ingest))
+
+
+def needs_tiling(image_path, threshold=TILED_SCAN_THRESHOLD):
+    """Returns True if the image's longest side exceeds threshold pixels."""
+    size = image_size(image_path)
+    return size is not None and max(size) > threshold
@@ -0,0 +1,479 @@
+# scanner.py
+import os
+import time
+import cv2
+import numpy as np
+from scan_fixtures import detect_fixtures
+from tracing import span
+from scan_geometry import (as_segments, classify_segments, merge_collinear_segments, segment_lengths_angles,
+                           snap_orthogonal)
+
+try:
+    import pytesseract
+
+
+    if os.name == 'nt':
+        pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+    OCR_AVAILABLE = True
+except ImportError as e:
+    print(f"Warning: OCR libraries not found. OCR functionality will be disabled. Error: {e}")
+    OCR_AVAILABLE = False
+
+# Named pipeline stages in execution order; also the names reported through progress callbacks
+SCAN_STAGES = ("decode", "resize", "grayscale", "blur", "edges", "morphology", "lines", "regions", "rooms",
+               "fixtures")
+
+# Tunable pipeline parameters; the defaults reproduce the original hard-coded pipeline
+DEFAULT_SCAN_PARAMS = {
+    "max_dim": 1200,
+    "blur_kernel": 7,
+    "canny_threshold1": 30,
+    "canny_threshold2": 90,
+    "morph_kernel": 15,
+    "hough_threshold": 80,
+    "hough_min_line_length": 50,
+    "hough_max_line_gap": 20,
+    "max_extra_walls": 30,
+    "min_wall_length": 30,
+    "merge_angle_tolerance": 3,
+    "merge_distance_tolerance": 6,
+    "merge_gap_tolerance": 10,
+    "snap_angle_tolerance": 5,
+    "room_min_area": 5000,  # In pixels of the max_dim working image
+    "room_min_aspect": 0.3,
+    "room_max_aspect": 3.5,
+    "room_gap_close": 25,  # Door openings up to this wide are sealed before segmenting rooms
+    "room_polygon_epsilon": 0.01,  # Outline simplification, as a fraction of the room's perimeter
+    "room_rect_fill": 0.95,  # Rooms filling this much of their bounding box are emitted as rectangles
+    "fixture_min_size": 12,
+    "fixture_max_size": 160,
+    "fixture_line_length": 150,  # Dark runs at least this long are walls, not fixture strokes
+    "fixture_gap_min": 10,
+    "fixture_gap_max": 60,
+    "fixture_size_step": 4,  # Candidate sizes are rounded to this before matching, so templates are reused
+    "fixture_aspect_tolerance": 1.35,
+    "fixture_min_score": 55,  # Template correlation, in percent
+}
+
+class ScanCancelled(Exception):
+    """Raised inside the pipeline when a scan is cancelled between stages."""
+
+
+def resolve_params(params=None):
+    """Returns DEFAULT_SCAN_PARAMS overlaid with params."""
+    resolved = dict(DEFAULT_SCAN_PARAMS)
+    if params:
+        unknown = set(params) - set(resolved)
+        if unknown:
+            raise ValueError(f"Unknown scan parameters: {sorted(unknown)}")
+        resolved.update(params)
+    return resolved
+
+
+def wall_element(x1, y1, x2, y2, scale):
+    return {
+        "type": "wall",
+        "x1": float(x1 / scale),
+        "y1": float(y1 / scale),
+        "x2": float(x2 / scale),
+        "y2": float(y2 / scale)
+    }
+
+
+def load_grayscale(image_path):
+    """Decodes an image file straight to a single-channel uint8 array."""
+    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise ValueError("Could not load image. Check file format.")
+    return img
+
+
+def binarize(gray, threshold):
+    """Maps pixels below threshold to 0 and the rest to 255 in one vectorized pass."""
+    _, binary = cv2.threshold(gray, threshold - 1, 255, cv2.THRESH_BINARY)
+    return binary
+
+
+class ImageIngest:
+    """Decodes an image once, on first use, and shares the grayscale buffer.
+
+    One instance is handed to both the scan and the OCR pass, so the file is
+    decoded a single time however many consumers read it. Nothing is decoded
+    if every consumer is served from the scan cache.
+    """
+
+    def __init__(self, image_path):
+        self.image_path = image_path
+        self._gray = None
+
+    @property
+    def decoded(self):
+        return self._gray is not None
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = load_grayscale(self.image_path)
+        return self._gray
+
+    def release(self):
+        """Drops the decoded buffer; it is decoded again if read afterwards."""
+        self._gray = None
+
+
+# ---- Stage implementations: each takes its dependencies' outputs plus the params ----
+
+def _decode(ingest, params):
+    return ingest.gray
+
+
+def _resize(img, params):
+    """Returns (img_resized, scale) with the longest side capped at max_dim."""
+    orig_height, orig_width = img.shape[:2]
+    max_dim = params["max_dim"]
+    if max(orig_width, orig_height) > max_dim:
+        scale = max_dim / max(orig_width, orig_height)
+        new_width = int(orig_width * scale)
+        new_height = int(orig_height * scale)
+        return cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_AREA), scale
+    return img, 1.0
+
+
+def _grayscale(resized, params):
+    if resized[0].ndim == 2:  # ImageIngest already decodes to grayscale
+        return resized[0]
+    return cv2.cvtColor(resized[0], cv2.COLOR_BGR2GRAY)
+
+
+def _blur(gray, params):
+    return cv2.GaussianBlur(gray, (params["blur_kernel"], params["blur_kernel"]), 0)
+
+
+def _edges(blurred, params):
+    return cv2.Canny(blurred, threshold1=params["canny_threshold1"], threshold2=params["canny_threshold2"],
+                     apertureSize=3)
+
+
+def _morphology(edges, params):
+    kernel_h = cv2.getStructuringElement(cv2.MORPH_RECT, (params["morph_kernel"], 1))
+    kernel_v = cv2.getStructuringElement(cv2.MORPH_RECT, (1, params["morph_kernel"]))
+    edges_closed_h = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel_h)
+    edges_closed_v = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel_v)
+    edges_combined = cv2.bitwise_or(edges_closed_h, edges_closed_v)
+    kernel_general = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+    return cv2.morphologyEx(edges_combined, cv2.MORPH_CLOSE, kernel_general)
+
+
+def detect_segments(edges_final, params):
+    """Hough line detection followed by collinear merging and axis snapping; returns an N x 4 array."""
+    lines = cv2.HoughLinesP(edges_final, rho=1, theta=np.pi / 180, threshold=params["hough_threshold"],
+                            minLineLength=params["hough_min_line_length"], maxLineGap=params["hough_max_line_gap"])
+    segments = merge_collinear_segments(as_segments(lines), params["merge_angle_tolerance"],
+                                        params["merge_distance_tolerance"], params["merge_gap_tolerance"])
+    return snap_orthogonal(segments, params["snap_angle_tolerance"])
+
+
+def select_walls(segments, params):
+    """Returns the indices of the segments kept as walls: the border lines, then the longest others."""
+    if len(segments) == 0:
+        return []
+    lengths, _ = segment_lengths_angles(segments)
+    horizontal, vertical, other = classify_segments(segments)
+    order = np.argsort(-lengths, kind='stable')  # Longest first, ties keep detection order
+    horizontal_idx = order[horizontal[order]]
+    vertical_idx = order[vertical[order]]
+    selected = []
+    if len(horizontal_idx) and len(vertical_idx):
+        # The two longest horizontal and vertical lines are taken as the outer border
+        selected.extend(horizontal_idx[:2].tolist())
+        selected.extend(vertical_idx[:2].tolist())
+        remaining = np.concatenate([order[other[order]], horizontal_idx[2:], vertical_idx[2:]])
+    else:
+        remaining = np.concatenate([order[other[order]], horizontal_idx, vertical_idx])
+    remaining = remaining[np.argsort(-lengths[remaining], kind='stable')][:params["max_extra_walls"]]
+    selected.extend(remaining[lengths[remaining] > params["min_wall_length"]].tolist())
+    return selected
+
+
+def _lines(edges_final, resized, params):
+    """Detects, merges and selects wall segments; returns wall elements in original coordinates."""
+    scale = resized[1]
+    segments = detect_segments(edges_final, params)
+    return [wall_element(*segments[i], scale) for i in select_walls(segments, params)]
+
+
+def room_element(outline, scale, params):
+    """Returns a "room" element for a nearly rectangular outline and a "polygon" element otherwise.
+
+    outline is an N x 2 array in working-image pixels. Polygon points are
+    stored relative to the bounding box (0..1 on each axis), so moving or
+    resizing the element through x/y/width/height moves its outline too.
+    """
+    x, y, w, h = cv2.boundingRect(outline.astype(np.int32))
+    area = cv2.contourArea(outline.astype(np.float32))
+    if area >= params["room_rect_fill"] * w * h:
+        return {
+            "type": "room",
+            "x": float(x / scale),
+            "y": float(y / scale),
+            "width": float(w / scale),
+            "height": float(h / scale)
+        }
+    return {
+        "type": "polygon",
+        "x": float(x / scale),
+        "y": float(y / scale),
+        "width": float(w / scale),
+        "height": float(h / scale),
+        "points": [[float((px - x) / w), float((py - y) / h)] for px, py in outline]
+    }
+
+
+def segment_rooms(blurred, params):
+    """Segments the free space enclosed by walls; returns the rooms' outlines as N x 2 arrays.
+
+    Dark strokes are thresholded into a wall mask, door-sized gaps in it are
+    closed, and the free space is labelled with connected components in one
+    linear pass. Components touching the image border are outside the plan.
+    One findContours pass over the kept components yields every room's
+    outline (nested rooms such as closets included), which is simplified with
+    approxPolyDP. Outlines are in pixels of blurred.
+    """
+    _, walls = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    gap = params["room_gap_close"]
+    walls = cv2.bitwise_or(
+        cv2.morphologyEx(walls, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (gap, 1))),
+        cv2.morphologyEx(walls, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (1, gap))))
+    free = cv2.bitwise_not(walls)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(free, connectivity=4)
+    height, width = free.shape
+    left = stats[:, cv2.CC_STAT_LEFT]
+    top = stats[:, cv2.CC_STAT_TOP]
+    inside = ((left > 0) & (top > 0) & (left + stats[:, cv2.CC_STAT_WIDTH] < width)
+              & (top + stats[:, cv2.CC_STAT_HEIGHT] < height))
+    keep = inside & (stats[:, cv2.CC_STAT_AREA] >= params["room_min_area"])
+    keep[0] = False  # Label 0 is the wall mask itself
+    lookup = np.where(keep, 255, 0).astype(np.uint8)
+    contours, hierarchy = cv2.findContours(lookup[labels], cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+
+    rooms = []
+    for index, cnt in enumerate(contours):
+        if hierarchy[0][index][3] != -1:
+            continue  # Hole in a room (furniture, text), not a room of its own
+        if cv2.contourArea(cnt) <= 0:
+            continue
+        approx = cv2.approxPolyDP(cnt, params["room_polygon_epsilon"] * cv2.arcLength(cnt, True), True)
+        rooms.append(approx.reshape(-1, 2))
+    return rooms
+
+
+def _regions(blurred, params):
+    return segment_rooms(blurred, params)
+
+
+def _rooms(regions, resized, params):
+    """Room segmentation; returns "room" and "polygon" elements in original coordinates."""
+    scale = resized[1]
+    elements = []
+    for outline in regions:
+        _, _, w_rect, h_rect = cv2.boundingRect(outline.astype(np.int32))
+        aspect_ratio = float(w_rect) / h_rect if h_rect > 0 else float('inf')
+        if params["room_min_aspect"] < aspect_ratio < params["room_max_aspect"]:
+            elements.append(room_element(outline, scale, params))
+    return elements
+
+
+def _fixtures(blurred, regions, walls, resized, params):
+    """Template-matched doors, windows and sanitary fixtures, searched only in rooms and wall openings."""
+    scale = resized[1]
+    segments = np.array([[w["x1"], w["y1"], w["x2"], w["y2"]] for w in walls], dtype=np.float64).reshape(-1, 4)
+    fixtures = []
+    for fixture_type, x, y, w, h, rotation in detect_fixtures(blurred, regions, segments * scale, params):
+        if rotation % 180:
+            # Elements store the unrotated footprint and turn about its centre
+            x, y, w, h = x + (w - h) / 2, y + (h - w) / 2, h, w
+        fixtures.append({
+            "type": fixture_type,
+            "x": float(x / scale),
+            "y": float(y / scale),
+            "width": float(w / scale),
+            "height": float(h / scale),
+            "rotation": rotation
+        })
+    return fixtures
+
+
+# stage -> (function, upstream stages passed as arguments, parameters read by the stage itself)
+STAGE_GRAPH = {
+    "decode": (_decode, (), ()),
+    "resize": (_resize, ("decode",), ("max_dim",)),
+    "grayscale": (_grayscale, ("resize",), ()),
+    "blur": (_blur, ("grayscale",), ("blur_kernel",)),
+    "edges": (_edges, ("blur",), ("canny_threshold1", "canny_threshold2")),
+    "morphology": (_morphology, ("edges",), ("morph_kernel",)),
+    "lines": (_lines, ("morphology", "resize"),
+              ("hough_threshold", "hough_min_line_length", "hough_max_line_gap", "max_extra_walls", "min_wall_length",
+               "merge_angle_tolerance", "merge_distance_tolerance", "merge_gap_tolerance", "snap_angle_tolerance")),
+    "regions": (_regions, ("blur",), ("room_min_area", "room_gap_close", "room_polygon_epsilon")),
+    "rooms": (_rooms, ("regions", "resize"), ("room_min_aspect", "room_max_aspect", "room_rect_fill")),
+    "fixtures": (_fixtures, ("blur", "regions", "lines", "resize"),
+                 ("fixture_min_size", "fixture_max_size", "fixture_line_length", "fixture_gap_min", "fixture_gap_max",
+                  "fixture_size_step", "fixture_aspect_tolerance", "fixture_min_score")),
+}
+
+# Result groups returned to callers and the stage producing each of them
+SCAN_GROUPS = (("walls", "lines"), ("rooms", "rooms"), ("fixtures", "fixtures"))
+
+
+def upstream_stages(stage):
+    """Returns stage and every stage it transitively depends on, in execution order."""
+    needed = set()
+    pending = [stage]
+    while pending:
+        current = pending.pop()
+        if current not in needed:
+            needed.add(current)
+            pending.extend(STAGE_GRAPH[current][1])
+    return [s for s in SCAN_STAGES if s in needed]
+
+
+def stage_params(stage):
+    """Returns every parameter that affects the output of stage, including upstream ones."""
+    return tuple(p for s in upstream_stages(stage) for p in STAGE_GRAPH[s][2])
+
+
+class ScanPipeline:
+    """Memoized scan of one image, split into the named stages of STAGE_GRAPH.
+
+    Stage outputs are kept after they are computed. set_params() drops only the
+    stages whose parameters changed plus everything downstream of them, so
+    tuning e.g. the Hough threshold reruns just the lines stage while the
+    decoded, resized, blurred and edge images are reused.
+    """
+
+    def __init__(self, image_path, params=None, progress=None, cancel_event=None, ingest=None):
+        self.image_path = image_path
+        self.ingest = ingest if ingest is not None else ImageIngest(image_path)
+        self.params = resolve_params(params)
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self.outputs = {}
+        self.stage_seconds = {}  # Duration of the most recent run of each stage
+
+    def set_params(self, **changes):
+        """Updates parameters and invalidates the affected stages; returns the invalidated stage names."""
+        changed = {k for k, v in resolve_params(changes).items() if k in changes and self.params[k] != v}
+        self.params.update(changes)
+        dirty = {s for s, (_, _, names) in STAGE_GRAPH.items() if changed & set(names)}
+        invalidated = [s for s in SCAN_STAGES if s in self.outputs and dirty & set(upstream_stages(s))]
+        for s in invalidated:
+            del self.outputs[s]
+        return invalidated
+
+    def run(self, stage):
+        """Returns the output of stage, computing it and any missing upstream stages first."""
+        if stage in self.outputs:
+            return self.outputs[stage]
+        func, deps, _ = STAGE_GRAPH[stage]
+        inputs = [self.run(dep) for dep in deps] if deps else [self.ingest]
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ScanCancelled(f"Scan cancelled before stage '{stage}'")
+        if self.progress is not None:
+            self.progress(stage, SCAN_STAGES.index(stage) / len(SCAN_STAGES))
+        started = time.perf_counter()
+        with span(f"scan.{stage}", "scan"):
+            output = func(*inputs, self.params)
+        self.stage_seconds[stage] = time.perf_counter() - started
+        self.outputs[stage] = output
+        return output
+
+    def result(self):
+        """Runs every group stage and returns (elements, rooms_found, walls_found, circles_found)."""
+        groups = {group: self.run(stage) for group, stage in SCAN_GROUPS}
+        return _combine(groups)
+
+    def seed(self, **outputs):
+        """Supplies precomputed stage outputs, e.g. seed(resize=(None, 1.0), grayscale=tile) for an image tile."""
+        self.outputs.update(outputs)
+
+    def release(self, keep=()):
+        """Drops memoized outputs except those named in keep, freeing their image buffers."""
+        for stage in list(self.outputs):
+            if stage not in keep:
+                del self.outputs[stage]
+
+
+def _combine(groups):
+    scanned_elements = groups["walls"] + groups["rooms"] + groups["fixtures"]
+    return scanned_elements, len(groups["rooms"]), len(groups["walls"]), len(groups["fixtures"])
+
+
+def group_elements(elements):
+    """Splits scanned elements into (group, elements) batches, one per SCAN_GROUPS entry."""
+    groups = {"walls": [], "rooms": [], "fixtures": []}
+    for element in elements:
+        if element["type"] == "wall":
+            groups["walls"].append(element)
+        elif element["type"] in ("room", "polygon"):
+            groups["rooms"].append(element)
+        else:
+            groups["fixtures"].append(element)
+    return [(group, groups[group]) for group, _ in SCAN_GROUPS]
+
+
+def collect_scan(batches):
+    """Consumes (group, elements) batches and returns (elements, rooms_found, walls_found, circles_found).
+
+    A later batch of a group replaces the earlier ones, so provisional
+    results from coarse passes never end up in the returned elements.
+    """
+    groups = {group: [] for group, _ in SCAN_GROUPS}
+    for group, elements in batches:
+        groups[group] = elements
+    return _combine(groups)
+
+
+def iter_scan_floor_plan(image_path, params=None, progress=None, cancel_event=None, cache=None, timings=None,
+                         ingest=None):
+    """Runs the OpenCV pipeline, yielding (group, elements) as each group of SCAN_GROUPS completes.
+
+    Walls come first, then rooms, then fixtures; cached groups are yielded
+    without running their stages. Arguments are as for scan_floor_plan, and
+    stopping the iteration early leaves the remaining stages unrun.
+    """
+    pipeline = ScanPipeline(image_path, params, progress, cancel_event, ingest)
+    image_hash = cache.hash_file(image_path) if cache is not None else None
+    for group, stage in SCAN_GROUPS:
+        key = None
+        if cache is not None:
+            key = cache.make_key(image_hash, group, {p: pipeline.params[p] for p in stage_params(stage)})
+            cached = cache.get(key)
+            if cached is not None:
+                yield group, cached
+                continue
+        elements = pipeline.run(stage)
+        if key is not None:
+            cache.put(key, elements)
+        if timings is not None:
+            timings.update(pipeline.stage_seconds)
+        yield group, elements
+    if progress is not None:
+        progress("done", 1.0)
+
+
+def scan_floor_plan(image_path, params=None, progress=None, cancel_event=None, cache=None, timings=None,
+                    ingest=None):
+    """Runs the OpenCV pipeline and returns (elements, rooms_found, walls_found, circles_found).
+
+    progress is called as progress(stage, fraction) before every stage and
+    cancel_event (a threading.Event) is polled at the same points, so the
+    function is safe to run on a worker thread. When a scan_cache.ScanCache is
+    given, each of walls/rooms/fixtures is looked up under a key made of the
+    image hash and only the parameters that group depends on; the image is
+    only decoded if at least one group misses. Pass a dict as timings to
+    receive the seconds spent in each stage that ran. Pass an ImageIngest to
+    share the decoded image with the OCR pass. iter_scan_floor_plan yields
+    the same results group by group.
+    """
+    return collect_scan(iter_scan_floor_plan(image_path, params, progress, cancel_event, cache, timings, ingest))
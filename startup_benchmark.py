@@ -0,0 +1,170 @@
+# startup_benchmark.py
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup phases in the order they happen, timed from process launch; first_frame runs from the end of
+# MainScreen construction to the first window swap
+PHASES = ("interpreter", "imports", "main_screen", "create_sections", "first_redraw", "first_frame")
+RESULT_PREFIX = "STARTUP_BENCHMARK "  # Marks the child's result line among Kivy's log output
+DEFAULT_RUNS = 5
+DEFAULT_MAX_REGRESSION = 0.2  # Fraction the time to first frame may grow before --compare fails
+CHILD_TIMEOUT = 60  # Seconds a launch may take before it counts as hung
+
+
+def _run_child(launched):
+    """Starts the app in this process and prints the phase timestamps once the first frame is swapped.
+
+    Called in a fresh interpreter by measure_startup; launched is the
+    time.time() of the parent just before it started this process. Every
+    timestamp is milliseconds since then, as (start, end) per phase.
+    """
+    def now():
+        return (time.time() - launched) * 1000
+
+    marks = {"interpreter": (0.0, now())}
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    from kivy.config import Config
+    Config.set('graphics', 'window_state', 'hidden')  # Must be set before the window is created
+
+    started = now()
+    import main
+    from kivy.clock import Clock
+    from kivy.core.window import Window
+    from widgets import FloorPlanCanvas
+    marks["imports"] = (started, now())
+
+    def timed(cls, name, phase):
+        original = getattr(cls, name)
+
+        @functools.wraps(original)  # Kivy binds methods by name
+        def wrapper(*args, **kwargs):
+            if phase in marks:
+                return original(*args, **kwargs)
+            start = now()
+            result = original(*args, **kwargs)
+            marks[phase] = (start, now())
+            return result
+
+        setattr(cls, name, wrapper)
+
+    timed(main.MainScreen, "__init__", "main_screen")
+    timed(main.NavigationToolbar, "create_sections", "create_sections")
+    timed(FloorPlanCanvas, "redraw", "first_redraw")
+
+    app = main.FloorPlanKivyApp()
+
+    def on_flip(*args):
+        if "main_screen" in marks and "first_frame" not in marks:
+            flipped = now()
+            marks["first_frame"] = (marks["main_screen"][1], flipped)
+            app.stop()
+
+    Window.bind(on_flip=on_flip)
+    Clock.schedule_once(lambda dt: app.stop(), CHILD_TIMEOUT)
+    app.run()
+    print(RESULT_PREFIX + json.dumps({phase: [round(t, 2) for t in span] for phase, span in marks.items()}),
+          flush=True)
+
+
+def measure_startup(timeout=CHILD_TIMEOUT):
+    """Launches the app in a new interpreter and returns {phase: [start_ms, end_ms]} since launch."""
+    env = dict(os.environ)
+    env.setdefault("KIVY_NO_ARGS", "1")
+    launched = time.time()
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", repr(launched)],
+                               capture_output=True, text=True, env=env, timeout=timeout,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"Startup run produced no result (exit code {completed.returncode}):\n"
+                       f"{completed.stderr[-2000:]}")
+
+
+def run_benchmark(runs=DEFAULT_RUNS, progress=None):
+    """Measures runs cold starts; returns a report with every run and the median of each phase.
+
+    summary holds the median duration of each phase and launch_to_frame_ms, the
+    median time from launch to the first frame swap.
+    """
+    samples = []
+    for index in range(runs):
+        samples.append(measure_startup())
+        if progress is not None:
+            progress(index + 1, runs)
+    summary = {}
+    for phase in PHASES:
+        durations = [run[phase][1] - run[phase][0] for run in samples if phase in run]
+        summary[f"{phase}_ms"] = round(statistics.median(durations), 2) if durations else None
+    summary["launch_to_frame_ms"] = round(statistics.median(run["first_frame"][1] for run in samples), 2)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "runs": samples,
+        "summary": summary,
+    }
+
+
+def compare_reports(baseline, report, max_regression=DEFAULT_MAX_REGRESSION):
+    """Renders the change of every summary figure; returns (text, regressed).
+
+    regressed is True when the time to first frame grew by more than
+    max_regression (a fraction) over the baseline.
+    """
+    lines = [f"{'metric':<22} {'baseline':>10} {'current':>10} {'change':>9}"]
+    for name, new in report["summary"].items():
+        old = baseline["summary"].get(name)
+        change = f"{(new - old) / old:+.1%}" if old and new is not None else "-"
+        lines.append(f"{name:<22} {str(old):>10} {str(new):>10} {change:>9}")
+    old, new = baseline["summary"]["launch_to_frame_ms"], report["summary"]["launch_to_frame_ms"]
+    regressed = new > old * (1 + max_regression)
+    if regressed:
+        lines.append(f"Time to first frame regressed by more than {max_regression:.0%}")
+    return "\n".join(lines), regressed
+
+
+def format_report(report):
+    """Renders the median phase durations as a plain-text table."""
+    lines = [f"{'phase':<18} {'median ms':>10}"]
+    for phase in PHASES:
+        value = report["summary"][f"{phase}_ms"]
+        lines.append(f"{phase:<18} {'-' if value is None else f'{value:.1f}':>10}")
+    lines.append(f"{'launch to frame':<18} {report['summary']['launch_to_frame_ms']:>10.1f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the app's cold start, from launch to the first frame.")
+    parser.add_argument('-o', '--output', default='startup_benchmark.json', help="Results file (default: %(default)s)")
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help="Cold starts; medians are reported")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    parser.add_argument('--max-regression', type=float, default=DEFAULT_MAX_REGRESSION,
+                        help="With --compare, exit with 1 if the time to first frame grew by more than this "
+                             "fraction (default: %(default)s)")
+    parser.add_argument('--child', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child is not None:
+        _run_child(args.child)
+        return 0
+    report = run_benchmark(args.runs, progress=lambda done, total: print(f"[{done}/{total}] started"))
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(format_report(report))
+    if args.compare:
+        with open(args.compare) as f:
+            text, regressed = compare_reports(json.load(f), report, args.max_regression)
+        print(text)
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,332 @@
+# touch_recorder.py
+import argparse
+import copy
+import functools
+import json
+import os
+import statistics
+import sys
+import time
+
+if __name__ == '__main__':
+    os.environ.setdefault("KIVY_NO_ARGS", "1")  # The command line options below are ours, not Kivy's
+from kivy.clock import Clock
+from kivy.input.motionevent import MotionEvent
+
+SESSION_VERSION = 1
+# FloorPlanDesignerLogic methods the toolbar calls; recorded with their arguments and replayed as actions
+ACTIONS = ("set_placing_type", "set_placing_text", "start_wall_placement", "toggle_rotation", "delete_selected",
+           "undo", "redo", "add_room", "add_house_border", "add_preset", "generate_floor_plan")
+TOUCH_EVENTS = ("on_touch_down", "on_touch_move", "on_touch_up")
+# Designer state restored before a replay, next to the elements
+STATE_FIELDS = ("grid_size", "meters_to_pixels_factor", "rotation", "placing_type", "placing_wall",
+                "wall_start_point", "deleting")
+
+
+class ScriptedTouch(MotionEvent):
+    """A touch at canvas coordinates, dispatched straight to the canvas without going through a window."""
+
+    def __init__(self, x, y):
+        super().__init__("scripted", 1, (x, y), is_touch=True, type_id='touch')
+        self.profile = ['pos']
+
+    def depack(self, args):
+        self.x, self.y = args
+        self.pos = args
+        super().depack(args)
+
+    def move_to(self, x, y):
+        self.dx, self.dy = x - self.x, y - self.y
+        self.x, self.y = x, y
+        self.pos = (x, y)
+
+
+def capture_state(logic):
+    """The designer state a session starts from, as plain JSON data."""
+    state = {field: getattr(logic, field, None) for field in STATE_FIELDS}
+    state["elements"] = copy.deepcopy(logic.elements)
+    selected = logic.selected_element
+    state["selected_index"] = next((i for i, e in enumerate(logic.elements) if e is selected), None)
+    return json.loads(json.dumps(state))
+
+
+def restore_state(logic, state, reset_history=True):
+    """Puts logic into a captured state; with reset_history the history restarts from it."""
+    for field in STATE_FIELDS:
+        setattr(logic, field, state.get(field))
+    if logic.wall_start_point is not None:
+        logic.wall_start_point = tuple(logic.wall_start_point)
+    logic.elements = copy.deepcopy(state["elements"])
+    index = state.get("selected_index")
+    logic.selected_element = logic.elements[index] if index is not None else None
+    if reset_history:
+        logic.history = []
+        logic.redo_stack = []
+        logic.save_history()
+
+
+class SessionRecorder:
+    """Records the touches a FloorPlanCanvas receives and the toolbar actions on its designer logic.
+
+    Touches and actions are recorded by wrapping the canvas touch handlers
+    and ACTIONS on their instances while recording; the wrappers also
+    count how deep inside a touch or action a call is, so history saved by
+    those is not recorded twice. Changes to the plan that are neither (an
+    import replacing the elements, scanned or text elements added and
+    saved to history) are stored as state events with the whole designer
+    state, so replay stays exact.
+    """
+
+    def __init__(self, canvas_widget):
+        self.canvas_widget = canvas_widget
+        self.logic = canvas_widget.designer_logic
+        self.recording = False
+        self.session = None
+        self._started = 0.0
+        self._action_depth = 0
+        self._touch_depth = 0
+        self._seen = None
+
+    def start(self):
+        if self.recording:
+            return
+        self.session = {
+            "version": SESSION_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "canvas_pos": list(self.canvas_widget.pos),  # Touches are recorded in the canvas parent's coordinates
+            "canvas_size": list(self.canvas_widget.size),
+            "initial": capture_state(self.logic),
+            "events": [],
+        }
+        self._started = time.perf_counter()
+        self._seen = self._plan_marker()
+        for name in TOUCH_EVENTS:
+            setattr(self.canvas_widget, name, self._recorded_touch(name, getattr(self.canvas_widget, name)))
+        for name in ACTIONS:
+            setattr(self.logic, name, self._recorded(name, getattr(self.logic, name)))
+        self.logic.save_history = self._observed(self.logic.save_history)
+        self.recording = True
+
+    def stop(self):
+        """Stops recording; returns the session."""
+        if not self.recording:
+            return self.session
+        for name in TOUCH_EVENTS:
+            vars(self.canvas_widget).pop(name, None)  # Falls back to the class's method
+        for name in ACTIONS + ("save_history",):
+            vars(self.logic).pop(name, None)
+        self.recording = False
+        return self.session
+
+    def save(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.session, f)
+        return path
+
+    def _now(self):
+        return time.perf_counter() - self._started
+
+    def _plan_marker(self):
+        # Touch handlers change the element list in place; anything that replaces it is not a touch
+        return id(self.logic.elements), getattr(self.logic, 'deleting', False)
+
+    def _append_state(self, saved):
+        event = {"t": self._now(), "kind": "state", "state": capture_state(self.logic), "saved": saved}
+        self.session["events"].append(event)
+        self._seen = self._plan_marker()
+
+    def _append(self, event):
+        if self._plan_marker() != self._seen:
+            self._append_state(saved=False)
+        self.session["events"].append(event)
+
+    def _recorded_touch(self, name, handler):
+        phase = name[len("on_touch_"):]
+
+        # Kivy's dispatch looks handlers up by name, so the instance attribute takes the place of the method
+        @functools.wraps(handler)
+        def wrapper(touch):
+            self._append({"t": self._now(), "kind": "touch", "phase": phase, "uid": touch.uid,
+                          "pos": list(touch.pos)})
+            self._touch_depth += 1
+            try:
+                return handler(touch)
+            finally:
+                self._touch_depth -= 1
+        return wrapper
+
+    def _recorded(self, name, method):
+        def wrapper(*args):
+            if self._action_depth:
+                return method(*args)  # Called by another action; replaying that one repeats this
+            self._append({"t": self._now(), "kind": "action", "name": name, "args": json.loads(json.dumps(args))})
+            self._action_depth += 1
+            try:
+                return method(*args)
+            finally:
+                self._action_depth -= 1
+                self._seen = self._plan_marker()
+        return wrapper
+
+    def _observed(self, save_history):
+        def wrapper():
+            save_history()
+            if not self._action_depth and not self._touch_depth:
+                self._append_state(saved=True)
+        return wrapper
+
+
+def load_session(path):
+    with open(path) as f:
+        session = json.load(f)
+    if session.get("version") != SESSION_VERSION:
+        raise ValueError(f"Unsupported session version {session.get('version')}")
+    return session
+
+
+class SessionReplayer:
+    """Feeds a recorded session back into a FloorPlanCanvas.
+
+    run() replays synchronously at maximum speed; play() replays through the
+    Clock at the recorded pace (scaled by speed), keeping the app
+    responsive. Either way every event's handling time is collected in
+    timings, as (event index, kind, name or phase, ms).
+    """
+
+    def __init__(self, canvas_widget, session):
+        self.canvas_widget = canvas_widget
+        self.logic = canvas_widget.designer_logic
+        self.session = session
+        self.timings = []
+        self._touches = {}
+        self._event = None
+
+    def reset(self):
+        restore_state(self.logic, self.session["initial"])
+        self.timings = []
+        self._touches = {}
+        self.canvas_widget.redraw()
+
+    def apply(self, index):
+        """Applies event index and records how long it took."""
+        event = self.session["events"][index]
+        started = time.perf_counter()
+        if event["kind"] == "touch":
+            self._dispatch_touch(event)
+            label = event["phase"]
+        elif event["kind"] == "action":
+            getattr(self.logic, event["name"])(*event["args"])
+            self.canvas_widget.redraw()  # As the toolbar does after every action
+            label = event["name"]
+        else:
+            restore_state(self.logic, event["state"], reset_history=False)
+            if event["saved"]:
+                self.logic.save_history()
+            self.canvas_widget.redraw()
+            label = "saved" if event["saved"] else "replaced"
+        self.timings.append((index, event["kind"], label, (time.perf_counter() - started) * 1000))
+
+    def _dispatch_touch(self, event):
+        x, y = event["pos"]
+        if event["phase"] == "down":
+            touch = self._touches[event["uid"]] = ScriptedTouch(x, y)
+        else:
+            touch = self._touches.get(event["uid"])
+            if touch is None:
+                return  # Began before the recording started
+            touch.move_to(x, y)
+        self.canvas_widget.dispatch(f"on_touch_{event['phase']}", touch)
+        if event["phase"] == "up":
+            del self._touches[event["uid"]]
+
+    def run(self):
+        """Replays every event as fast as possible; returns timings."""
+        self.reset()
+        for index in range(len(self.session["events"])):
+            self.apply(index)
+        return self.timings
+
+    def play(self, speed=1.0, on_done=None):
+        """Replays at the recorded pace divided by speed; on_done(timings) is called at the end."""
+        self.stop()
+        self.reset()
+        events = self.session["events"]
+        started = time.perf_counter()
+
+        def step(index):
+            if index >= len(events):
+                self._event = None
+                if on_done is not None:
+                    on_done(self.timings)
+                return
+            self.apply(index)
+            if index + 1 < len(events):
+                due = events[index + 1]["t"] / speed - (time.perf_counter() - started)
+            else:
+                due = 0
+            self._event = Clock.schedule_once(lambda dt: step(index + 1), max(0, due))
+
+        self._event = Clock.schedule_once(lambda dt: step(0), 0)
+
+    def stop(self):
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+
+def summarize_timings(timings, slowest=10):
+    """Per (kind, name or phase): count, total, mean and max ms; plus the slowest single events."""
+    groups = {}
+    for _, kind, label, ms in timings:
+        groups.setdefault(f"{kind}:{label}", []).append(ms)
+    return {
+        "total_ms": round(sum(ms for *_, ms in timings), 3),
+        "events": len(timings),
+        "by_event": {key: {"count": len(values), "total_ms": round(sum(values), 3),
+                           "mean_ms": round(statistics.mean(values), 3), "max_ms": round(max(values), 3)}
+                     for key, values in sorted(groups.items(), key=lambda item: -sum(item[1]))},
+        "slowest": [{"index": index, "event": f"{kind}:{label}", "ms": round(ms, 3)}
+                    for index, kind, label, ms in sorted(timings, key=lambda timing: -timing[3])[:slowest]],
+    }
+
+
+def format_summary(summary):
+    lines = [f"{summary['events']} events replayed in {summary['total_ms']:.1f} ms",
+             f"{'event':<32} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+    for key, entry in summary["by_event"].items():
+        lines.append(f"{key:<32} {entry['count']:>6} {entry['total_ms']:>10.2f} {entry['mean_ms']:>9.3f} "
+                     f"{entry['max_ms']:>9.2f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded touch session headlessly at maximum speed.")
+    parser.add_argument('session', help="Session file saved from the Debug section")
+    parser.add_argument('--repeat', type=int, default=1, help="Replays; timings of the last one are reported")
+    parser.add_argument('--trace', help="Also write a trace of the last replay to this file")
+    parser.add_argument('--json', action='store_true', help="Print the summary as JSON")
+    args = parser.parse_args(argv)
+    from kivy.config import Config
+    Config.set('graphics', 'window_state', 'hidden')
+    import tracing
+    from floorplan_designer import FloorPlanDesignerLogic
+    from widgets import FloorPlanCanvas
+    session = load_session(args.session)
+    canvas = FloorPlanCanvas(FloorPlanDesignerLogic(), pos=session["canvas_pos"], size=session["canvas_size"])
+    replayer = SessionReplayer(canvas, session)
+    for attempt in range(args.repeat):
+        if args.trace and attempt == args.repeat - 1:
+            tracing.start()
+        replayer.run()
+    if args.trace:
+        tracing.write(args.trace, tracing.stop())
+    summary = summarize_timings(replayer.timings)
+    print(json.dumps(summary, indent=4) if args.json else format_summary(summary))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# tracing.py
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Events kept while tracing; older ones are dropped, so a long session keeps the part leading up to a hang
+DEFAULT_MAX_EVENTS = 200000
+# Set to a file path to trace from startup and write the trace when the process exits
+TRACE_ENV = "AUTOGEN_TRACE"
+
+_enabled = False
+_events = deque(maxlen=DEFAULT_MAX_EVENTS)
+_origin_ns = time.perf_counter_ns()
+_pid = os.getpid()
+
+
+class _Span:
+    """Records a begin event on enter and an end event on exit.
+
+    Begin and end are separate events so a span that never finishes (a
+    hang) still shows up in the trace, open until the end.
+    """
+    __slots__ = ("name", "category", "args")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        _record("B", self.name, self.category, self.args)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _record("E", self.name, self.category, {"error": exc_type.__name__} if exc_type is not None else None)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _record(phase, name, category, args):
+    event = {"name": name, "cat": category, "ph": phase, "ts": (time.perf_counter_ns() - _origin_ns) / 1000,
+             "pid": _pid, "tid": threading.get_ident()}
+    if args:
+        event["args"] = args
+    _events.append(event)  # deque.append is atomic, so worker threads need no lock
+
+
+def span(name, category="app", **args):
+    """Context manager timing a block as a trace span; args are shown with the span in the viewer.
+
+    While tracing is off this returns a shared no-op object, so the cost is
+    one call and one flag check.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, category, args)
+
+
+def traced(name=None, category="app"):
+    """Decorator tracing every call of a function as a span named name (default: its qualified name)."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(label, category, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def instant(name, category="app", **args):
+    """Records a point in time, e.g. a user action."""
+    if _enabled:
+        _record("i", name, category, args)
+
+
+def is_enabled():
+    return _enabled
+
+
+def start(max_events=DEFAULT_MAX_EVENTS):
+    """Starts tracing with an empty buffer of at most max_events events."""
+    global _enabled, _events
+    _events = deque(maxlen=max_events)
+    _enabled = True
+
+
+def stop():
+    """Stops tracing; returns the recorded events, which stay available to write()."""
+    global _enabled
+    _enabled = False
+    return list(_events)
+
+
+def write(path, events=None):
+    """Writes events (default: the current buffer) as Chrome trace-event JSON; returns path.
+
+    The file opens in chrome://tracing, Perfetto or any other viewer of the
+    trace-event format. Threads are named after their threading.Thread.
+    """
+    events = list(_events) if events is None else events
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    metadata = [{"name": "thread_name", "ph": "M", "pid": _pid, "tid": tid, "args": {"name": names.get(tid, str(tid))}}
+                for tid in sorted({event["tid"] for event in events})]
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+    return path
+
+
+def _start_from_env():
+    path = os.environ.get(TRACE_ENV)
+    if path:
+        start()
+        atexit.register(lambda: write(path))
+
+
+_start_from_env()
@@ -2,10 +2,10 @@
 from kivy.uix.widget import Widget
 from kivy.graphics import Color, Line, Rectangle, Ellipse, InstructionGroup, PushMatrix, PopMatrix, Rotate
 from kivy.graphics.transformation import Matrix
-from kivy.core.window import Window
 from kivy.uix.label import Label
 from kivy.metrics import dp
 import math
+from tracing import traced
 
 class FloorPlanCanvas(Widget):
     def __init__(self, designer_logic, **kwargs):
@@ -38,13 +38,17 @@ class FloorPlanCanvas(Widget):
         # Instruction Groups for layers
         self.grid_layer = InstructionGroup()
         self.elements_layer = InstructionGroup()
+        self.provisional_layer = InstructionGroup() # Scan results still streaming in; not in the model or history
         self.selection_layer = InstructionGroup()
         self.preview_layer = InstructionGroup() # For wall placement preview
         self.canvas.add(self.grid_layer)
         self.canvas.add(self.elements_layer)
+        self.canvas.add(self.provisional_layer)
         self.canvas.add(self.selection_layer)
         self.canvas.add(self.preview_layer)
 
+        self.provisional_batches = {} # Maps scan group name to its latest provisional elements
+
         # --- Add dictionary to track text labels ---
         self.text_labels = {} # Maps element id to Label widget
 
@@ -56,11 +60,36 @@ class FloorPlanCanvas(Widget):
             self.bg_rect.size = instance.size
             self.bg_rect.pos = instance.pos
 
+    @traced(category="render")
     def redraw(self, *args):
         self.draw_grid()
         self.draw_elements()
+        self.draw_provisional()
         self.draw_selection() # Draw selection/highlights
 
+    def set_provisional(self, group, elements):
+        """Shows elements as the provisional batch of group, replacing that group's previous batch.
+
+        Provisional elements are drawn on their own layer only: they cannot be
+        selected and are not part of designer_logic.elements or its history.
+        """
+        self.provisional_batches[group] = elements
+        self.draw_provisional()
+
+    def clear_provisional(self):
+        self.provisional_batches = {}
+        self.provisional_layer.clear()
+
+    @traced(category="render")
+    def draw_provisional(self):
+        self.provisional_layer.clear()
+        if not self.provisional_batches:
+            return
+        for elements in self.provisional_batches.values():
+            for element in elements:
+                self.draw_element(element, self.provisional_layer)
+
+    @traced(category="render")
     def draw_grid(self):
         self.grid_layer.clear()
         if self.grid_size <= 0:
@@ -84,6 +113,7 @@ class FloorPlanCanvas(Widget):
             line_instruction = Line(points=[x_offset, y_offset + y, x_offset + width, y_offset + y], width=1)
             self.grid_layer.add(line_instruction)
 
+    @traced(category="render")
     def draw_elements(self):
         self.elements_layer.clear()
 
@@ -100,7 +130,15 @@ class FloorPlanCanvas(Widget):
         for element in self.designer_logic.elements:
             self.draw_element(element)
 
-    def draw_element(self, element):
+    @traced(category="render")
+    def draw_appended(self, elements):
+        """Draws elements just appended to the plan on top of the existing drawing, without a full redraw."""
+        for element in elements:
+            self.draw_element(element)
+
+    def draw_element(self, element, layer=None):
+        if layer is None:
+            layer = self.elements_layer
 
         element_type = element.get("type")
         x, y = element.get("x", 0), element.get("y", 0)
@@ -109,66 +147,73 @@ class FloorPlanCanvas(Widget):
         should_rotate = rotation != 0 and element_type not in ["wall"] # Walls don't rotate
         if should_rotate:
 
-            if element_type in ["room", "houseBorder"]:
+            if element_type in ["room", "houseBorder", "polygon"]:
                 w, h = element["width"], element["height"]
             else:
                 size = self.designer_logic.get_appliance_size(element_type)
                 w, h = size["width"], size["height"]
 
             # Apply rotation transformation
-            self.elements_layer.add(PushMatrix())
+            layer.add(PushMatrix())
             # Rotate around the center of the element
             pivot_x = x + w / 2.0
             pivot_y = y + h / 2.0
-            self.elements_layer.add(Rotate(angle=rotation, origin=(pivot_x, pivot_y)))
+            layer.add(Rotate(angle=rotation, origin=(pivot_x, pivot_y)))
 
         # Draw the specific element type
         if element_type == "room":
-            self._draw_single_line_rect(element["x"], element["y"], element["width"], element["height"])
+            self._draw_single_line_rect(element["x"], element["y"], element["width"], element["height"], layer)
+        elif element_type == "polygon":
+            self._draw_polygon(element, layer)
         elif element_type == "houseBorder":
-            self._draw_house_border(element["x"], element["y"], element["width"], element["height"])
+            self._draw_house_border(element["x"], element["y"], element["width"], element["height"], layer)
         elif element_type == "wall":
-            self._draw_wall(element["x1"], element["y1"], element["x2"], element["y2"])
+            self._draw_wall(element["x1"], element["y1"], element["x2"], element["y2"], layer)
         else: # Appliances (including text)
-            self._draw_appliance(element)
+            self._draw_appliance(element, layer)
 
         if should_rotate:
-            self.elements_layer.add(PopMatrix()) # Revert transformation
+            layer.add(PopMatrix()) # Revert transformation
 
-    def _draw_single_line_rect(self, x, y, width, height):
-        self.elements_layer.add(Color(0, 0, 0, 1)) # Black
+    def _draw_single_line_rect(self, x, y, width, height, layer):
+        layer.add(Color(0, 0, 0, 1)) # Black
         line_instruction = Line(rectangle=(x, y, width, height), width=2)
-        self.elements_layer.add(line_instruction)
+        layer.add(line_instruction)
+
+    def _draw_polygon(self, element, layer):
+        points = self.designer_logic.get_polygon_points(element)
+        layer.add(Color(0, 0, 0, 1)) # Black
+        layer.add(Line(points=[coord for point in points for coord in point], width=2, close=True))
 
-    def _draw_house_border(self, x, y, width, height):
+    def _draw_house_border(self, x, y, width, height, layer):
          border_width = dp(10)
-         self.elements_layer.add(Color(0, 0, 0, 1)) # Black
+         layer.add(Color(0, 0, 0, 1)) # Black
          # Outer border
-         self.elements_layer.add(Line(rectangle=(x, y, width, height), width=2))
+         layer.add(Line(rectangle=(x, y, width, height), width=2))
          # Inner border
-         self.elements_layer.add(Line(rectangle=(x + border_width, y + border_width, width - 2 * border_width, height - 2 * border_width), width=2))
+         layer.add(Line(rectangle=(x + border_width, y + border_width, width - 2 * border_width, height - 2 * border_width), width=2))
          # Window line (simplified)
-         self.elements_layer.add(Line(points=[x + width / 2 - dp(15), y + border_width / 2, x + width / 2 + dp(15), y + border_width / 2], width=4))
+         layer.add(Line(points=[x + width / 2 - dp(15), y + border_width / 2, x + width / 2 + dp(15), y + border_width / 2], width=4))
          # Door opening (white rectangle to erase part of wall)
-         self.elements_layer.add(Color(1, 1, 1, 1)) # White
-         self.elements_layer.add(Rectangle(pos=(x, y + height / 2 - dp(20)), size=(border_width, dp(40))))
-         self.elements_layer.add(Color(0, 0, 0, 1)) # Black
+         layer.add(Color(1, 1, 1, 1)) # White
+         layer.add(Rectangle(pos=(x, y + height / 2 - dp(20)), size=(border_width, dp(40))))
+         layer.add(Color(0, 0, 0, 1)) # Black
          # Door frame
-         self.elements_layer.add(Line(rectangle=(x - dp(2), y + height / 2 - dp(20), border_width + dp(4), dp(40)), width=3))
+         layer.add(Line(rectangle=(x - dp(2), y + height / 2 - dp(20), border_width + dp(4), dp(40)), width=3))
 
-    def _draw_wall(self, x1, y1, x2, y2):
-        self.elements_layer.add(Color(0, 0, 0, 1)) # Black
+    def _draw_wall(self, x1, y1, x2, y2, layer):
+        layer.add(Color(0, 0, 0, 1)) # Black
         line_instruction = Line(points=[x1, y1, x2, y2], width=2)
-        self.elements_layer.add(line_instruction)
+        layer.add(line_instruction)
 
-    def _draw_appliance(self, element):
+    def _draw_appliance(self, element, layer):
         x, y = element["x"], element["y"]
         etype = element["type"]
 
         size = element.get("customSize", self.designer_logic.get_appliance_size(etype))
         width, height = size["width"], size["height"]
 
-        self.elements_layer.add(Color(0, 0, 0, 1))  # Default black outline
+        layer.add(Color(0, 0, 0, 1))  # Default black outline
 
         if etype == "text":
 
@@ -215,126 +260,126 @@ class FloorPlanCanvas(Widget):
 
         if etype in ["bed-single", "bed-double", "bed-queen", "bed-king"]:
             # White mattress
-            self.elements_layer.add(Color(1, 1, 1, 1)) # White fill
-            self.elements_layer.add(Rectangle(pos=(x, y), size=(width, height)))
-            self.elements_layer.add(Color(0, 0, 0, 1)) # Black outline
-            self.elements_layer.add(Line(rectangle=(x, y, width, height), width=2))
+            layer.add(Color(1, 1, 1, 1)) # White fill
+            layer.add(Rectangle(pos=(x, y), size=(width, height)))
+            layer.add(Color(0, 0, 0, 1)) # Black outline
+            layer.add(Line(rectangle=(x, y, width, height), width=2))
 
             # Gray pillows (top)
             pillow_h = dp(15)
-            self.elements_layer.add(Color(0.94, 0.94, 0.94, 1)) # #f0f0f0
-            self.elements_layer.add(Rectangle(pos=(x + dp(5), y + dp(5)), size=(width - dp(10), pillow_h)))
-            self.elements_layer.add(Color(0, 0, 0, 1))
-            self.elements_layer.add(Line(rectangle=(x + dp(5), y + dp(5), width - dp(10), pillow_h), width=1))
+            layer.add(Color(0.94, 0.94, 0.94, 1)) # #f0f0f0
+            layer.add(Rectangle(pos=(x + dp(5), y + dp(5)), size=(width - dp(10), pillow_h)))
+            layer.add(Color(0, 0, 0, 1))
+            layer.add(Line(rectangle=(x + dp(5), y + dp(5), width - dp(10), pillow_h), width=1))
 
             # Light gray blanket
             blanket_y = y + dp(5) + pillow_h + dp(5)
-            self.elements_layer.add(Color(0.88, 0.88, 0.88, 1)) # #e0e0e0
-            self.elements_layer.add(Rectangle(pos=(x + dp(5), blanket_y), size=(width - dp(10), height - dp(5) - (blanket_y - y))))
-            self.elements_layer.add(Color(0, 0, 0, 1))
-            self.elements_layer.add(Line(rectangle=(x + dp(5), blanket_y, width - dp(10), height - dp(5) - (blanket_y - y)), width=1))
+            layer.add(Color(0.88, 0.88, 0.88, 1)) # #e0e0e0
+            layer.add(Rectangle(pos=(x + dp(5), blanket_y), size=(width - dp(10), height - dp(5) - (blanket_y - y))))
+            layer.add(Color(0, 0, 0, 1))
+            layer.add(Line(rectangle=(x + dp(5), blanket_y, width - dp(10), height - dp(5) - (blanket_y - y)), width=1))
 
         elif etype == "table":
             # Table top
-            self.elements_layer.add(Line(rectangle=(x, y, width, height), width=2))
+            layer.add(Line(rectangle=(x, y, width, height), width=2))
 
             # Simplified chairs (small squares instead of lines/slashes)
             chair_size = dp(12)
-            self.elements_layer.add(Color(0, 0, 0, 1))
+            layer.add(Color(0, 0, 0, 1))
 
             # Top chairs
-            self.elements_layer.add(
+            layer.add(
                 Rectangle(pos=(x + width / 4 - chair_size / 2, y - chair_size - dp(3)), size=(chair_size, chair_size)))
-            self.elements_layer.add(Rectangle(pos=(x + 3 * width / 4 - chair_size / 2, y - chair_size - dp(3)),
+            layer.add(Rectangle(pos=(x + 3 * width / 4 - chair_size / 2, y - chair_size - dp(3)),
                                               size=(chair_size, chair_size)))
 
             # Bottom chairs
-            self.elements_layer.add(
+            layer.add(
                 Rectangle(pos=(x + width / 4 - chair_size / 2, y + height + dp(3)), size=(chair_size, chair_size)))
-            self.elements_layer.add(
+            layer.add(
                 Rectangle(pos=(x + 3 * width / 4 - chair_size / 2, y + height + dp(3)), size=(chair_size, chair_size)))
 
             # Side chairs
-            self.elements_layer.add(
+            layer.add(
                 Rectangle(pos=(x - chair_size - dp(3), y + height / 2 - chair_size / 2), size=(chair_size, chair_size)))
-            self.elements_layer.add(
+            layer.add(
                 Rectangle(pos=(x + width + dp(3), y + height / 2 - chair_size / 2), size=(chair_size, chair_size)))
 
         elif etype == "sofa":
             body_pad = dp(8)
             # Main body/backrest
-            self.elements_layer.add(Color(0.82, 0.82, 0.82, 1)) # #d0d0d0
-            self.elements_layer.add(Rectangle(pos=(x, y), size=(width, height)))
-            self.elements_layer.add(Rectangle(pos=(x - body_pad, y - dp(5)), size=(width + 2 * body_pad, dp(12))))
+            layer.add(Color(0.82, 0.82, 0.82, 1)) # #d0d0d0
+            layer.add(Rectangle(pos=(x, y), size=(width, height)))
+            layer.add(Rectangle(pos=(x - body_pad, y - dp(5)), size=(width + 2 * body_pad, dp(12))))
 
             # Armrests
-            self.elements_layer.add(Rectangle(pos=(x - body_pad, y), size=(body_pad, height)))
-            self.elements_layer.add(Rectangle(pos=(x + width, y), size=(body_pad, height)))
+            layer.add(Rectangle(pos=(x - body_pad, y), size=(body_pad, height)))
+            layer.add(Rectangle(pos=(x + width, y), size=(body_pad, height)))
 
-            self.elements_layer.add(Color(0, 0, 0, 1)) # Black outline
-            self.elements_layer.add(Line(rectangle=(x, y, width, height), width=2))
-            self.elements_layer.add(Line(points=[x - body_pad, y - dp(5), x + width + body_pad, y - dp(5)], width=1))
-            self.elements_layer.add(Line(points=[x - body_pad, y + height, x - body_pad, y], width=1))
-            self.elements_layer.add(Line(points=[x + width + body_pad, y, x + width + body_pad, y + height], width=1))
+            layer.add(Color(0, 0, 0, 1)) # Black outline
+            layer.add(Line(rectangle=(x, y, width, height), width=2))
+            layer.add(Line(points=[x - body_pad, y - dp(5), x + width + body_pad, y - dp(5)], width=1))
+            layer.add(Line(points=[x - body_pad, y + height, x - body_pad, y], width=1))
+            layer.add(Line(points=[x + width + body_pad, y, x + width + body_pad, y + height], width=1))
 
         elif etype == "fridge":
-            self.elements_layer.add(Color(1, 1, 1, 1)) # White
-            self.elements_layer.add(Rectangle(pos=(x, y), size=(width, height)))
-            self.elements_layer.add(Color(0, 0, 0, 1)) # Black
-            self.elements_layer.add(Line(rectangle=(x, y, width, height), width=2))
+            layer.add(Color(1, 1, 1, 1)) # White
+            layer.add(Rectangle(pos=(x, y), size=(width, height)))
+            layer.add(Color(0, 0, 0, 1)) # Black
+            layer.add(Line(rectangle=(x, y, width, height), width=2))
 
             # Door separation line
-            self.elements_layer.add(Line(points=[x, y + height / 2, x + width, y + height / 2], width=1))
+            layer.add(Line(points=[x, y + height / 2, x + width, y + height / 2], width=1))
 
             # Handles
             handle_offset = dp(8)
             handle_len = dp(6)
-            self.elements_layer.add(Line(points=[x + width - handle_offset, y + height / 4 - handle_len/2, x + width - handle_offset, y + height / 4 + handle_len/2], width=2))
-            self.elements_layer.add(Line(points=[x + width - handle_offset, y + 3 * height / 4 - handle_len/2, x + width - handle_offset, y + 3 * height / 4 + handle_len/2], width=2))
+            layer.add(Line(points=[x + width - handle_offset, y + height / 4 - handle_len/2, x + width - handle_offset, y + height / 4 + handle_len/2], width=2))
+            layer.add(Line(points=[x + width - handle_offset, y + 3 * height / 4 - handle_len/2, x + width - handle_offset, y + 3 * height / 4 + handle_len/2], width=2))
 
         elif etype == "sink":
-            self.elements_layer.add(Line(rectangle=(x, y, width, height), width=2))
+            layer.add(Line(rectangle=(x, y, width, height), width=2))
 
             # Oval basin
             basin_pad = dp(8)
             # Kivy doesn't have direct Oval, approximate with Ellipse
-            self.elements_layer.add(Ellipse(pos=(x + basin_pad, y + basin_pad), size=(width - 2 * basin_pad, height - 2 * basin_pad), width=1))
+            layer.add(Ellipse(pos=(x + basin_pad, y + basin_pad), size=(width - 2 * basin_pad, height - 2 * basin_pad), width=1))
 
             # Faucet
             faucet_r = dp(4)
             faucet_y = y + dp(8)
-            self.elements_layer.add(Ellipse(pos=(x + width / 2 - faucet_r, faucet_y - faucet_r), size=(2 * faucet_r, 2 * faucet_r), width=1))
-            self.elements_layer.add(Line(points=[x + width / 2, faucet_y + faucet_r, x + width / 2, faucet_y + faucet_r + dp(6)], width=1))
+            layer.add(Ellipse(pos=(x + width / 2 - faucet_r, faucet_y - faucet_r), size=(2 * faucet_r, 2 * faucet_r), width=1))
+            layer.add(Line(points=[x + width / 2, faucet_y + faucet_r, x + width / 2, faucet_y + faucet_r + dp(6)], width=1))
 
         elif etype == "toilet":
             tank_h = height * 0.4
             tank_w = width - dp(6)
-            self.elements_layer.add(Color(1, 1, 1, 1)) # White
-            self.elements_layer.add(Rectangle(pos=(x + dp(3), y), size=(tank_w, tank_h)))
-            self.elements_layer.add(Color(0, 0, 0, 1)) # Black
-            self.elements_layer.add(Line(rectangle=(x + dp(3), y, tank_w, tank_h), width=2))
+            layer.add(Color(1, 1, 1, 1)) # White
+            layer.add(Rectangle(pos=(x + dp(3), y), size=(tank_w, tank_h)))
+            layer.add(Color(0, 0, 0, 1)) # Black
+            layer.add(Line(rectangle=(x + dp(3), y, tank_w, tank_h), width=2))
 
             # Bowl
             bowl_pad_x = dp(5)
             bowl_pad_y = dp(8)
             bowl_y = y + tank_h + bowl_pad_y
             bowl_h = height - tank_h - 2 * bowl_pad_y
-            self.elements_layer.add(Ellipse(pos=(x + bowl_pad_x, bowl_y), size=(width - 2 * bowl_pad_x, bowl_h), width=2))
+            layer.add(Ellipse(pos=(x + bowl_pad_x, bowl_y), size=(width - 2 * bowl_pad_x, bowl_h), width=2))
 
             # Flush button
             button_w, button_h = dp(6), dp(4)
-            self.elements_layer.add(Color(0.75, 0.75, 0.75, 1)) # Silver #c0c0c0 is close
-            self.elements_layer.add(Rectangle(pos=(x + width / 2 - button_w/2, y + dp(8)), size=(button_w, button_h)))
-            self.elements_layer.add(Color(0, 0, 0, 1))
-            self.elements_layer.add(Line(rectangle=(x + width / 2 - button_w/2, y + dp(8), button_w, button_h), width=1))
+            layer.add(Color(0.75, 0.75, 0.75, 1)) # Silver #c0c0c0 is close
+            layer.add(Rectangle(pos=(x + width / 2 - button_w/2, y + dp(8)), size=(button_w, button_h)))
+            layer.add(Color(0, 0, 0, 1))
+            layer.add(Line(rectangle=(x + width / 2 - button_w/2, y + dp(8), button_w, button_h), width=1))
 
         elif etype == "door":
             door_width, door_height = width, height
             # Door jamb
-            self.elements_layer.add(Line(points=[x, y, x, y + door_height], width=3))
+            layer.add(Line(points=[x, y, x, y + door_height], width=3))
 
             # Door panel
-            self.elements_layer.add(Line(points=[x, y, x + door_width, y], width=3))
+            layer.add(Line(points=[x, y, x + door_width, y], width=3))
 
             # Door swing arc (approximated)
             arc_points = []
@@ -346,25 +391,25 @@ class FloorPlanCanvas(Widget):
                 py = center_y + arc_radius * math.sin(angle_rad)
                 arc_points.extend([px, py])
             if len(arc_points) >= 4:
-                self.elements_layer.add(Line(points=arc_points, width=2))
+                layer.add(Line(points=arc_points, width=2))
 
             # Handle
             handle_r = dp(2)
             handle_x = x + door_width - dp(5)
             handle_y = y + door_height / 2
-            self.elements_layer.add(Color(0, 0, 0, 1)) # Black
-            self.elements_layer.add(Ellipse(pos=(handle_x - handle_r, handle_y - handle_r), size=(2 * handle_r, 2 * handle_r)))
+            layer.add(Color(0, 0, 0, 1)) # Black
+            layer.add(Ellipse(pos=(handle_x - handle_r, handle_y - handle_r), size=(2 * handle_r, 2 * handle_r)))
 
         elif etype == "double-door":
             door_width, door_height = width, height
             # Door jamb
-            self.elements_layer.add(Line(points=[x, y, x, y + door_height], width=3))
+            layer.add(Line(points=[x, y, x, y + door_height], width=3))
 
             # Door panel (left door)
-            self.elements_layer.add(Line(points=[x, y, x + door_width/2, y], width=3))
+            layer.add(Line(points=[x, y, x + door_width/2, y], width=3))
 
             # Door panel (right door)
-            self.elements_layer.add(Line(points=[x + door_width/2, y, x + door_width, y], width=3))
+            layer.add(Line(points=[x + door_width/2, y, x + door_width, y], width=3))
 
             # Door swing arcs (approximated)
             arc_points_left = []
@@ -383,32 +428,32 @@ class FloorPlanCanvas(Widget):
                 py_right = center_y_right + arc_radius * math.sin(angle_rad)
                 arc_points_right.extend([px_right, py_right])
             if len(arc_points_left) >= 4:
-                self.elements_layer.add(Line(points=arc_points_left, width=2))
+                layer.add(Line(points=arc_points_left, width=2))
             if len(arc_points_right) >= 4:
-                self.elements_layer.add(Line(points=arc_points_right, width=2))
+                layer.add(Line(points=arc_points_right, width=2))
 
             # Handles
             handle_r = dp(2)
             handle_x_left = x + door_width/4 - dp(2)
             handle_x_right = x + 3*door_width/4 + dp(2)
             handle_y = y + door_height / 2
-            self.elements_layer.add(Color(0, 0, 0, 1)) # Black
-            self.elements_layer.add(Ellipse(pos=(handle_x_left - handle_r, handle_y - handle_r), size=(2 * handle_r, 2 * handle_r)))
-            self.elements_layer.add(Ellipse(pos=(handle_x_right - handle_r, handle_y - handle_r), size=(2 * handle_r, 2 * handle_r)))
+            layer.add(Color(0, 0, 0, 1)) # Black
+            layer.add(Ellipse(pos=(handle_x_left - handle_r, handle_y - handle_r), size=(2 * handle_r, 2 * handle_r)))
+            layer.add(Ellipse(pos=(handle_x_right - handle_r, handle_y - handle_r), size=(2 * handle_r, 2 * handle_r)))
 
         elif etype == "window":
-            self.elements_layer.add(Line(points=[x, y + height / 2, x + width, y + height / 2], width=4))
+            layer.add(Line(points=[x, y + height / 2, x + width, y + height / 2], width=4))
 
         elif etype == "shower":
-            self.elements_layer.add(Line(rectangle=(x, y, width, height), width=2))
-            self.elements_layer.add(Line(points=[x, y, x + width, y + height], width=1))
-            self.elements_layer.add(Line(points=[x + width, y, x, y + height], width=1))
+            layer.add(Line(rectangle=(x, y, width, height), width=2))
+            layer.add(Line(points=[x, y, x + width, y + height], width=1))
+            layer.add(Line(points=[x + width, y, x, y + height], width=1))
             circle_r = dp(8)
-            self.elements_layer.add(Ellipse(pos=(x + width / 2 - circle_r, y + height / 2 - circle_r), size=(2 * circle_r, 2 * circle_r), width=1))
+            layer.add(Ellipse(pos=(x + width / 2 - circle_r, y + height / 2 - circle_r), size=(2 * circle_r, 2 * circle_r), width=1))
 
         elif etype == "flat-tv":
-            self.elements_layer.add(Color(0, 0, 0, 1)) # Black screen
-            self.elements_layer.add(Rectangle(pos=(x, y), size=(width, height)))
+            layer.add(Color(0, 0, 0, 1)) # Black screen
+            layer.add(Rectangle(pos=(x, y), size=(width, height)))
 
             # Bracket
             bracket_y_offset = dp(8)
@@ -418,13 +463,13 @@ class FloorPlanCanvas(Widget):
                 x + width / 2 + dp(10), y + height + bracket_y_offset
             ]
             # Kivy Line for polygon outline
-            self.elements_layer.add(Color(0, 0, 0, 1))
+            layer.add(Color(0, 0, 0, 1))
             # Close the triangle by repeating the first point
             bracket_points_closed = bracket_points + [bracket_points[0], bracket_points[1]]
-            self.elements_layer.add(Line(points=bracket_points_closed, width=1, close=True))
+            layer.add(Line(points=bracket_points_closed, width=1, close=True))
 
         elif etype == "gas-stove":
-            self.elements_layer.add(Line(rectangle=(x, y, width, height), width=2))
+            layer.add(Line(rectangle=(x, y, width, height), width=2))
             burner_r = dp(6)
             burner_pad = burner_r + dp(5)
             points_list = [
@@ -434,25 +479,26 @@ class FloorPlanCanvas(Widget):
                 (x + 3 * width / 4, y + 3 * height / 4)
             ]
             for bx, by in points_list:
-                self.elements_layer.add(Ellipse(pos=(bx - burner_r, by - burner_r), size=(2 * burner_r, 2 * burner_r), width=1))
+                layer.add(Ellipse(pos=(bx - burner_r, by - burner_r), size=(2 * burner_r, 2 * burner_r), width=1))
 
         elif etype == "side-table":
-            self.elements_layer.add(Line(rectangle=(x, y, width, height), width=2))
+            layer.add(Line(rectangle=(x, y, width, height), width=2))
 
         elif etype == "bathtub":
-            self.elements_layer.add(Line(rectangle=(x, y, width, height), width=2))
+            layer.add(Line(rectangle=(x, y, width, height), width=2))
             oval_pad = dp(8)
-            self.elements_layer.add(Ellipse(pos=(x + oval_pad, y + oval_pad), size=(width - 2 * oval_pad, height - 2 * oval_pad), width=1))
+            layer.add(Ellipse(pos=(x + oval_pad, y + oval_pad), size=(width - 2 * oval_pad, height - 2 * oval_pad), width=1))
 
             faucet_r = dp(4)
             faucet_x = x + width - dp(15)
             faucet_y = y + dp(10)
-            self.elements_layer.add(Ellipse(pos=(faucet_x - faucet_r, faucet_y - faucet_r), size=(2 * faucet_r, 2 * faucet_r), width=1))
-            self.elements_layer.add(Line(points=[faucet_x, faucet_y + faucet_r, faucet_x, faucet_y + faucet_r + dp(6)], width=1))
+            layer.add(Ellipse(pos=(faucet_x - faucet_r, faucet_y - faucet_r), size=(2 * faucet_r, 2 * faucet_r), width=1))
+            layer.add(Line(points=[faucet_x, faucet_y + faucet_r, faucet_x, faucet_y + faucet_r + dp(6)], width=1))
 
         else:
-            self.elements_layer.add(Line(rectangle=(x, y, width, height), width=2))
+            layer.add(Line(rectangle=(x, y, width, height), width=2))
 
+    @traced(category="render")
     def draw_selection(self):
         self.selection_layer.clear()
         selected_element = self.designer_logic.selected_element
@@ -462,7 +508,7 @@ class FloorPlanCanvas(Widget):
         element_type = selected_element.get("type")
         self.selection_layer.add(Color(0, 0, 1, 1)) # Blue
 
-        if element_type in ["room", "houseBorder"]:
+        if element_type in ["room", "houseBorder", "polygon"]:
             x, y, w, h = selected_element["x"], selected_element["y"], selected_element["width"], selected_element["height"]
             self.selection_layer.add(Line(rectangle=(x - dp(2), y - dp(2), w + dp(4), h + dp(4)), width=2, dash_offset=5, dash_length=5))
         elif element_type == "wall":
@@ -475,7 +521,7 @@ class FloorPlanCanvas(Widget):
             self.selection_layer.add(Line(rectangle=(x - dp(2), y - dp(2), width + dp(4), height + dp(4)), width=2, dash_offset=5, dash_length=5))
 
         # Draw resize handles if it's a resizable type
-        if selected_element.get("type") in ["room", "houseBorder"]:
+        if selected_element.get("type") in ["room", "houseBorder", "polygon"]:
              self.draw_resize_handles(selected_element)
 
     def draw_resize_handles(self, element):
@@ -496,6 +542,7 @@ class FloorPlanCanvas(Widget):
              # Add outline for handle
              self.selection_layer.add(Line(rectangle=(hx - handle_size, hy - handle_size, 2 * handle_size, 2 * handle_size), width=1))
 
+    @traced(category="input")
     def on_touch_down(self, touch):
 
         if self.collide_point(*touch.pos):
@@ -536,7 +583,8 @@ class FloorPlanCanvas(Widget):
 
             # Check for resizing handles first (if element selected and resizable)
             if self.designer_logic.selected_element and self.designer_logic.selected_element.get("type") in ["room",
-                                                                                                             "houseBorder"]:
+                                                                                                             "houseBorder",
+                                                                                                             "polygon"]:
 
                 handle = self.get_resize_handle(local_x, local_y, self.designer_logic.selected_element)
 
@@ -629,6 +677,7 @@ class FloorPlanCanvas(Widget):
                 return True
         return super().on_touch_down(touch)
 
+    @traced(category="input")
     def on_touch_move(self, touch):
 
         if self.collide_point(*touch.pos):
@@ -669,6 +718,7 @@ class FloorPlanCanvas(Widget):
                 return True
         return super().on_touch_move(touch)
 
+    @traced(category="input")
     def on_touch_up(self, touch):
 
         if self.collide_point(*touch.pos):
@@ -695,6 +745,11 @@ class FloorPlanCanvas(Widget):
                 if (element["x"] <= x <= element["x"] + element["width"] and
                         element["y"] <= y <= element["y"] + element["height"]):
                     return element
+            elif element.get("type") == "polygon":
+                if (element["x"] <= x <= element["x"] + element["width"] and
+                        element["y"] <= y <= element["y"] + element["height"] and
+                        self.point_in_polygon(x, y, self.designer_logic.get_polygon_points(element))):
+                    return element
             elif element.get("type") == "wall":
                 # Simple distance check for line
                 x1, y1, x2, y2 = element["x1"], element["y1"], element["x2"], element["y2"]
@@ -751,6 +806,19 @@ class FloorPlanCanvas(Widget):
         dy = py - yy
         return math.sqrt(dx * dx + dy * dy)
 
+    def point_in_polygon(self, px, py, points):
+        # Even-odd ray casting: count edge crossings of a horizontal ray from the point
+        inside = False
+        count = len(points)
+        for i in range(count):
+            x1, y1 = points[i]
+            x2, y2 = points[(i + 1) % count]
+            if (y1 > py) != (y2 > py):
+                cross_x = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+                if px < cross_x:
+                    inside = not inside
+        return inside
+
     def get_resize_handle(self, x, y, element):
         handle_size = dp(5)
         x1, y1 = element["x"], element["y"]